@@ -0,0 +1,282 @@
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from queue import Empty, Full
+from collections import deque
+
+from common import CategoricalPolicy
+from common.utils import set_seed
+
+
+def run_actor(actor_id,
+              env_fn,
+              policy_args,
+              shared_policy,
+              version,
+              lock,
+              messages,
+              stop,
+              max_steps,
+              chunk_size,
+              seed):
+    """Actor process: acts on its own env with a CPU copy of the policy and
+    streams transitions to the learner in chunks of chunk_size.
+    The policy is refreshed from shared memory whenever version changes.
+    """
+    torch.set_num_threads(1)
+
+    env = env_fn()
+
+    if seed is not None:
+        set_seed(seed, env)
+    policy = CategoricalPolicy(*policy_args).cpu()
+    local_version = -1
+
+    chunk = []
+    state = env.reset()
+    score = 0
+    time_step = 0
+
+    def send(message):
+        while not stop.is_set():
+            try:
+                messages.put(message, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    while not stop.is_set():
+        if version.value != local_version:
+            with lock:
+                policy.load_state_dict(shared_policy.state_dict())
+                local_version = version.value
+
+        with torch.no_grad():
+            state_t = torch.from_numpy(np.asarray(state, dtype=np.float32)).unsqueeze(0)
+            action = policy.act(state_t).item()
+
+        next_state, reward, done, _ = env.step(action)
+
+        chunk.append((state, action, reward, next_state, done))
+
+        score += reward
+        time_step += 1
+        state = next_state
+
+        if done or time_step == max_steps:
+            send(('episode', actor_id, score))
+            state = env.reset()
+            score = 0
+            time_step = 0
+
+        if len(chunk) == chunk_size:
+            states, actions, rewards, next_states, dones = zip(*chunk)
+            send(('transitions',
+                  actor_id,
+                  local_version,
+                  np.array(states, dtype=np.float32),
+                  np.array(actions),
+                  np.array(rewards, dtype=np.float32),
+                  np.array(next_states, dtype=np.float32),
+                  np.array(dones, dtype=np.float32)))
+            chunk = []
+
+    env.close()
+
+
+class ActorLearner:
+    """Asynchronous actor/learner split.
+
+    num_actors processes run their own env and a CPU copy of the policy,
+    and stream transitions to this (learner) process, which owns the replay
+    buffer and runs the updates. Every broadcast_every updates the learner
+    publishes the policy weights through shared memory.
+
+    The learner never runs more than num_updates / update_every updates per
+    collected env step, same ratio as Agent.train. Finished episodes go
+    through Agent.end_episode, as in Agent.train: metrics, weights and
+    checkpoints, and the evaluation that decides whether it's solved (on
+    config.env, a new env from env_fn if unset).
+
+    Args:
+        agent (SACAgent)
+        env_fn (callable): picklable no-args function returning a gym env
+    """
+    def __init__(self, agent, env_fn):
+        if getattr(agent, 'encoder', None) is not None:
+            raise ValueError('Actors only get the policy, not the shared encoder')
+
+        config = agent.config
+
+        # Actors send plain one-step transitions straight to the buffer,
+        # past Agent.step_batch
+        if config.n_step > 1:
+            raise ValueError('Actors send one-step transitions, n_step must be 1')
+
+        if config.use_episodic:
+            raise ValueError('The episodic bonus is added by Agent.step_batch, which actors bypass')
+
+        if config.utd_adaptive:
+            raise ValueError('The learner keeps num_updates / update_every updates per env step, utd_adaptive is not supported')
+
+        self.agent = agent
+        self.env_fn = env_fn
+
+        self.policy_args = (config.state_size,
+                            config.action_size,
+                            config.hidden_actor,
+                            config.activ_actor)
+
+        self.ctx = mp.get_context('spawn')
+
+        self.shared_policy = CategoricalPolicy(*self.policy_args).cpu()
+        self.shared_policy.share_memory()
+
+        self.version = self.ctx.Value('i', 0)
+        self.lock = self.ctx.Lock()
+        self.messages = self.ctx.Queue(maxsize=config.num_actors * 8)
+        self.stop = self.ctx.Event()
+        self.actors = []
+
+        self.publish()
+
+    def publish(self):
+        """Copies the learner policy into shared memory for the actors"""
+        with self.lock, torch.no_grad():
+            for shared, local in zip(self.shared_policy.parameters(),
+                                     self.agent.policy.parameters()):
+                shared.copy_(local)
+
+            self.version.value += 1
+
+    def start(self):
+        config = self.agent.config
+
+        for actor_id in range(config.num_actors):
+            actor = self.ctx.Process(target=run_actor,
+                                     args=(actor_id,
+                                           self.env_fn,
+                                           self.policy_args,
+                                           self.shared_policy,
+                                           self.version,
+                                           self.lock,
+                                           self.messages,
+                                           self.stop,
+                                           config.max_steps,
+                                           config.actor_chunk_size,
+                                           None if config.seed is None else config.seed + actor_id))
+            actor.daemon = True
+            actor.start()
+            self.actors.append(actor)
+
+    def shutdown(self):
+        self.stop.set()
+
+        # Drain so no actor stays blocked on a full queue
+        try:
+            while True:
+                self.messages.get_nowait()
+        except Empty:
+            pass
+
+        for actor in self.actors:
+            actor.join(timeout=5)
+            if actor.is_alive():
+                actor.terminate()
+
+        self.actors = []
+
+    def train(self):
+        agent = self.agent
+        config = agent.config
+        memory = agent.memory
+        num_episodes = config.num_episodes
+        times_solved = config.times_solved
+        broadcast_every = config.broadcast_every
+        utd_ratio = config.num_updates / config.update_every
+
+        # Evaluations run on the learner side
+        if config.env is None:
+            config.env = self.env_fn()
+
+        scores = agent.scores
+        scores_window = deque(scores[-times_solved:], maxlen=times_solved)
+        i_episode = agent.episode
+
+        env_steps = 0
+        updates = 0
+        lags = deque(maxlen=1000)
+
+        self.start()
+        start = time.time()
+
+        try:
+            solved = False
+
+            while not solved and i_episode < num_episodes:
+                can_learn = len(memory) > config.batch_size and \
+                            updates < env_steps * utd_ratio
+
+                # Block (briefly) only when there's nothing to learn from
+                try:
+                    if can_learn:
+                        message = self.messages.get_nowait()
+                    else:
+                        message = self.messages.get(timeout=1.0)
+                except Empty:
+                    message = None
+
+                new_episodes = []
+
+                while message is not None:
+                    if message[0] == 'transitions':
+                        _, actor_id, actor_version, *transitions = message
+                        streams = np.full(len(transitions[0]), actor_id)
+
+                        memory.add_batch(*transitions, streams)
+                        env_steps += len(transitions[0])
+                        lags.append(self.version.value - actor_version)
+                    else:
+                        new_episodes.append(message[2])
+
+                    try:
+                        message = self.messages.get_nowait()
+                    except Empty:
+                        message = None
+
+                if len(memory) > config.batch_size and updates < env_steps * utd_ratio:
+                    agent.learn(memory.sample())
+                    updates += 1
+
+                    if updates % broadcast_every == 0:
+                        self.publish()
+
+                for score in new_episodes:
+                    i_episode += 1
+
+                    scores.append(score)
+                    scores_window.append(score)
+
+                    # Recorded along with the episode
+                    elapsed = max(time.time() - start, 1e-6)
+                    agent.metrics.add('env_steps_per_sec', env_steps / elapsed)
+                    agent.metrics.add('updates_per_sec', updates / elapsed)
+                    agent.metrics.add('policy_lag', float(np.mean(lags)) if lags else 0.)
+
+                    solved = agent.end_episode(i_episode, score, scores_window, start)
+
+                    if solved or i_episode == num_episodes: break
+        finally:
+            self.shutdown()
+            agent.finish_training(config.env)
+
+        elapsed = max(time.time() - start, 1e-6)
+
+        self.stats = {'env_steps': env_steps,
+                      'updates': updates,
+                      'env_steps_per_sec': env_steps / elapsed,
+                      'updates_per_sec': updates / elapsed,
+                      'policy_lag': float(np.mean(lags)) if lags else 0.}
+
+        return scores
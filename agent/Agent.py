@@ -5,8 +5,9 @@ import torch
 from collections import deque
 from abc import ABC, abstractmethod
 
-from common import ReplayBuffer
-from common.utils import make_experience, get_time_elapsed
+from common import ReplayBuffer, PrioritizedReplayBuffer, NStepWindow, PrefetchSampler, UTDScheduler, CheckpointManager, Metrics
+from common.utils import get_time_elapsed, make_vec_env, get_terminal_states, get_truncated, vector_episode_scores, set_seed
+from .Evaluator import Evaluator
 
 class Agent(ABC):
     """Common logic"""
@@ -16,23 +17,135 @@ class Agent(ABC):
     def __init__(self, config):
         self.config = config
 
-        self.memory = ReplayBuffer(config.buffer_size, config.batch_size)
+        if config.seed is not None:
+            set_seed(config.seed, config.env)
+
+        storage = dict(compact=config.compact_replay,
+                       obs_dtype=config.replay_obs_dtype,
+                       obs_low=config.obs_low,
+                       obs_high=config.obs_high,
+                       action_size=config.action_size,
+                       tail_size=config.compact_tail_size,
+                       discounted=config.n_step > 1,
+                       seed=config.seed)
+
+        if config.n_step > 1 and config.compact_replay:
+            raise ValueError('compact_replay chains consecutive transitions, n-step ones can\'t be stored')
+
+        if config.prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(config.buffer_size,
+                                                  config.batch_size,
+                                                  config.state_size,
+                                                  config.per_alpha,
+                                                  config.per_beta,
+                                                  config.per_beta_increment,
+                                                  config.per_eps,
+                                                  config.replay_dir,
+                                                  **storage)
+        else:
+            self.memory = ReplayBuffer(config.buffer_size,
+                                       config.batch_size,
+                                       config.state_size,
+                                       config.replay_dir,
+                                       **storage)
+
+
+        if config.checkpoint_dir is not None:
+            self.checkpoints = CheckpointManager(config.checkpoint_dir,
+                                                 self.name,
+                                                 config.checkpoint_keep,
+                                                 config.checkpoint_keep_best,
+                                                 config.checkpoint_min_interval)
+        else:
+            self.checkpoints = None
+
+        # Background evaluation (a multi-agent env can't be copied)
+        if config.eval_workers > 0 and not getattr(config.env, 'multi_agent', False):
+            if config.env_fn is None:
+                raise ValueError('eval_workers needs env_fn to build the evaluation envs')
+
+            self.evaluator = Evaluator(config.env_fn,
+                                       config.eval_workers,
+                                       config.times_solved,
+                                       config.max_steps,
+                                       config.seed)
+        else:
+            self.evaluator = None
 
         self.t_step = 0
         self.p_update = 0
-        
-        self.policy_losses = []
-        self.value_losses = []
+
+        # Training progress, restored by resume
+        self.episode = 0
+        self.scores = []
+        self.best_score = -np.inf
+
+        self.avg_score = -np.inf
+
+        # n-step returns, aggregated before they reach the buffer
+        if config.n_step > 1:
+            self.n_step_window = NStepWindow(config.n_step,
+                                             config.gamma,
+                                             config.state_size,
+                                             config.num_envs)
+        else:
+            self.n_step_window = None
+
+        # Episodic novelty module, set by subclasses that support it
+        self.episodic = None
+
+        # Set once the evaluation confirms env_solved
+        self.solved_episode = None
+        self.solve_time = None
+
+        self.metrics = Metrics(config.metrics_path,
+                               config.metrics_format,
+                               config.profile,
+                               config.profile_cuda_sync)
+
+        # Started once the buffer holds a batch
+        if config.prefetch_batches > 0:
+            self.sampler = PrefetchSampler(self.memory, config.prefetch_batches, self.metrics)
+        else:
+            self.sampler = None
+
+        if config.utd_adaptive:
+            self.utd_scheduler = UTDScheduler(config.utd_target_share,
+                                              config.utd_target_ratio,
+                                              config.utd_min_ratio,
+                                              config.utd_max_ratio,
+                                              config.utd_initial_ratio,
+                                              config.utd_adjust_every,
+                                              config.utd_smoothing,
+                                              Metrics(config.utd_log_path, config.metrics_format))
+        else:
+            self.utd_scheduler = None
     
     @abstractmethod
     def act(self, state, train=True):
         pass
 
     def reset(self):
-        self.policy_losses = []
-        self.value_losses = []
+        self.end_streams()
+
         return self.config.env.reset()
 
+    def end_streams(self, streams=None):
+        """Episodes of streams (all by default) are over, even if they
+        weren't done: their n-step windows go to the buffer and their
+        episodic memory is forgotten"""
+        if self.n_step_window is not None:
+            self.add_n_step(self.n_step_window.flush(streams))
+
+        if self.episodic is not None:
+            self.episodic.reset(streams)
+
+    def add_n_step(self, transitions):
+        states, actions, returns, next_states, dones, discounts = transitions
+
+        if len(states) > 0:
+            self.memory.add_batch(states, actions, returns, next_states, dones, discounts=discounts)
+
     @abstractmethod
     def learn(self, experiences):
         pass
@@ -40,125 +153,479 @@ class Agent(ABC):
     def sample_and_learn(self):
         batch_size = self.config.batch_size
         update_every = self.config.update_every
-        num_updates = self.config.num_updates
+        utd_scheduler = self.utd_scheduler
+
+        if utd_scheduler is not None:
+            # Updates for this step, from the measured env and update times
+            num_updates = utd_scheduler.step()
+        else:
+            # Learn every update_every time steps.
+            self.t_step = (self.t_step + 1) % update_every
+            num_updates = self.config.num_updates if self.t_step == 0 else 0
+
+        # Learn, if enough samples are available in memory
+        if num_updates > 0 and len(self.memory) > batch_size:
+            start = time.perf_counter()
+
+            if self.sampler is not None:
+                self.sampler.start()
+
+            # Multiple updates in one learning step
+            for _ in range(num_updates):
+                with self.metrics.time('sample'):
+                    if self.sampler is not None:
+                        experiences = self.sampler.get()
+                    else:
+                        experiences = self.memory.sample()
+
+                self.learn(experiences)
+
+            if utd_scheduler is not None:
+                utd_scheduler.updated(num_updates, time.perf_counter() - start)
+                self.metrics.add('utd_ratio', utd_scheduler.ratio)
+
+    def episodic_bonus(self, next_states, streams=None):
+        """Episodic novelty of a batch of next states (np.ndarray), none
+        unless the subclass has an episodic memory"""
+        return np.zeros(len(next_states), dtype=np.float32)
+
+    def step(self, state, action, reward, next_state, done):
+        if self.episodic is not None:
+            with self.metrics.time('episodic'):
+                bonus = self.episodic_bonus(np.asarray(next_state, dtype=np.float32)[None])[0]
+
+            self.metrics.add('episodic_bonus', float(bonus))
+            reward = reward + self.config.episodic_coef * bonus
+
+        with self.metrics.time('buffer_add'):
+            if self.n_step_window is not None:
+                self.add_n_step(self.n_step_window.add(np.asarray(state)[None],
+                                                       np.asarray([action]),
+                                                       np.asarray([reward]),
+                                                       np.asarray(next_state)[None],
+                                                       np.asarray([done])))
+            else:
+                self.memory.add(state, action, reward, next_state, done)
 
-        # Learn every update_every time steps.
-        self.t_step = (self.t_step + 1) % update_every
+        self.sample_and_learn()
 
-        if self.t_step == 0:
+    def step_batch(self, states, actions, rewards, next_states, dones, streams=None):
+        """Same as step, but for one transition per environment copy (or
+        per agent, streams being their ids)"""
+        if self.episodic is not None:
+            with self.metrics.time('episodic'):
+                bonuses = self.episodic_bonus(np.asarray(next_states, dtype=np.float32), streams)
 
-            # Learn, if enough samples are available in memory
-            if len(self.memory) > batch_size:
+            self.metrics.add('episodic_bonus', float(bonuses.mean()))
+            rewards = rewards + self.config.episodic_coef * bonuses
 
-                # Multiple updates in one learning step
-                for _ in range(num_updates):
-                    experiences = self.memory.sample()
-                    self.learn(experiences)
+            # Copies (or agents) that finished start a new episode
+            ended = np.asarray(dones, dtype=bool)
+            self.episodic.reset(np.flatnonzero(ended) if streams is None else np.asarray(streams)[ended])
 
-    def step(self, state, action, reward, next_state, done):
-        experience = make_experience(state,
-                                     action,
-                                     reward,
-                                     next_state,
-                                     done)
-        self.memory.add(experience)
+        with self.metrics.time('buffer_add'):
+            if self.n_step_window is not None:
+                self.add_n_step(self.n_step_window.add(states, actions, rewards, next_states, dones, streams))
+            else:
+                self.memory.add_batch(states, actions, rewards, next_states, dones, streams)
 
-        self.sample_and_learn()
+        # Keep the same update-to-data ratio as stepping one env at a time
+        for _ in range(len(states)):
+            self.sample_and_learn()
 
     def train(self):
+        if getattr(self.config.env, 'multi_agent', False):
+            return self.train_multi_agent()
+
+        if self.config.num_envs > 1 or hasattr(self.config.env, 'num_envs'):
+            return self.train_vectorized()
+
         num_episodes = self.config.num_episodes
         max_steps = self.config.max_steps
         max_steps_reward = self.config.max_steps_reward
-        log_every = self.config.log_every
-        env_solved = self.config.env_solved
         times_solved = self.config.times_solved
         env = self.config.env
 
         start = time.time()
 
-        scores_window = deque(maxlen=times_solved)
-        best_score = -np.inf
-        scores = []
+        scores = self.scores
+        scores_window = deque(scores[-times_solved:], maxlen=times_solved)
+
+        try:
+            for i_episode in range(self.episode + 1, num_episodes+1):
+                state = self.reset()
+                score = 0
+                done = False
+                time_step = 0
 
-        for i_episode in range(1, num_episodes+1):
-            state = self.reset()
-            score = 0
-            done = False
-            time_step = 0
+                while not done:
+                    with self.metrics.time('act'):
+                        action = self.act(state)
 
-            while not done:
-                action = self.act(state)
-                next_state, reward, done, _ = env.step(action)
+                    with self.metrics.time('env_step'):
+                        next_state, reward, done, _ = env.step(action)
 
-                self.step(state, action, reward, next_state, done)
+                    self.step(state, action, reward, next_state, done)
 
-                time_step += 1
+                    time_step += 1
                 
-                if not done and time_step == max_steps:
-                    # We reached max_steps
-                    done = True
+                    if not done and time_step == max_steps:
+                        # We reached max_steps
+                        done = True
                     
-                    # Do we penalized?
-                    reward = max_steps_reward if max_steps_reward is not None else reward
+                        # Do we penalized?
+                        reward = max_steps_reward if max_steps_reward is not None else reward
 
-                state = next_state
-                score += reward
+                    state = next_state
+                    score += reward
                 
-                if done: break
+                    if done: break
 
-            scores.append(score)
-            scores_window.append(score)
-            avg_score = np.mean(scores_window)
-            avg_policy_loss = np.mean(self.policy_losses)
-            avg_value_loss = np.mean(self.value_losses)
-            
-            to_print = '\rEpisode {}\tScore: {:5.2f}\tAvg Score: {:5.2f}\tAvg Policy Loss: {:5.2f}\tAvg Value Loss: {:5.2f}'\
-                        .format(i_episode, score, avg_score, avg_policy_loss, avg_value_loss)
+                scores.append(score)
+                scores_window.append(score)
 
-            print(to_print, end='')
+                if self.end_episode(i_episode, score, scores_window, start):
+                    break
+        finally:
+            self.finish_training(env)
 
-            if i_episode % log_every == 0: print(to_print)
+        return scores
 
-            if avg_score > best_score:
-                best_score = avg_score
-                self.save_weights()
+    def train_vectorized(self):
+        """Steps num_envs copies of the environment together. Episodes are
+        counted as they finish in any of the copies. Copies reset themselves,
+        so max_steps is left to the env's own time limit here.
+        """
+        num_episodes = self.config.num_episodes
+        times_solved = self.config.times_solved
+        env = self.config.env
 
-            if avg_score >= env_solved:
-                print('\nRunning evaluation...')
+        if not hasattr(env, 'num_envs'):
+            env = make_vec_env(self.config.env_fn,
+                               self.config.num_envs,
+                               self.config.vector_async)
 
-                avg_score = self.eval_episode()
+        num_envs = env.num_envs
 
-                if avg_score >= env_solved:
-                    time_elapsed = get_time_elapsed(start)
+        start = time.time()
 
-                    print('Environment solved {} times consecutively!'.format(times_solved))
-                    print('Avg score: {:.3f}'.format(avg_score))
-                    print('Time elapsed: {}'.format(time_elapsed))
-                    break
-                else:
-                    print('No success. Avg score: {:.3f}'.format(avg_score))
+        scores = self.scores
+        scores_window = deque(scores[-times_solved:], maxlen=times_solved)
+
+        states = env.reset()
+        env_scores = np.zeros(num_envs)
+        i_episode = self.episode
+
+        try:
+            while i_episode < num_episodes:
+                with self.metrics.time('act'):
+                    actions = self.act(states)
+
+                with self.metrics.time('env_step'):
+                    next_states, rewards, dones, infos = env.step(actions)
+
+                terminal_states = get_terminal_states(next_states, dones, infos)
+                truncated = get_truncated(dones, infos)
+
+                # Time limits aren't terminal states, those transitions bootstrap
+                self.step_batch(states, actions, rewards, terminal_states, dones & ~truncated)
+
+                # but their episodes are over all the same
+                if truncated.any():
+                    self.end_streams(np.flatnonzero(truncated))
+
+                env_scores += rewards
+                states = next_states
+
+                solved = False
+
+                for i in np.flatnonzero(dones):
+                    i_episode += 1
+                    score = env_scores[i]
+                    env_scores[i] = 0
+
+                    scores.append(score)
+                    scores_window.append(score)
 
-        env.close()
+                    solved = self.end_episode(i_episode, score, scores_window, start)
+
+                    if solved or i_episode == num_episodes: break
+
+                if solved: break
+        finally:
+            self.finish_training(env)
 
         return scores
 
+    def train_multi_agent(self):
+        """Collects decisions from all the agents of a multi-agent env
+        (envs.UnityMultiAgentEnv) at once. Episodes are counted as agents
+        finish them; their length is left to the scene's max step.
+        """
+        num_episodes = self.config.num_episodes
+        times_solved = self.config.times_solved
+        env = self.config.env
+
+        start = time.time()
+
+        scores = self.scores
+        scores_window = deque(scores[-times_solved:], maxlen=times_solved)
+
+        env.reset()
+        i_episode = self.episode
+        solved = False
+
+        try:
+            while not solved and i_episode < num_episodes:
+                for _, score in env.collect_step(self):
+                    i_episode += 1
+
+                    scores.append(score)
+                    scores_window.append(score)
+
+                    solved = self.end_episode(i_episode, score, scores_window, start)
+
+                    if solved or i_episode == num_episodes: break
+        finally:
+            self.finish_training(env)
+
+        return scores
+
+    def finish_training(self, env):
+        """End of a training loop, however it ends: the episodes under way
+        are closed (their n-step windows go to the buffer), the replay
+        buffer and a last checkpoint go to disk, the env and the background
+        workers (checkpoint writer, evaluator, prefetching) are closed"""
+        try:
+            self.end_streams()
+            self.memory.flush()
+            self.save_checkpoint(force=True)
+        finally:
+            if self.checkpoints is not None:
+                self.checkpoints.close()
+
+            env.close()
+
+            if self.evaluator is not None:
+                self.evaluator.close()
+
+            if self.sampler is not None:
+                self.sampler.stop()
+
+    def end_episode(self, i_episode, score, scores_window, start):
+        """Logs the episode, saves the weights when the moving average
+        improves, and runs the evaluation once it reaches env_solved
+        Returns:
+            bool: whether the environment is solved
+        """
+        log_every = self.config.log_every
+        env_solved = self.config.env_solved
+        replay_flush_every = self.config.replay_flush_every
+
+        self.episode = i_episode
+
+        if i_episode % replay_flush_every == 0:
+            self.memory.flush()
+
+        avg_score = np.mean(scores_window)
+        self.avg_score = avg_score
+
+        # Everything recorded on device during the episode is read here, once
+        stats = self.metrics.summary()
+        avg_policy_loss = stats.get('policy_loss', np.nan)
+        avg_value_loss = stats.get('value_loss', np.nan)
+
+        self.metrics.write(dict(episode=i_episode,
+                                score=float(score),
+                                avg_score=float(avg_score),
+                                **stats))
+
+        to_print = '\rEpisode {}\tScore: {:5.2f}\tAvg Score: {:5.2f}\tAvg Policy Loss: {:5.2f}\tAvg Value Loss: {:5.2f}'\
+                    .format(i_episode, score, avg_score, avg_policy_loss, avg_value_loss)
+
+        print(to_print, end='')
+
+        if i_episode % log_every == 0:
+            print(to_print)
+
+            if self.config.metrics_console:
+                Metrics.print_summary(stats)
+
+        if avg_score > self.best_score:
+            self.best_score = avg_score
+
+            if self.checkpoints is None:
+                self.save_weights(self.config.weights_dir)
+
+        self.save_checkpoint()
+
+        if self.evaluator is not None:
+            return self.check_evaluation(avg_score, start)
+
+        if avg_score >= env_solved:
+            print('\nRunning evaluation...')
+
+            avg_score = self.eval_episode()
+
+            if avg_score >= env_solved:
+                self.solved(i_episode, avg_score, start)
+                return True
+            else:
+                print('No success. Avg score: {:.3f}'.format(avg_score))
+
+        return False
+
+    def check_evaluation(self, avg_score, start):
+        """Background counterpart of the evaluation in end_episode: reports
+        a finished evaluation, and starts a new one on a snapshot of the
+        policy when the moving average reaches env_solved and none is running
+        Returns:
+            bool: whether the environment is solved
+        """
+        env_solved = self.config.env_solved
+
+        result = self.evaluator.poll()
+
+        if result is not None:
+            episode, eval_score = result
+
+            self.metrics.write(dict(eval_episode=episode, eval_score=eval_score))
+
+            if eval_score >= env_solved:
+                self.solved(episode, eval_score, start)
+                return True
+
+            print('\nEvaluation of episode {}: no success. Avg score: {:.3f}'.format(episode, eval_score))
+
+        if avg_score >= env_solved and self.evaluator.submit(self.policy, self.episode):
+            print('\nEvaluating episode {} in the background...'.format(self.episode))
+
+        return False
+
+    def solved(self, i_episode, avg_score, start):
+        times_solved = self.config.times_solved
+
+        self.solved_episode = i_episode
+        self.solve_time = time.time() - start
+
+        print('\nEnvironment solved {} times consecutively!'.format(times_solved))
+        print('Avg score: {:.3f}'.format(avg_score))
+        print('Time elapsed: {}'.format(get_time_elapsed(start)))
+
     def eval_episode(self):
         times_solved = self.config.times_solved
         env = self.config.env
+
+        if getattr(env, 'multi_agent', False):
+            return env.evaluate(self, times_solved)
+
+        # The training env is vectorized and mid-episode,
+        # evaluate on a new one built from env_fn
+        own_env = hasattr(env, 'num_envs')
+        if own_env:
+            env = self.config.env_fn()
+
+        if hasattr(env, 'num_envs'):
+            avg_score = self.eval_vectorized(env)
+        else:
+            total_reward = 0
+
+            for _ in range(times_solved):
+                state = env.reset()
+                while True:
+                    actions = self.act(state, train=False)
+                    state, reward, done, _ = env.step(actions)
+
+                    total_reward += reward
         
-        total_reward = 0
-        
-        for _ in range(times_solved):
-            state = env.reset()
-            while True:
-                actions = self.act(state, train=False)
-                state, reward, done, _ = env.step(actions)
+                    if done: break
 
-                total_reward += reward
-    
-                if done: break
+            avg_score = total_reward / times_solved
+
+        if own_env:
+            env.close()
                 
-        return total_reward / times_solved
+        return avg_score
+
+    def eval_vectorized(self, env):
+        """Greedy evaluation over times_solved episodes, run across all
+        the copies of a vectorized env at once"""
+        scores = vector_episode_scores(env,
+                                       lambda states: self.act(states, train=False),
+                                       self.config.times_solved)
+
+        return np.mean(scores)
+
+    def training_state(self):
+        """Everything needed to resume training exactly, subclasses add
+        their networks and optimizers. Only tensors and primitives, so
+        torch.load works with weights_only"""
+        return {'t_step': self.t_step,
+                'p_update': self.p_update,
+                'episode': self.episode,
+                'scores': [float(score) for score in self.scores],
+                'best_score': float(self.best_score),
+                'avg_score': float(self.avg_score),
+                'utd': self.utd_scheduler.state_dict() if self.utd_scheduler is not None else None,
+                'rng': {'torch': torch.get_rng_state(),
+                        'numpy': self.numpy_rng_state(),
+                        'random': random.getstate(),
+                        'memory': self.memory.rng.bit_generator.state}}
+
+    @staticmethod
+    def numpy_rng_state():
+        # Keys as a tensor, so the checkpoint only holds tensors and primitives
+        name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+        return (name, torch.from_numpy(keys.astype(np.int64)), pos, has_gauss, cached_gaussian)
+
+    def load_training_state(self, state):
+        self.t_step = state['t_step']
+        self.p_update = state['p_update']
+        self.episode = state['episode']
+        self.scores = list(state['scores'])
+        self.best_score = state['best_score']
+        self.avg_score = state['avg_score']
+
+        if self.utd_scheduler is not None and state.get('utd') is not None:
+            self.utd_scheduler.load_state_dict(state['utd'])
+
+        torch.set_rng_state(state['rng']['torch'])
+        name, keys, pos, has_gauss, cached_gaussian = state['rng']['numpy']
+        np.random.set_state((name, keys.numpy().astype(np.uint32), pos, has_gauss, cached_gaussian))
+        random.setstate(state['rng']['random'])
+
+        # The replay buffer samples with a generator of its own
+        if 'memory' in state['rng']:
+            self.memory.rng.bit_generator.state = state['rng']['memory']
+
+    def save_checkpoint(self, force=False):
+        """Hands a full training snapshot to the background writer
+        (rate-limited by checkpoint_min_interval unless forced)"""
+        if self.checkpoints is None or self.episode == 0:
+            return
+
+        self.checkpoints.save(self.training_state, self.avg_score, force)
+
+        if force:
+            self.checkpoints.wait()
+
+    def resume(self, best=False):
+        """Loads the latest (or best) checkpoint, if any. Training picks up
+        from the episode it was taken at
+        Returns:
+            bool: whether a checkpoint was loaded
+        """
+        if self.checkpoints is None:
+            raise ValueError('resume needs config.checkpoint_dir')
+
+        path = self.checkpoints.best() if best else self.checkpoints.latest()
+
+        if path is None:
+            return False
+
+        self.load_training_state(torch.load(path, map_location='cpu'))
+
+        return True
 
     @abstractmethod
     def save_weights(self, path='weights'):
@@ -0,0 +1,235 @@
+import os
+import socket
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from common import Config
+from common.utils import device
+
+# Ranks other than 0 only learn: the env, the replay buffer, checkpoints
+# and evaluation stay with rank 0
+LEARNER_SETTINGS = dict(buffer_size=1,
+                        replay_dir=None,
+                        compact_replay=False,
+                        prioritized_replay=False,
+                        checkpoint_dir=None,
+                        eval_workers=0,
+                        metrics_path=None,
+                        profile=False,
+                        prefetch_batches=0,
+                        use_episodic=False)
+
+STOP, LEARN = 0, 1
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def all_reduce_grads(parameters, world_size):
+    """Averages the gradients of parameters across ranks, flattened into
+    a single all-reduce"""
+    grads = [p.grad for p in parameters if p.grad is not None]
+
+    if not grads:
+        return
+
+    flat = torch.cat([grad.reshape(-1) for grad in grads])
+    dist.all_reduce(flat)
+    flat /= world_size
+
+    offset = 0
+    for grad in grads:
+        grad.copy_(flat[offset:offset + grad.numel()].view_as(grad))
+        offset += grad.numel()
+
+def batch_columns(config):
+    """Widths of the fields packed side by side in a minibatch: states,
+    actions, rewards, next_states, dones, then discounts (n-step) and
+    weights (prioritized replay)"""
+    columns = [config.state_size, 1, 1, config.state_size, 1]
+
+    if config.n_step > 1:
+        columns.append(1)
+
+    if config.prioritized_replay:
+        columns.append(1)
+
+    return columns
+
+def unpack(shard, columns, prioritized):
+    """Packed shard to the experiences SACAgent.learn takes. Priorities
+    are updated by rank 0, so the slots are left out (None)"""
+    fields = [field.contiguous() for field in torch.split(shard, columns, dim=1)]
+    fields[1] = fields[1].long()
+
+    if prioritized:
+        fields.append(None)
+
+    return fields
+
+def init_rank(rank, world_size, init_method, agent, threads):
+    torch.set_num_threads(threads)
+    dist.init_process_group('gloo', init_method=init_method, rank=rank, world_size=world_size)
+
+    agent.learn_batch_size = agent.config.batch_size // world_size
+    agent.grad_sync = lambda parameters: all_reduce_grads(parameters, world_size)
+
+def run_rank(rank, world_size, init_method, agent_cls, settings, state, threads):
+    """Rank > 0: rebuilds the agent from rank 0's settings and training
+    state, then learns on its shard of every minibatch until told to stop"""
+    columns = batch_columns(Config.from_dict(settings))
+    prioritized = settings['prioritized_replay']
+
+    agent = agent_cls(Config.from_dict({**settings, **LEARNER_SETTINGS}))
+    agent.load_training_state(state)
+
+    init_rank(rank, world_size, init_method, agent, threads)
+
+    command = torch.zeros(1, dtype=torch.int64)
+    shard = torch.zeros((agent.learn_batch_size, sum(columns)))
+
+    while True:
+        dist.broadcast(command, src=0)
+
+        if command.item() == STOP:
+            break
+
+        dist.scatter(shard, src=0)
+        td_errors = agent.learn(unpack(shard, columns, prioritized))
+
+        if prioritized:
+            dist.gather(td_errors, dst=0)
+
+    dist.destroy_process_group()
+
+
+class DataParallelLearner:
+    """Synchronous data-parallel SAC updates over CPU processes (gloo).
+
+    Rank 0 is the agent of this process: it runs the env and owns the
+    replay buffer. Every sampled minibatch is split in num_ranks equal
+    shards, one per rank. Each rank computes the critic, policy, alpha (and
+    encoder, ICM) losses on its shard, gradients are averaged with an
+    all-reduce before every optimizer step, so all ranks apply the same
+    update to Q_local, the target networks and log_alpha and stay in sync.
+    The other ranks start from rank 0's training state. Losses in the
+    metrics are rank 0's shard.
+
+    Args:
+        agent (SACAgent)
+        num_ranks (int): config.learner_ranks by default
+        threads_per_rank (int): config.learner_threads by default, None
+            splits the cores evenly
+    """
+    def __init__(self, agent, num_ranks=None, threads_per_rank=None):
+        config = agent.config
+
+        num_ranks = num_ranks or config.learner_ranks
+        threads_per_rank = threads_per_rank or config.learner_threads
+
+        if device.type != 'cpu':
+            raise ValueError('DataParallelLearner runs on CPU processes')
+
+        if config.batch_size % num_ranks != 0:
+            raise ValueError('batch_size must split evenly across the {} ranks'.format(num_ranks))
+
+        # RND normalizes observations with running stats, they'd drift apart
+        if getattr(agent, 'rnd', None) is not None:
+            raise ValueError('RND running stats can\'t be kept in sync across ranks')
+
+        self.agent = agent
+        self.world_size = num_ranks
+        self.threads = threads_per_rank or max(1, (os.cpu_count() or 1) // num_ranks)
+        self.columns = batch_columns(config)
+
+        self.ctx = mp.get_context('spawn')
+        self.workers = []
+
+    def start(self):
+        agent = self.agent
+        init_method = 'tcp://127.0.0.1:{}'.format(free_port())
+
+        args = (self.world_size,
+                init_method,
+                type(agent),
+                agent.config.to_dict(),
+                agent.training_state(),
+                self.threads)
+
+        for rank in range(1, self.world_size):
+            worker = self.ctx.Process(target=run_rank, args=(rank,) + args, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        init_rank(0, self.world_size, init_method, agent, self.threads)
+
+        # sample_and_learn now goes through the ranks
+        agent.learn = self.learn
+
+        return self
+
+    def stop(self, graceful=True):
+        """Tells the ranks to stop, or kills them when a collective may
+        have been left halfway (graceful=False)"""
+        agent = self.agent
+
+        if graceful:
+            dist.broadcast(torch.full((1,), STOP, dtype=torch.int64), src=0)
+
+        for worker in self.workers:
+            if not graceful:
+                worker.terminate()
+            worker.join()
+
+        dist.destroy_process_group()
+        self.workers = []
+
+        del agent.learn
+        agent.learn_batch_size = agent.config.batch_size
+        agent.grad_sync = None
+
+    def learn(self, experiences):
+        agent = self.agent
+
+        num_fields = 6 if agent.memory.discounted else 5
+        weights, idxs = experiences[num_fields:] if len(experiences) > num_fields else (None, None)
+
+        fields = list(experiences[:num_fields])
+
+        if weights is not None:
+            fields.append(weights)
+
+        # One scatter for the whole minibatch, actions ride along as floats
+        batch = torch.cat([field.float().reshape(len(field), -1) for field in fields], dim=1)
+        shard = torch.zeros((agent.learn_batch_size, batch.shape[1]))
+
+        dist.broadcast(torch.full((1,), LEARN, dtype=torch.int64), src=0)
+        dist.scatter(shard, list(batch.chunk(self.world_size)), src=0)
+
+        td_errors = type(agent).learn(agent, unpack(shard, self.columns, idxs is not None))
+
+        if idxs is not None:
+            shards = [torch.zeros_like(td_errors) for _ in range(self.world_size)]
+            dist.gather(td_errors, shards, dst=0)
+
+            with agent.metrics.time('priority_update'):
+                agent.memory.update_priorities(idxs, torch.cat(shards).numpy())
+
+        return td_errors
+
+    def train(self):
+        """agent.train with its updates split across the ranks"""
+        self.start()
+
+        try:
+            scores = self.agent.train()
+        except BaseException:
+            self.stop(graceful=False)
+            raise
+
+        self.stop()
+
+        return scores
@@ -0,0 +1,126 @@
+import numpy as np
+import torch.multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from common import NumpyPolicy
+from common.utils import vector_episode_scores
+
+
+def run_episodes(env_fn, policy, num_episodes, max_steps, seed):
+    """Evaluation worker: greedy scores of num_episodes episodes on a new
+    env, acting with a NumPy snapshot of the policy (no torch involved)"""
+    env = env_fn()
+
+    if seed is not None and hasattr(env, 'seed'):
+        env.seed(seed)
+
+    scores = []
+
+    if hasattr(env, 'num_envs'):
+        # Vectorized: copies reset themselves, their time limit applies
+        scores = vector_episode_scores(env,
+                                       lambda states: policy.act(states, greedy=True),
+                                       num_episodes)
+    else:
+        for _ in range(num_episodes):
+            state = env.reset()
+            score = 0
+
+            for _ in range(max_steps):
+                state, reward, done, _ = env.step(policy.act(state, greedy=True))
+                score += reward
+
+                if done: break
+
+            scores.append(score)
+
+    env.close()
+
+    return scores
+
+
+class Evaluator:
+    """Runs the solve check in the background while training goes on.
+
+    submit takes a NumPy snapshot of the policy and splits num_episodes
+    greedy episodes across num_workers processes, each with its own env
+    from env_fn. poll returns the average score once every worker is done.
+    One evaluation runs at a time, submitting while one is in flight does
+    nothing.
+
+    Args:
+        env_fn (callable): picklable no-args function returning the env
+        num_workers (int)
+        num_episodes (int): episodes per evaluation
+        max_steps (int): episode length limit (single envs)
+        seed (int): evaluation envs are seeded from it, if they can be
+    """
+    def __init__(self, env_fn, num_workers, num_episodes, max_steps, seed=None):
+        self.env_fn = env_fn
+        self.num_workers = num_workers
+        self.num_episodes = num_episodes
+        self.max_steps = max_steps
+        self.seed = seed
+
+        self.pool = ProcessPoolExecutor(num_workers, mp_context=mp.get_context('spawn'))
+
+        self.futures = []
+        self.episode = None # training episode the running evaluation was submitted at
+        self.evaluations = 0
+
+    @property
+    def running(self):
+        return len(self.futures) > 0
+
+    def submit(self, policy, episode):
+        """Starts evaluating a snapshot of policy (CategoricalPolicy)
+
+        Returns:
+            bool: False if an evaluation is already running
+        """
+        if self.running:
+            return False
+
+        snapshot = NumpyPolicy.from_policy(policy)
+
+        # Episodes spread as evenly as possible across the workers
+        chunks = np.array_split(np.arange(self.num_episodes), self.num_workers)
+
+        for i, chunk in enumerate(chunks):
+            if len(chunk) == 0:
+                continue
+
+            seed = None if self.seed is None else self.seed + 1000 * self.evaluations + i
+
+            self.futures.append(self.pool.submit(run_episodes,
+                                                 self.env_fn,
+                                                 snapshot,
+                                                 len(chunk),
+                                                 self.max_steps,
+                                                 seed))
+
+        self.episode = episode
+        self.evaluations += 1
+
+        return True
+
+    def poll(self):
+        """Result of the running evaluation if it's over, without blocking
+
+        Returns:
+            tuple: (episode, avg_score), or None
+        """
+        if not self.running or not all(future.done() for future in self.futures):
+            return None
+
+        scores = [score for future in self.futures for score in future.result()]
+        self.futures = []
+
+        return self.episode, float(np.mean(scores))
+
+    def close(self):
+        for future in self.futures:
+            future.cancel()
+
+        self.futures = []
+        self.pool.shutdown(wait=False)
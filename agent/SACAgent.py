@@ -1,10 +1,14 @@
+import warnings
 import torch
 import torch.nn.functional as F
 from torch.nn.utils import clip_grad_norm_
 import numpy as np
 from agent import Agent
-from common import CategoricalPolicy, Critic
-from common.utils import device, soft_update, make_experience, from_experience
+from common import CategoricalPolicy, CriticEnsemble, NumpyPolicy, Encoder, ICM, RND, EpisodicMemory
+from common.utils import device, soft_update
+
+# inference_mode only exists in newer torch, no_grad does the job otherwise
+inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
 
 
 class SACAgent(Agent):
@@ -23,7 +27,37 @@ class SACAgent(Agent):
     def __init__(self, config):
         super().__init__(config)
 
-        self.policy = CategoricalPolicy(config.state_size,
+        # Heads see the encoder features instead of the raw states
+        head_size = config.state_size
+
+        if config.use_encoder:
+            if config.act_numpy or config.eval_workers > 0:
+                raise ValueError('NumPy policy snapshots (act_numpy, eval_workers) don\'t include the encoder')
+
+            self.encoder = Encoder(config.state_size,
+                                   config.encoder_feature_size,
+                                   config.hidden_encoder,
+                                   config.activ_encoder,
+                                   config.encoder_obs_shape,
+                                   config.encoder_conv)
+
+            self.encoder_target = Encoder(config.state_size,
+                                          config.encoder_feature_size,
+                                          config.hidden_encoder,
+                                          config.activ_encoder,
+                                          config.encoder_obs_shape,
+                                          config.encoder_conv)
+
+            self.encoder_target.load_state_dict(self.encoder.state_dict())
+
+            self.encoder_optim = config.optim_encoder(self.encoder.parameters(),
+                                                      lr=config.lr_encoder)
+
+            head_size = config.encoder_feature_size
+        else:
+            self.encoder = None
+
+        self.policy = CategoricalPolicy(head_size,
                                         config.action_size, 
                                         config.hidden_actor, 
                                         config.activ_actor)
@@ -31,35 +65,22 @@ class SACAgent(Agent):
         self.policy_optim = config.optim_actor(self.policy.parameters(),
                                                lr=config.lr_actor)
 
-        self.Q1_local = Critic(config.state_size,
-                               config.action_size,
-                               config.hidden_critic,
-                               config.activ_critic)
-
-        self.Q1_target = Critic(config.state_size,
-                                config.action_size,
-                                config.hidden_critic,
-                                config.activ_critic)
-
-        self.Q1_target.load_state_dict(self.Q1_local.state_dict())
-
-        self.Q1_optim = config.optim_critic(self.Q1_local.parameters(),
-                                            lr=config.lr_critic)
+        self.Q_local = CriticEnsemble(head_size,
+                                      config.action_size,
+                                      config.hidden_critic,
+                                      config.activ_critic,
+                                      config.num_critics)
 
-        self.Q2_local = Critic(config.state_size,
-                               config.action_size,
-                               config.hidden_critic,
-                               config.activ_critic)
+        self.Q_target = CriticEnsemble(head_size,
+                                       config.action_size,
+                                       config.hidden_critic,
+                                       config.activ_critic,
+                                       config.num_critics)
 
-        self.Q2_target = Critic(config.state_size,
-                                config.action_size,
-                                config.hidden_critic,
-                                config.activ_critic)
+        self.Q_target.load_state_dict(self.Q_local.state_dict())
 
-        self.Q2_target.load_state_dict(self.Q2_local.state_dict())
-
-        self.Q2_optim = config.optim_critic(self.Q2_local.parameters(),
-                                            lr=config.lr_critic)
+        self.Q_optim = config.optim_critic(self.Q_local.parameters(),
+                                           lr=config.lr_critic)
 
         if config.alpha_auto_tuning:
             # temperature variable to be learned, and its target entropy
@@ -72,144 +93,511 @@ class SACAgent(Agent):
             self.alpha_optim = config.optim_alpha([self.log_alpha], lr=config.lr_alpha)
         else:
             self.alpha = config.alpha
+
+        # Hyperparameters read on every update
+        self.gamma = config.gamma
+        self.tau = config.tau
+        self.use_huber_loss = config.use_huber_loss
+        self.alpha_auto_tuning = config.alpha_auto_tuning
+        self.retain_encoder_graph = config.use_encoder and config.encoder_grad == 'both'
+
+        # Loss functions compiled with a fixed batch_size shape (the shard
+        # size under DataParallelLearner)
+        self.learn_batch_size = config.batch_size
+        self.compiled = {}
+
+        # Averages gradients across data-parallel ranks before every step,
+        # set by DataParallelLearner
+        self.grad_sync = None
+
+        if config.compile_learn:
+            if hasattr(torch, 'compile'):
+                for name in ('critic_loss', 'actor_loss'):
+                    self.compiled[name] = torch.compile(getattr(self, name),
+                                                        mode=config.compile_mode,
+                                                        dynamic=False)
+            else:
+                warnings.warn('torch.compile is not available, learning eagerly')
+
+        self.act_input = torch.zeros((1, config.state_size), device=device)
+        self.numpy_policy = None
+        self.numpy_policy_update = -1
+
+        # Curiosity is learned and rewarded on sampled transitions, n-step
+        # ones would model (s_t, a_t, s_t+n) and add a one-step bonus to R_n
+        if config.n_step > 1 and (config.use_icm or config.use_rnd):
+            raise ValueError('use_icm and use_rnd need one-step transitions (n_step=1)')
+
+        if config.use_icm:
+            self.icm = ICM(config.state_size,
+                           config.action_size,
+                           config.icm_feature_size,
+                           config.hidden_icm,
+                           config.activ_icm,
+                           config.icm_beta)
+
+            self.icm_optim = config.optim_icm(self.icm.parameters(), lr=config.lr_icm)
+        else:
+            self.icm = None
+
+        if config.use_rnd:
+            self.rnd = RND(config.state_size,
+                           config.rnd_feature_size,
+                           config.hidden_rnd,
+                           config.activ_rnd,
+                           config.rnd_obs_clip)
+
+            self.rnd_optim = config.optim_rnd(self.rnd.predictor.parameters(), lr=config.lr_rnd)
+        else:
+            self.rnd = None
+
+        if config.use_episodic:
+            # ICM's features are the embedding when there's an ICM
+            embedding_size = config.icm_feature_size if config.use_icm else config.episodic_embedding_size
+
+            self.episodic = EpisodicMemory(config.state_size,
+                                           embedding_size,
+                                           config.hidden_episodic,
+                                           config.activ_episodic,
+                                           config.episodic_capacity,
+                                           config.episodic_k,
+                                           config.episodic_candidates,
+                                           config.num_envs)
     
     def act(self, state, train=True):
-        # Since there is only one state we're gonna insert a new dimension
-        # so we make it as if it was batch_size=1
-        state = torch.FloatTensor(state).unsqueeze(0).to(device)
+        state = np.asarray(state, dtype=np.float32)
+        batched = state.ndim > 1
 
-        if train:
-            action, _, _ = self.policy.sample_action(state)
-        else:
-            action = self.policy.greedy_action(state)
+        # Greedy acting can go through the NumPy copy of the policy,
+        # re-exported only when the policy changed
+        if not train and self.config.act_numpy:
+            if self.numpy_policy_update != self.p_update:
+                self.numpy_policy = NumpyPolicy.from_policy(self.policy)
+                self.numpy_policy_update = self.p_update
 
-        return action.item()
+            return self.numpy_policy.act(state, greedy=True)
 
-    def update_Q(self,
-                 states,
-                 actions,
-                 next_states,
-                 rewards,
-                 dones):
+        with inference_mode():
+            if batched:
+                state = torch.from_numpy(state).to(device)
+            else:
+                # Since there is only one state we reuse a preallocated
+                # batch_size=1 input instead of building a new tensor
+                self.act_input[0].copy_(torch.from_numpy(state))
+                state = self.act_input
 
-        grad_clip_critic = self.config.grad_clip_critic
-        use_huber_loss = self.config.use_huber_loss
-        gamma = self.config.gamma
-        tau = self.config.tau
+            if self.encoder is not None:
+                state = self.encoder(state)
+
+            action = self.policy.act(state, greedy=not train)
+
+        if batched:
+            # One action per environment copy, shape (N,)
+            return action.cpu().numpy()
 
-        _, next_action_probs, next_log_probs = self.policy.sample_action(next_states)
+        return action.item()
+
+    def episodic_bonus(self, next_states, streams=None):
+        with torch.no_grad():
+            next_states = torch.from_numpy(next_states).to(device)
+
+            # Controllable features when ICM learns them
+            embeddings = self.icm.encoder(next_states) if self.icm is not None else None
+
+            return self.episodic.bonus(next_states, streams, embeddings)
+
+    def critic_loss(self,
+                    states,
+                    actions,
+                    next_states,
+                    rewards,
+                    dones,
+                    weights,
+                    alpha,
+                    discounts=None,
+                    next_target_states=None):
+        """Critic losses, one per critic (num_critics,), and the TD errors
+        (batch_size,), averaged over the ensemble. weights are the
+        importance-sampling weights when replay is prioritized, discounts
+        the stored γ^n of n-step transitions (gamma otherwise). With the
+        shared encoder states are features, and next_target_states the
+        target encoder's features for the target critics"""
+        use_huber_loss = self.use_huber_loss
+        gamma = self.gamma if discounts is None else discounts
 
         with torch.no_grad():
-            Q1_targets_next = self.Q1_target(next_states)
-            Q2_targets_next = self.Q2_target(next_states)
+            next_action_probs, next_log_probs = self.policy.action_probs(next_states)
 
-            Q_targets_next = torch.min(Q1_targets_next, Q2_targets_next)
-            Q_targets_next = Q_targets_next - self.alpha * next_log_probs
+            # Min over the whole ensemble, (batch_size, action_size)
+            if next_target_states is None:
+                next_target_states = next_states
+
+            Q_targets_next, _ = self.Q_target(next_target_states).min(dim=0)
+            Q_targets_next = Q_targets_next - alpha * next_log_probs
 
             # Expectation of Q target
             Q_targets_next = torch.sum(next_action_probs * Q_targets_next, dim=1, keepdim=True)
 
             Q_targets = rewards + (gamma * Q_targets_next) * (1 - dones)
 
-        Q1_expected = self.Q1_local(states).gather(1, actions)
-        Q2_expected = self.Q2_local(states).gather(1, actions)
+        # (num_critics, batch_size, 1)
+        Q_expected = self.Q_local(states)
+        Q_expected = Q_expected.gather(2, actions.expand(Q_expected.shape[0], -1, -1))
+        Q_targets = Q_targets.expand_as(Q_expected)
 
-        # Compute critic loss
+        # Compute critic loss, one per critic
         if use_huber_loss:
-            Q1_loss = F.smooth_l1_loss(Q1_expected, Q_targets)
-            Q2_loss = F.smooth_l1_loss(Q2_expected, Q_targets)
+            Q_losses = F.smooth_l1_loss(Q_expected, Q_targets, reduction='none')
         else:
-            Q1_loss = F.mse_loss(Q1_expected, Q_targets)
-            Q2_loss = F.mse_loss(Q2_expected, Q_targets)
+            Q_losses = F.mse_loss(Q_expected, Q_targets, reduction='none')
 
-        self.value_losses.append(torch.max(Q1_loss, Q2_loss).item())
+        if weights is not None:
+            Q_losses = weights * Q_losses
 
-        # Minimize the loss
-        self.Q1_optim.zero_grad()
-        Q1_loss.backward()
+        td_errors = (Q_expected - Q_targets).detach().abs().mean(dim=0).view(-1)
 
-        if grad_clip_critic is not None:
-            clip_grad_norm_(self.Q1_local.parameters(), grad_clip_critic)
+        return Q_losses.mean(dim=(1, 2)), td_errors
 
-        self.Q1_optim.step()
+    def actor_loss(self, states, alpha):
+        """Policy loss and the expected log-probs (detached)"""
+        action_probs, log_props = self.policy.action_probs(states)
 
-        self.Q2_optim.zero_grad()
-        Q2_loss.backward()
+        # Expectations of entropies
+        log_props = torch.sum(action_probs * log_props, dim=1, keepdim=True)
 
-        if grad_clip_critic is not None:
-            clip_grad_norm_(self.Q2_local.parameters(), grad_clip_critic)
+        # No gradient needed through the critics, only through action_probs
+        with torch.no_grad():
+            Q_pred, _ = self.Q_local(states).min(dim=0)
 
-        self.Q2_optim.step()
+        # Expectations of Q
+        Q_pred = torch.sum(action_probs * Q_pred, dim=1, keepdim=True)
 
-        soft_update(self.Q1_local, self.Q1_target, tau)
-        soft_update(self.Q2_local, self.Q2_target, tau)
+        policy_loss = alpha * log_props - Q_pred
+        policy_loss = policy_loss.mean()
 
-    def update_policy(self, states):
-        grad_clip_actor = self.config.grad_clip_actor
+        return policy_loss, log_props.detach()
 
-        _, action_probs, log_props = self.policy.sample_action(states)
+    def alpha_loss(self, log_props):
+        """Temperature loss from the detached expected log-probs, None
+        without auto-tuning. Kept out of actor_loss, whose graph the policy
+        backward frees"""
+        if not self.alpha_auto_tuning:
+            return None
 
-        # Expectations of entropies
-        log_props = torch.sum(action_probs * log_props, dim=1, keepdim=True)
+        return (-self.log_alpha * (log_props + self.target_entropy)).mean()
+
+    def update_Q(self,
+                 states,
+                 actions,
+                 next_states,
+                 rewards,
+                 dones,
+                 weights=None,
+                 discounts=None,
+                 next_target_states=None):
+        """Updates the critics. Returns the TD errors (batch_size,)"""
+        grad_clip_critic = self.config.grad_clip_critic
 
-        Q1_pred = self.Q1_local(states)
-        Q2_pred = self.Q2_local(states)
+        def backward(Q_losses, td_errors):
+            # Critics don't share parameters, so minimizing the sum
+            # minimizes each loss on its own
+            self.Q_optim.zero_grad()
 
-        Q_pred = torch.min(Q1_pred, Q2_pred)
+            # Features shared with the policy loss keep their graph
+            Q_losses.sum().backward(retain_graph=self.retain_encoder_graph)
 
-        # Expectations of Q
-        Q_pred = torch.sum(action_probs * Q_pred, dim=1, keepdim=True)
+        Q_losses, td_errors = self.run_compiled('critic_loss',
+                                                backward,
+                                                states,
+                                                actions,
+                                                next_states,
+                                                rewards,
+                                                dones,
+                                                weights,
+                                                self.alpha,
+                                                discounts,
+                                                next_target_states)
 
-        policy_loss = self.alpha * log_props - Q_pred
-        policy_loss = policy_loss.mean()
+        self.metrics.add('value_loss', Q_losses.max())
 
-        self.policy_losses.append(policy_loss.item())
+        self.sync_grads(self.Q_local.parameters())
 
-        self.policy_optim.zero_grad()
-        policy_loss.backward()
+        if grad_clip_critic is not None:
+            self.Q_local.clip_grad_norm_(grad_clip_critic)
+
+        self.Q_optim.step()
+
+        soft_update(self.Q_local, self.Q_target, self.tau)
+
+        return td_errors
+
+    def update_policy(self, states):
+        """Updates the policy. Returns the alpha loss, computed from the
+        same forward pass"""
+        grad_clip_actor = self.config.grad_clip_actor
+
+        def backward(policy_loss, log_props):
+            self.policy_optim.zero_grad()
+            policy_loss.backward()
+
+        policy_loss, log_props = self.run_compiled('actor_loss',
+                                                   backward,
+                                                   states,
+                                                   self.alpha)
+
+        self.metrics.add('policy_loss', policy_loss)
+        self.metrics.add('entropy', -log_props.mean())
+
+        self.sync_grads(self.policy.parameters())
 
         if grad_clip_actor is not None:
             clip_grad_norm_(self.policy.parameters(),
                             grad_clip_actor)
 
         self.policy_optim.step()
+        self.p_update += 1
 
-        return log_props.detach()
-
-    def try_update_alpha(self, log_probs):
-        alpha_auto_tuning = self.config.alpha_auto_tuning
-
-        if alpha_auto_tuning:
-            alpha_loss = -self.log_alpha * (log_probs + self.target_entropy)
-            alpha_loss = alpha_loss.mean()
+        return self.alpha_loss(log_props)
 
+    def try_update_alpha(self, alpha_loss):
+        if alpha_loss is not None:
             self.alpha_optim.zero_grad()
             alpha_loss.backward()
+            self.sync_grads([self.log_alpha])
             self.alpha_optim.step()
 
             self.alpha = self.log_alpha.detach().exp()
 
+        self.metrics.add('alpha', self.alpha)
+
+    def encode(self, states, next_states):
+        """Encodes the batch once for every head
+        Returns:
+            features for the critics, for the policy, of next_states, and of
+            next_states by the target encoder
+        """
+        encoder_grad = self.config.encoder_grad
+
+        if encoder_grad == 'none':
+            with torch.no_grad():
+                features = self.encoder(states)
+        else:
+            self.encoder_optim.zero_grad()
+            features = self.encoder(states)
+
+        with torch.no_grad():
+            next_features = self.encoder(next_states)
+            next_target_features = self.encoder_target(next_states)
+
+        critic_features = features if encoder_grad in ('critic', 'both') else features.detach()
+        policy_features = features if encoder_grad in ('actor', 'both') else features.detach()
+
+        return critic_features, policy_features, next_features, next_target_features
+
+    def update_encoder(self):
+        """Steps the encoder with the gradients of the losses it's trained
+        by, then tracks it with the target encoder"""
+        if self.config.encoder_grad != 'none':
+            self.sync_grads(self.encoder.parameters())
+            self.encoder_optim.step()
+
+        soft_update(self.encoder, self.encoder_target, self.tau)
+
+    def sync_grads(self, parameters):
+        if self.grad_sync is not None:
+            self.grad_sync(parameters)
+
+    def run_compiled(self, name, backward, states, *args):
+        """Runs the loss function name, through its compiled version when
+        compile_learn is on and the batch has the fixed batch_size shape,
+        eagerly otherwise, then backward on its outputs. Falls back to eager
+        for good if compiling, or the compiled backward, fails
+        Returns:
+            the outputs of the loss function
+        """
+        compiled = self.compiled.get(name)
+
+        if compiled is not None and states.shape[0] == self.learn_batch_size:
+            try:
+                outputs = compiled(states, *args)
+                backward(*outputs)
+                return outputs
+            except Exception as e:
+                warnings.warn('Compiled {} failed, falling back to eager: {}'.format(name, e))
+                self.compiled = {}
+
+        outputs = getattr(self, name)(states, *args)
+        backward(*outputs)
+
+        return outputs
+
+    def update_curiosity(self, states, actions, rewards, next_states):
+        """Trains the curiosity modules on the minibatch and returns the
+        rewards mixed with their bonus, from the same forward passes"""
+        extrinsic_coef = self.config.extrinsic_coef
+        intrinsic_coef = self.config.intrinsic_coef
+
+        intrinsic_rewards = 0
+
+        if self.icm is not None:
+            icm_rewards, icm_loss = self.icm(states, actions, next_states)
+
+            self.icm_optim.zero_grad()
+            icm_loss.backward()
+            self.sync_grads(self.icm.parameters())
+            self.icm_optim.step()
+
+            intrinsic_rewards = intrinsic_rewards + icm_rewards.detach()
+
+        if self.rnd is not None:
+            rnd_rewards, rnd_loss = self.rnd(next_states)
+
+            self.rnd_optim.zero_grad()
+            rnd_loss.backward()
+            self.rnd_optim.step()
+
+            intrinsic_rewards = intrinsic_rewards + rnd_rewards
+
+        return extrinsic_coef * rewards + intrinsic_coef * intrinsic_rewards
+
     def learn(self, experiences):
+        metrics = self.metrics
+
+        # The replay buffer hands over CPU tensors
+        with metrics.time('transfer'):
+            experiences = [e.to(device, non_blocking=True) if isinstance(e, torch.Tensor) else e \
+                           for e in experiences]
+
         (states, 
          actions, 
          rewards, 
          next_states, 
-         dones) = from_experience(experiences)
+         dones) = experiences[:5]
+
+        # n-step transitions come with their discount
+        num_fields = 6 if self.memory.discounted else 5
+        discounts = experiences[5] if self.memory.discounted else None
+
+        # Prioritized replay also returns the IS weights and sampled slots
+        weights, idxs = experiences[num_fields:] if len(experiences) > num_fields else (None, None)
+
+        if self.icm is not None or self.rnd is not None:
+            with metrics.time('curiosity_update'):
+                rewards = self.update_curiosity(states, actions, rewards, next_states)
+
+        # Raw states go to the curiosity modules, features to the heads
+        if self.encoder is not None:
+            with metrics.time('encode'):
+                (critic_states,
+                 policy_states,
+                 next_states,
+                 next_target_states) = self.encode(states, next_states)
+        else:
+            critic_states = policy_states = states
+            next_target_states = None
         
-        self.update_Q(states, 
-                      actions, 
-                      next_states, 
-                      rewards, 
-                      dones)
+        with metrics.time('critic_update'):
+            td_errors = self.update_Q(critic_states, 
+                                      actions, 
+                                      next_states, 
+                                      rewards, 
+                                      dones,
+                                      weights,
+                                      discounts,
+                                      next_target_states)
+
+        if idxs is not None:
+            with metrics.time('priority_update'):
+                self.memory.update_priorities(idxs, td_errors.cpu().numpy())
         
-        log_props = self.update_policy(states)
+        with metrics.time('policy_update'):
+            alpha_loss = self.update_policy(policy_states)
+
+        if self.encoder is not None:
+            with metrics.time('encoder_update'):
+                self.update_encoder()
         
-        self.try_update_alpha(log_props)
+        with metrics.time('alpha_update'):
+            self.try_update_alpha(alpha_loss)
+
+        return td_errors
+
+    def training_state(self):
+        state = super().training_state()
+
+        state.update({'policy': self.policy.state_dict(),
+                      'policy_optim': self.policy_optim.state_dict(),
+                      'Q_local': self.Q_local.state_dict(),
+                      'Q_target': self.Q_target.state_dict(),
+                      'Q_optim': self.Q_optim.state_dict()})
+
+        if self.encoder is not None:
+            state['encoder'] = self.encoder.state_dict()
+            state['encoder_target'] = self.encoder_target.state_dict()
+            state['encoder_optim'] = self.encoder_optim.state_dict()
+
+        if self.config.alpha_auto_tuning:
+            state['log_alpha'] = self.log_alpha
+            state['alpha_optim'] = self.alpha_optim.state_dict()
+
+        if self.icm is not None:
+            state['icm'] = self.icm.state_dict()
+            state['icm_optim'] = self.icm_optim.state_dict()
+
+        if self.rnd is not None:
+            state['rnd'] = self.rnd.state_dict()
+            state['rnd_optim'] = self.rnd_optim.state_dict()
+
+        if self.episodic is not None:
+            state['episodic'] = self.episodic.state_dict()
+
+        return state
+
+    def load_training_state(self, state):
+        super().load_training_state(state)
+
+        self.policy.load_state_dict(state['policy'])
+        self.policy_optim.load_state_dict(state['policy_optim'])
+        self.Q_local.load_state_dict(state['Q_local'])
+        self.Q_target.load_state_dict(state['Q_target'])
+        self.Q_optim.load_state_dict(state['Q_optim'])
+
+        if self.encoder is not None:
+            self.encoder.load_state_dict(state['encoder'])
+            self.encoder_target.load_state_dict(state['encoder_target'])
+            self.encoder_optim.load_state_dict(state['encoder_optim'])
+
+        if self.config.alpha_auto_tuning:
+            with torch.no_grad():
+                self.log_alpha.copy_(state['log_alpha'])
+            self.alpha_optim.load_state_dict(state['alpha_optim'])
+            self.alpha = self.log_alpha.detach().exp()
+
+        if self.icm is not None:
+            self.icm.load_state_dict(state['icm'])
+            self.icm_optim.load_state_dict(state['icm_optim'])
+
+        if self.rnd is not None:
+            self.rnd.load_state_dict(state['rnd'])
+            self.rnd_optim.load_state_dict(state['rnd_optim'])
+
+        if self.episodic is not None:
+            self.episodic.load_state_dict(state['episodic'])
 
     def save_weights(self, path='weights'):
         torch.save(self.policy.state_dict(),
                    '{}/{}_policy_checkpoint.ph'.format(path, self.name))
 
+        # The policy acts on the encoder features
+        if self.encoder is not None:
+            torch.save(self.encoder.state_dict(),
+                       '{}/{}_encoder_checkpoint.ph'.format(path, self.name))
+
+        # RND running stats are buffers, so they go along with the networks
+        if self.rnd is not None:
+            torch.save(self.rnd.state_dict(),
+                       '{}/{}_rnd_checkpoint.ph'.format(path, self.name))
+
     def load_weights(self, path='weights'):
         self.policy.\
             load_state_dict(
@@ -217,6 +605,20 @@ class SACAgent(Agent):
                            format(path, self.name),
                            map_location='cpu'))
 
+        if self.encoder is not None:
+            self.encoder.\
+                load_state_dict(
+                    torch.load('{}/{}_encoder_checkpoint.ph'.
+                               format(path, self.name),
+                               map_location='cpu'))
+
+        if self.rnd is not None:
+            self.rnd.\
+                load_state_dict(
+                    torch.load('{}/{}_rnd_checkpoint.ph'.
+                               format(path, self.name),
+                               map_location='cpu'))
+
     def summary(self, agent_name='SAC [discrete] Agent'):
         print('{}:'.format(agent_name))
         print('==========')
@@ -227,4 +629,4 @@ class SACAgent(Agent):
         print('')
         print('Q Network:')
         print('----------')
-        print(self.Q1_local)
\ No newline at end of file
+        print(self.Q_local)
\ No newline at end of file
@@ -0,0 +1,260 @@
+import os
+import time
+import random
+import itertools
+import contextlib
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from common import Config, Metrics
+from .SACAgent import SACAgent
+
+
+def grid_search(space):
+    """Every combination of the values in space
+
+    Args:
+        space (dict): {field: [values]}
+    Returns:
+        list of dict
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+def random_search(space, num_samples, seed=None):
+    """num_samples random combinations. A field is drawn from its list of
+    values, or uniformly from a (low, high) tuple, log-uniformly from a
+    (low, high, 'log') one
+
+    Args:
+        space (dict)
+        num_samples (int)
+        seed (int)
+    Returns:
+        list of dict
+    """
+    rng = random.Random(seed)
+    trials = []
+
+    for _ in range(num_samples):
+        params = {}
+
+        for name, values in space.items():
+            if isinstance(values, tuple) and len(values) == 3 and values[2] == 'log':
+                params[name] = float(np.exp(rng.uniform(np.log(values[0]), np.log(values[1]))))
+            elif isinstance(values, tuple):
+                params[name] = rng.uniform(values[0], values[1])
+            else:
+                params[name] = rng.choice(values)
+
+        trials.append(params)
+
+    return trials
+
+def init_worker(shares, threads):
+    """Pool initializer: pins the worker to its own share of the cores and
+    sizes torch's intra-op pool to it"""
+    cores = shares.get()
+
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+    torch.set_num_threads(threads)
+
+def run_trial(trial):
+    """Trains one agent (in a pool worker) and returns its result row"""
+    trial_id, params, seed, settings, env_fn, agent_cls, log_dir, run_dir = trial
+
+    config = Config.from_dict({**settings, **params, 'seed': seed})
+    config.env_fn = env_fn
+    config.env = env_fn()
+
+    # Runs go in parallel, each writes its files to its own directory
+    trial_dir = os.path.join(run_dir, 'trial_{}_seed_{}'.format(trial_id, seed))
+    os.makedirs(trial_dir, exist_ok=True)
+
+    config.weights_dir = trial_dir
+
+    if config.replay_dir is not None:
+        config.replay_dir = os.path.join(trial_dir, 'replay')
+
+    if config.checkpoint_dir is not None:
+        config.checkpoint_dir = os.path.join(trial_dir, 'checkpoints')
+
+    if config.metrics_path is not None:
+        config.metrics_path = os.path.join(trial_dir, os.path.basename(config.metrics_path))
+
+    # Workers print on top of each other, each gets its own log (or none)
+    if log_dir is None:
+        log = open(os.devnull, 'w')
+    else:
+        os.makedirs(log_dir, exist_ok=True)
+        log = open(os.path.join(log_dir, 'trial_{}_seed_{}.log'.format(trial_id, seed)), 'w')
+
+    start = time.time()
+
+    with log, contextlib.redirect_stdout(log):
+        agent = agent_cls(config)
+        agent.train()
+
+    return dict(trial=trial_id,
+                seed=seed,
+                **params,
+                episodes=agent.episode,
+                best_score=float(agent.best_score),
+                avg_score=float(agent.avg_score),
+                solved=agent.solved_episode is not None,
+                solved_episode=agent.solved_episode,
+                time_to_solve=agent.solve_time,
+                time=time.time() - start)
+
+
+class Sweep:
+    """Hyperparameter sweep and multi-seed runner.
+
+    Every combination of the search space (grid or random search over
+    Config fields) is trained once per seed in a pool of num_workers
+    processes. The available cores are split between the workers: each is
+    pinned to its share (where the OS supports affinity) and runs torch
+    with as many intra-op threads, so runs don't fight over cores.
+
+    Results are appended to results_path as runs finish (JSONL, or CSV for
+    a .csv path) and aggregated over seeds by run().
+
+    Args:
+        config (Config): base settings, must be serializable (to_dict)
+        env_fn (callable): picklable no-args function returning the env
+        space (dict): {field: values}, see grid_search and random_search
+        seeds (list of int)
+        search (str): 'grid' or 'random'
+        num_samples (int): combinations drawn by random search
+        num_workers (int): parallel runs, defaults to one per core (at most
+            one per run)
+        threads_per_worker (int): defaults to the cores left per worker
+        agent_cls (type): defaults to SACAgent
+        results_path (str): optional JSONL/CSV file
+        log_dir (str): optional directory for the console output of each run
+        run_dir (str): every run saves its weights (and replay, checkpoints
+            and metrics, if the config has them) in its own
+            trial_{id}_seed_{seed} subdirectory of run_dir
+    """
+    def __init__(self,
+                 config,
+                 env_fn,
+                 space,
+                 seeds=(0,),
+                 search='grid',
+                 num_samples=10,
+                 num_workers=None,
+                 threads_per_worker=None,
+                 agent_cls=SACAgent,
+                 results_path=None,
+                 log_dir=None,
+                 run_dir='sweep'):
+        self.settings = config.to_dict()
+        self.env_fn = env_fn
+        self.seeds = list(seeds)
+        self.agent_cls = agent_cls
+        self.log_dir = log_dir
+        self.run_dir = run_dir
+
+        if search == 'grid':
+            self.params = grid_search(space)
+        elif search == 'random':
+            self.params = random_search(space, num_samples, self.seeds[0])
+        else:
+            raise ValueError("search must be 'grid' or 'random', got {}".format(search))
+
+        if hasattr(os, 'sched_getaffinity'):
+            self.cores = sorted(os.sched_getaffinity(0))
+        else:
+            self.cores = list(range(os.cpu_count() or 1))
+
+        num_runs = len(self.params) * len(self.seeds)
+
+        if num_workers is None:
+            num_workers = min(num_runs, len(self.cores) // (threads_per_worker or 1))
+
+        self.num_workers = max(1, num_workers)
+        self.threads = threads_per_worker or max(1, len(self.cores) // self.num_workers)
+
+        results_format = 'csv' if results_path is not None and results_path.endswith('.csv') else 'jsonl'
+        self.results = Metrics(results_path, results_format)
+
+    def trials(self):
+        return [(trial_id, params, seed, self.settings, self.env_fn, self.agent_cls, self.log_dir, self.run_dir)
+                for trial_id, params in enumerate(self.params)
+                for seed in self.seeds]
+
+    def run(self):
+        """Runs every trial and prints the aggregated table
+        Returns:
+            list of dict: one row per combination, best mean score first
+        """
+        ctx = mp.get_context('spawn')
+
+        # One share of cores per worker, picked up by its initializer
+        shares = ctx.Queue()
+        for i in range(self.num_workers):
+            shares.put(self.cores[i * self.threads:(i + 1) * self.threads])
+
+        trials = self.trials()
+        results = []
+
+        print('{} runs ({} combinations x {} seeds), {} workers x {} threads'
+              .format(len(trials), len(self.params), len(self.seeds), self.num_workers, self.threads))
+
+        with ctx.Pool(self.num_workers, initializer=init_worker, initargs=(shares, self.threads)) as pool:
+            for result in pool.imap_unordered(run_trial, trials):
+                results.append(result)
+                self.results.write(result)
+
+                print('Run {}/{} done: trial {} seed {}, best avg score {:.2f}'
+                      .format(len(results), len(trials), result['trial'], result['seed'], result['best_score']))
+
+        rows = self.aggregate(results)
+        self.print_table(rows)
+
+        return rows
+
+    def aggregate(self, results):
+        """Mean (std) over seeds of every combination"""
+        rows = []
+
+        for trial_id, params in enumerate(self.params):
+            runs = [r for r in results if r['trial'] == trial_id]
+
+            if not runs:
+                continue
+
+            best_scores = [r['best_score'] for r in runs]
+            solve_times = [r['time_to_solve'] for r in runs if r['solved']]
+            solved_episodes = [r['solved_episode'] for r in runs if r['solved']]
+
+            rows.append(dict(trial=trial_id,
+                             **params,
+                             runs=len(runs),
+                             best_score=float(np.mean(best_scores)),
+                             best_score_std=float(np.std(best_scores)),
+                             solved=len(solve_times) / len(runs),
+                             time_to_solve=float(np.mean(solve_times)) if solve_times else None,
+                             episodes_to_solve=float(np.mean(solved_episodes)) if solved_episodes else None))
+
+        return sorted(rows, key=lambda row: -row['best_score'])
+
+    def print_table(self, rows):
+        names = list(self.params[0]) if self.params else []
+
+        header = ['trial'] + names + ['runs', 'best score', 'solved', 'time to solve (s)', 'episodes']
+        print('\n' + ' | '.join(header))
+
+        for row in rows:
+            cells = [row['trial']] + [row[name] for name in names]
+            cells += [row['runs'],
+                      '{:.2f} ± {:.2f}'.format(row['best_score'], row['best_score_std']),
+                      '{:.0%}'.format(row['solved']),
+                      '-' if row['time_to_solve'] is None else '{:.0f}'.format(row['time_to_solve']),
+                      '-' if row['episodes_to_solve'] is None else '{:.0f}'.format(row['episodes_to_solve'])]
+
+            print(' | '.join(str(cell) for cell in cells))
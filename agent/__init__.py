@@ -1,2 +1,6 @@
+from .Evaluator import Evaluator
 from .Agent import Agent
-from .SACAgent import SACAgent
\ No newline at end of file
+from .SACAgent import SACAgent
+from .ActorLearner import ActorLearner
+from .DataParallelLearner import DataParallelLearner
+from .Sweep import Sweep
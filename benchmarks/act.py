@@ -0,0 +1,52 @@
+"""Single-observation acting latency: the previous act path (new tensor,
+autograd on, Categorical distribution, log-probs) against SACAgent.act and
+the NumPy policy. Synthetic observations, no env.
+
+    python -m benchmarks.act --state-size 8 --action-size 4
+"""
+import argparse
+import numpy as np
+import torch
+from common import NumpyPolicy
+from common.utils import device
+from agent import SACAgent
+from benchmarks.utils import time_it, make_config
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--state-size', type=int, default=8)
+    parser.add_argument('--action-size', type=int, default=4)
+    parser.add_argument('--hidden', type=int, nargs='+', default=[64, 64])
+    parser.add_argument('--repeats', type=int, default=10000)
+    args = parser.parse_args()
+
+    config = make_config(args.state_size,
+                         args.action_size,
+                         hidden_actor=tuple(args.hidden),
+                         buffer_size=1000)
+
+    agent = SACAgent(config)
+    numpy_policy = NumpyPolicy.from_policy(agent.policy)
+    state = np.random.randn(args.state_size).astype(np.float32)
+
+    def previous_act():
+        state_t = torch.FloatTensor(state).unsqueeze(0).to(device)
+        action, _, _ = agent.policy.sample_action(state_t)
+        return action.item()
+
+    paths = [('previous act', previous_act),
+             ('act', lambda: agent.act(state)),
+             ('act greedy', lambda: agent.act(state, train=False)),
+             ('numpy sample', lambda: numpy_policy.act(state)),
+             ('numpy greedy', lambda: numpy_policy.act(state, greedy=True))]
+
+    print('{:>14} {:>12} {:>10}'.format('path', 'steps/s', 'us/call'))
+
+    for name, fn in paths:
+        time_it(fn, 100) # warm up
+        steps_per_sec, latency = time_it(fn, args.repeats)
+        print('{:>14} {:>12.0f} {:>10.1f}'.format(name, steps_per_sec, latency))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Data-parallel SAC updates on one machine: learn updates/s with 1, 2, 4
+and 8 ranks, on synthetic transitions. The minibatch stays batch_size
+whatever the number of ranks (each one gets batch_size / ranks) and the
+cores are split evenly between the ranks. 1 rank is plain SACAgent.learn.
+
+    python -m benchmarks.data_parallel --batch-size 1024 --hidden-critic 1024 1024
+"""
+import os
+import argparse
+import torch
+from agent import SACAgent, DataParallelLearner
+from benchmarks.utils import time_it, fill, make_config
+
+
+def bench(args, num_ranks):
+    """Returns updates per second"""
+    config = make_config(args.state_size,
+                         args.action_size,
+                         args.batch_size,
+                         tuple(args.hidden_actor),
+                         tuple(args.hidden_critic),
+                         args.buffer_size)
+
+    agent = SACAgent(config)
+    fill(agent.memory, args.buffer_size, args.state_size, args.action_size)
+
+    threads = max(1, (os.cpu_count() or 1) // num_ranks)
+
+    if num_ranks == 1:
+        torch.set_num_threads(threads)
+        learner = None
+        learn = agent.learn
+    else:
+        learner = DataParallelLearner(agent, num_ranks, threads).start()
+        learn = learner.learn
+
+    try:
+        for _ in range(args.warmup):
+            learn(agent.memory.sample())
+
+        return time_it(lambda: learn(agent.memory.sample()), args.updates)[0]
+    finally:
+        if learner is not None:
+            learner.stop()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ranks', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--state-size', type=int, default=8)
+    parser.add_argument('--action-size', type=int, default=4)
+    parser.add_argument('--hidden-actor', type=int, nargs='+', default=[256, 256])
+    parser.add_argument('--hidden-critic', type=int, nargs='+', default=[256, 256])
+    parser.add_argument('--buffer-size', type=int, default=int(1e5))
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    print('{:>6} {:>8} {:>10} {:>10}'.format('ranks', 'threads', 'updates/s', 'speedup'))
+
+    baseline = None
+
+    for num_ranks in args.ranks:
+        updates_per_sec = bench(args, num_ranks)
+        baseline = baseline or updates_per_sec
+
+        print('{:>6} {:>8} {:>10.1f} {:>9.2f}x'.format(num_ranks,
+                                                      max(1, (os.cpu_count() or 1) // num_ranks),
+                                                      updates_per_sec,
+                                                      updates_per_sec / baseline))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Uniform vs prioritized replay: add and sample throughput at several
+fill levels, with synthetic transitions.
+
+    python -m benchmarks.replay --buffer-size 1000000
+"""
+import argparse
+import numpy as np
+from common import ReplayBuffer, PrioritizedReplayBuffer
+from benchmarks.utils import time_it, fill
+
+
+def bench(memory, state_size, repeats):
+    state = np.random.randn(state_size).astype(np.float32)
+    td_errors = np.random.rand(memory.batch_size)
+
+    results = {'add_per_sec': time_it(lambda: memory.add(state, 1, 0., state, False), repeats)[0]}
+
+    if isinstance(memory, PrioritizedReplayBuffer):
+        def sample():
+            experiences = memory.sample()
+            memory.update_priorities(experiences[-1], td_errors)
+    else:
+        sample = memory.sample
+
+    results['sample_per_sec'] = time_it(sample, repeats)[0]
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buffer-size', type=int, default=int(1e6))
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--state-size', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=1000)
+    args = parser.parse_args()
+
+    buffers = {'uniform': ReplayBuffer(args.buffer_size, args.batch_size, args.state_size),
+               'prioritized': PrioritizedReplayBuffer(args.buffer_size, args.batch_size, args.state_size)}
+
+    print('{:>12} {:>10} {:>12} {:>14}'.format('buffer', 'fill', 'add/s', 'sample/s'))
+
+    for fraction in (0.01, 0.1, 0.5, 1.0):
+        for name, memory in buffers.items():
+            fill(memory, int(args.buffer_size * fraction) - len(memory), args.state_size)
+
+            results = bench(memory, args.state_size, args.repeats)
+
+            print('{:>12} {:>10} {:>12.0f} {:>14.0f}'.format(name,
+                                                             len(memory),
+                                                             results['add_per_sec'],
+                                                             results['sample_per_sec']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Benchmark suite for the hot paths, on synthetic transitions (no gym, no
+Unity): replay add/sample (and the legacy from_experience batching) at
+several fill levels, SACAgent.learn updates/s across batch and hidden
+sizes (eager and, with --compile, compiled; with --encoder, also through
+the shared encoder, e.g. with a large --state-size), and act calls/s.
+
+Results are written as JSON. Given a baseline, every throughput that
+dropped by more than --tolerance is reported and the exit code is 1.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+import sys
+import json
+import random
+import platform
+import itertools
+import argparse
+import numpy as np
+import torch
+from common import ReplayBuffer
+from common.utils import device, make_experience, from_experience
+from agent import SACAgent
+from benchmarks.utils import time_it, fill, make_config
+
+
+def bench_replay(args, results):
+    state_size = args.state_size
+    memory = ReplayBuffer(args.buffer_size, args.batch_size, state_size)
+    state = np.random.randn(state_size).astype(np.float32)
+
+    for fill_level in args.fill_levels:
+        if fill_level > args.buffer_size:
+            continue
+
+        fill(memory, fill_level - len(memory), state_size)
+
+        key = 'replay/{{}}/fill={}'.format(fill_level)
+
+        results[key.format('add')] = time_it(lambda: memory.add(state, 1, 0., state, False),
+                                             args.repeats)[0]
+        results[key.format('sample')] = time_it(memory.sample, args.repeats)[0]
+
+        # Previous batching: namedtuples stacked with np.vstack
+        idxs = np.random.randint(0, len(memory), size=args.batch_size)
+        experiences = [make_experience(memory.states[i],
+                                       memory.actions[i],
+                                       memory.rewards[i],
+                                       memory.next_states[i],
+                                       memory.dones[i]) for i in idxs]
+
+        def legacy_sample():
+            from_experience(random.sample(experiences, k=len(experiences)))
+
+        results[key.format('from_experience')] = time_it(legacy_sample, args.repeats)[0]
+
+def bench_learn(args, results):
+    modes = (False, True) if args.compile else (False,)
+    encoders = (False, True) if args.encoder else (False,)
+
+    for batch_size in args.batch_sizes:
+        for hidden in args.hidden_sizes:
+            for compile_learn, use_encoder in itertools.product(modes, encoders):
+                config = make_config(args.state_size,
+                                     args.action_size,
+                                     batch_size,
+                                     hidden_actor=hidden,
+                                     hidden_critic=hidden,
+                                     buffer_size=args.learn_buffer_size)
+                config.compile_learn = compile_learn
+                config.use_encoder = use_encoder
+
+                agent = SACAgent(config)
+                fill(agent.memory, args.learn_buffer_size, args.state_size, args.action_size)
+
+                def update():
+                    agent.learn(agent.memory.sample())
+
+                # Warm up, compiling takes place here
+                time_it(update, 5)
+
+                key = 'learn/batch={}/hidden={}'.format(batch_size, 'x'.join(map(str, hidden)))
+                if compile_learn:
+                    key += '/compiled'
+                if use_encoder:
+                    key += '/encoder'
+
+                results[key] = time_it(update, args.learn_repeats)[0]
+
+def bench_act(args, results):
+    config = make_config(args.state_size, args.action_size, buffer_size=1000)
+    agent = SACAgent(config)
+
+    state = np.random.randn(args.state_size).astype(np.float32)
+    states = np.random.randn(args.num_envs, args.state_size).astype(np.float32)
+
+    for name, fn in (('act', lambda: agent.act(state)),
+                     ('act_greedy', lambda: agent.act(state, train=False)),
+                     ('act_batch={}'.format(args.num_envs), lambda: agent.act(states))):
+        time_it(fn, 100) # warm up
+        results['act/{}'.format(name)] = time_it(fn, args.repeats)[0]
+
+def compare(results, baseline, tolerance):
+    """Returns the keys whose throughput dropped by more than tolerance"""
+    regressions = []
+
+    for key, value in results.items():
+        if key in baseline and value < (1 - tolerance) * baseline[key]:
+            regressions.append(key)
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suites', nargs='+', default=['replay', 'learn', 'act'])
+    parser.add_argument('--state-size', type=int, default=8)
+    parser.add_argument('--action-size', type=int, default=4)
+    parser.add_argument('--buffer-size', type=int, default=int(1e6))
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--fill-levels', type=int, nargs='+', default=[int(1e3), int(1e4), int(1e5), int(1e6)])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[64, 128, 256])
+    parser.add_argument('--hidden-sizes', type=str, nargs='+', default=['64,64', '256,256'])
+    parser.add_argument('--learn-buffer-size', type=int, default=10000)
+    parser.add_argument('--learn-repeats', type=int, default=100)
+    parser.add_argument('--compile', action='store_true', help='also time the compiled learn step')
+    parser.add_argument('--encoder', action='store_true', help='also time learn with the shared encoder')
+    parser.add_argument('--num-envs', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None)
+    parser.add_argument('--baseline', type=str, default=None)
+    parser.add_argument('--save-baseline', type=str, default=None)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    args.hidden_sizes = [tuple(int(h) for h in hidden.split(',')) for hidden in args.hidden_sizes]
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    suites = {'replay': bench_replay, 'learn': bench_learn, 'act': bench_act}
+
+    results = {}
+
+    for suite in args.suites:
+        suites[suite](args, results)
+
+    report = {'meta': {'python': platform.python_version(),
+                       'torch': torch.__version__,
+                       'numpy': np.__version__,
+                       'device': str(device),
+                       'machine': platform.machine(),
+                       'threads': torch.get_num_threads()},
+              'results': results}
+
+    for key, value in results.items():
+        print('{:<40} {:>14.1f} /s'.format(key, value))
+
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+        regressions = compare(results, baseline, args.tolerance)
+
+        for key in regressions:
+            print('Regression: {} {:.1f} /s (baseline {:.1f} /s)'.format(key,
+                                                                        results[key],
+                                                                        baseline[key]))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
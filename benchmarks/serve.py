@@ -0,0 +1,104 @@
+"""Synthetic load on PolicyServer: num_clients threads send one observation
+at a time (in process, or each over its own socket connection) and wait
+for the action. Reports throughput, p50/p99 latency and the mean batch
+size for every max batch size, 1 being the unbatched baseline.
+
+    python -m benchmarks.serve --clients 64 --max-batch-sizes 1 64
+    python -m benchmarks.serve --checkpoint weights/SAC_policy_checkpoint.ph --mode socket
+"""
+import time
+import argparse
+import threading
+import numpy as np
+from common import CategoricalPolicy, PolicyServer, PolicyClient
+from benchmarks.utils import make_config
+
+
+def run_load(server, args):
+    """Returns (requests per second, latencies in seconds)"""
+    latencies = [[] for _ in range(args.clients)]
+    port = server.serve() if args.mode == 'socket' else None
+    barrier = threading.Barrier(args.clients + 1)
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        states = rng.standard_normal((args.requests, server.state_size)).astype(np.float32)
+
+        if port is not None:
+            remote = PolicyClient('127.0.0.1', port)
+            act = remote.act
+        else:
+            act = server.act
+
+        barrier.wait()
+
+        for state in states:
+            start = time.perf_counter()
+            act(state, greedy=args.greedy)
+            latencies[i].append(time.perf_counter() - start)
+
+        if port is not None:
+            remote.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+
+    return args.clients * args.requests / elapsed, np.concatenate(latencies)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkpoint', type=str, default=None, help='policy state_dict, random policy if not given')
+    parser.add_argument('--activ', type=str, default='ReLU')
+    parser.add_argument('--state-size', type=int, default=8)
+    parser.add_argument('--action-size', type=int, default=4)
+    parser.add_argument('--hidden', type=int, nargs='+', default=[64, 64])
+    parser.add_argument('--mode', choices=['queue', 'socket'], default='queue')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=500, help='per client')
+    parser.add_argument('--max-batch-sizes', type=int, nargs='+', default=[1, 16, 64, 256])
+    parser.add_argument('--max-latency-ms', type=float, default=1.)
+    parser.add_argument('--greedy', action='store_true')
+    args = parser.parse_args()
+
+    print('{:>10} {:>12} {:>10} {:>10} {:>10}'.format('max batch', 'requests/s', 'p50 (ms)', 'p99 (ms)', 'batch'))
+
+    for max_batch_size in args.max_batch_sizes:
+        kwargs = dict(max_batch_size=max_batch_size, max_latency=args.max_latency_ms / 1e3)
+
+        if args.checkpoint is not None:
+            server = PolicyServer.from_checkpoint(args.checkpoint, args.activ, **kwargs)
+        else:
+            config = make_config(args.state_size, args.action_size, hidden_actor=tuple(args.hidden))
+            policy = CategoricalPolicy(config.state_size,
+                                       config.action_size,
+                                       config.hidden_actor,
+                                       config.activ_actor)
+            server = PolicyServer(policy, **kwargs)
+
+        server.start()
+
+        try:
+            throughput, latencies = run_load(server, args)
+        finally:
+            server.stop()
+
+        p50, p99 = 1e3 * np.percentile(latencies, [50, 99])
+
+        print('{:>10} {:>12.0f} {:>10.3f} {:>10.3f} {:>10.1f}'.format(max_batch_size,
+                                                                     throughput,
+                                                                     p50,
+                                                                     p99,
+                                                                     server.mean_batch_size))
+
+if __name__ == '__main__':
+    main()
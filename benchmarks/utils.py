@@ -0,0 +1,42 @@
+import time
+import numpy as np
+from common import Config
+
+
+def time_it(fn, repeats):
+    """Calls fn repeats times
+    Returns:
+        Tuple of float: (calls per second, microseconds per call)
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    elapsed = time.perf_counter() - start
+    return repeats / elapsed, 1e6 * elapsed / repeats
+
+def fill(memory, n, state_size, action_size=4, chunk=10000):
+    """Adds n synthetic transitions to memory"""
+    while n > 0:
+        k = min(chunk, n)
+        memory.add_batch(np.random.randn(k, state_size).astype(np.float32),
+                         np.random.randint(0, action_size, size=k),
+                         np.random.randn(k).astype(np.float32),
+                         np.random.randn(k, state_size).astype(np.float32),
+                         np.random.rand(k) < 0.01)
+        n -= k
+
+def make_config(state_size=8,
+                action_size=4,
+                batch_size=128,
+                hidden_actor=(64, 64),
+                hidden_critic=(256, 256),
+                buffer_size=int(1e5)):
+    """Config for synthetic benchmarks (no env)"""
+    config = Config()
+    config.state_size = state_size
+    config.action_size = action_size
+    config.batch_size = batch_size
+    config.hidden_actor = hidden_actor
+    config.hidden_critic = hidden_critic
+    config.buffer_size = buffer_size
+    return config
@@ -39,6 +39,28 @@ class CategoricalPolicy(BaseNetwork):
         action = torch.argmax(action_logits, dim=1, keepdim=True)
         return action
 
+    def act(self, state, greedy=False):
+        """Inference only: actions (batch_size,) without building a
+        distribution or log-probs. Sampling uses the Gumbel-max trick,
+        argmax(logits - log(E)) with E ~ Exp(1)"""
+        action_logits = self.forward(state)
+
+        if not greedy:
+            action_logits = action_logits - torch.empty_like(action_logits).exponential_().log()
+
+        return torch.argmax(action_logits, dim=1)
+
+    def action_probs(self, state, eps=1e-6):
+        """Action probabilities and their logs, without sampling"""
+        action_logits = self.forward(state)
+        action_probs = F.softmax(action_logits, dim=1)
+
+        # Avoid numerical instability.
+        z = (action_probs == 0.0).float() * eps
+        log_action_probs = torch.log(action_probs + z)
+
+        return action_probs, log_action_probs
+
     def sample_action(self, state, eps=1e-6):
         action_logits = self.forward(state)
         action_probs = F.softmax(action_logits, dim=1)
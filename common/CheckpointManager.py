@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import queue
+import threading
+import warnings
+import torch
+
+
+def snapshot(obj):
+    """Deep copy of a (nested) state with every tensor copied to CPU, so it
+    can be written later while training keeps changing the originals"""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+
+class CheckpointManager:
+    """Writes full training snapshots from a background thread.
+
+    save() copies the state to CPU on the caller thread and hands it over
+    to the writer, so no disk I/O happens in the training loop. If a write
+    is still pending when a new snapshot comes in, the older one is dropped.
+    Files are written to a temp file and renamed, so a crash never leaves a
+    half-written checkpoint. Only the last (or best) keep checkpoints stay
+    on disk; an index.json lists them with their score.
+
+    Args:
+        path (str): checkpoints directory
+        name (str): file prefix
+        keep (int): how many checkpoints to keep
+        keep_best (bool): keep the best scoring ones instead of the last
+        min_interval (float): min seconds between two snapshots
+    """
+    index_file = 'index.json'
+
+    def __init__(self,
+                 path,
+                 name='Agent',
+                 keep=3,
+                 keep_best=False,
+                 min_interval=60.):
+        self.path = path
+        self.name = name
+        self.keep = keep
+        self.keep_best = keep_best
+        self.min_interval = min_interval
+
+        os.makedirs(path, exist_ok=True)
+
+        self.checkpoints = self.load_index() # [{'file', 'score', 'step'}], oldest first
+        self.step = max([c['step'] for c in self.checkpoints], default=0)
+        self.last_time = -float('inf')
+
+        self.pending = queue.Queue(maxsize=1)
+        self.lock = threading.Lock()
+        self.error = None # last failed write, raised by wait
+
+        self.writer = None
+        self.start()
+
+    def start(self):
+        self.writer = threading.Thread(target=self.run, daemon=True)
+        self.writer.start()
+
+    def load_index(self):
+        path = os.path.join(self.path, self.index_file)
+
+        if not os.path.exists(path):
+            return []
+
+        with open(path) as f:
+            return json.load(f)
+
+    def write_index(self):
+        path = os.path.join(self.path, self.index_file)
+
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.checkpoints, f)
+        os.replace(path + '.tmp', path)
+
+    def save(self, get_state, score, force=False):
+        """Snapshots the training state, unless rate-limited or (keeping the
+        best) not better than the ones kept
+
+        Args:
+            get_state (callable): returns the state to save
+            score (float)
+            force (bool): ignore min_interval
+        Returns:
+            bool: whether a snapshot was taken
+        """
+        now = time.time()
+
+        if not force and now - self.last_time < self.min_interval:
+            return False
+
+        with self.lock:
+            if self.keep_best and len(self.checkpoints) >= self.keep and \
+               score <= min(c['score'] for c in self.checkpoints):
+                return False
+
+        self.last_time = now
+        self.step += 1
+
+        item = (self.step, float(score), snapshot(get_state()))
+
+        # Closed by a previous training run
+        if self.writer is None:
+            self.start()
+
+        # Latest wins: drop a snapshot still waiting to be written
+        try:
+            self.pending.get_nowait()
+            self.pending.task_done()
+        except queue.Empty:
+            pass
+
+        self.pending.put(item)
+
+        return True
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+
+            # close
+            if item is None:
+                self.pending.task_done()
+                return
+
+            step, score, state = item
+
+            try:
+                self.write(step, score, state)
+            except Exception as e:
+                # Keep the writer alive (wait would block forever otherwise)
+                warnings.warn('Checkpoint {} could not be written: {}'.format(step, e))
+                self.error = e
+            finally:
+                self.pending.task_done()
+
+    def write(self, step, score, state):
+        file = '{}_checkpoint_{:08d}.pt'.format(self.name, step)
+        path = os.path.join(self.path, file)
+
+        torch.save(state, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+        with self.lock:
+            self.checkpoints.append({'file': file, 'score': score, 'step': step})
+
+            if self.keep_best:
+                ranked = sorted(self.checkpoints, key=lambda c: c['score'], reverse=True)
+                kept = ranked[:self.keep]
+            else:
+                kept = self.checkpoints[-self.keep:]
+
+            removed = [c for c in self.checkpoints if c not in kept]
+            self.checkpoints = [c for c in self.checkpoints if c in kept]
+
+            self.write_index()
+
+        for c in removed:
+            try:
+                os.remove(os.path.join(self.path, c['file']))
+            except FileNotFoundError:
+                pass
+
+    def wait(self):
+        """Blocks until every pending snapshot is on disk. Raises the
+        last write error, if any"""
+        self.pending.join()
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError('Writing a checkpoint failed') from error
+
+    def close(self):
+        """Writes what's pending and stops the writer thread"""
+        if self.writer is None:
+            return
+
+        self.pending.put(None)
+        self.writer.join()
+        self.writer = None
+
+    def latest(self):
+        """Path of the most recent checkpoint, None if there's none"""
+        with self.lock:
+            if not self.checkpoints:
+                return None
+            checkpoint = max(self.checkpoints, key=lambda c: c['step'])
+
+        return os.path.join(self.path, checkpoint['file'])
+
+    def best(self):
+        """Path of the best scoring checkpoint, None if there's none"""
+        with self.lock:
+            if not self.checkpoints:
+                return None
+            checkpoint = max(self.checkpoints, key=lambda c: c['score'])
+
+        return os.path.join(self.path, checkpoint['file'])
@@ -1,20 +1,85 @@
+import torch.nn as nn
+import torch.optim as optim
 from torch.nn import ReLU
 from torch.optim import Adam
 
 
 class Config():
-    seed = 0
+    seed = 0 # random, NumPy, torch and env seed, applied by Agent (None to skip)
     env = None
     log_every = 100
 
+    # Vectorized training: when num_envs > 1 (or env is already a vector env,
+    # e.g. from envs), Agent.train steps all the copies together. Otherwise
+    # the vector env is built from env_fn (a no-args callable returning a gym
+    # env). Evaluation runs on a new env from env_fn:
+    num_envs = 1
+    env_fn = None
+    vector_async = False # subprocess-backed vector env (True) or in-process (False)
+
+    # Asynchronous actor/learner split (agent.ActorLearner):
+    num_actors = 4 # acting processes, each with its own env and policy copy
+    broadcast_every = 100 # learner updates between policy weight broadcasts
+    actor_chunk_size = 64 # transitions sent to the learner per message
+
+    # Data-parallel learner (agent.DataParallelLearner):
+    learner_ranks = 2 # processes splitting every minibatch, batch_size must divide evenly
+    learner_threads = None # torch threads per rank, None splits the cores evenly
+
     # When we reach env_solved avarage score (our target score for this environment),
     # we'll run a full evaluation, that means, we're gonna evaluate times_solved #
     # times (this is required to solve the env) and avarage all the rewards:
     env_solved = None
     times_solved = 100
+    # With eval_workers > 0 that evaluation runs in the background, on a
+    # snapshot of the policy split across that many processes (each with an
+    # env from env_fn), while training goes on
+    eval_workers = 0
 
     buffer_size = int(1e6)
     batch_size = 128
+
+    # On-disk replay: when set, the buffer is memory-mapped in this directory
+    # and a restarted run resumes from whatever is already there
+    replay_dir = None
+    replay_flush_every = 10 # episodes between flushes to disk
+
+    # Compact replay: every observation stored once, next_state rebuilt from
+    # the following transition. Breaks in the chain (episode ends) go to a
+    # tail of compact_tail_size observations (None is buffer_size // 64, at least 1024)
+    compact_replay = False
+    compact_tail_size = None
+    # 'float32', 'float16', or 'uint8' quantized between obs_low and obs_high
+    replay_obs_dtype = 'float32'
+    obs_low = None
+    obs_high = None
+
+    weights_dir = 'weights' # where save_weights goes on every new best score
+
+    # Full training checkpoints, written by a background thread. When set,
+    # they replace the synchronous save_weights on every new best score
+    checkpoint_dir = None
+    checkpoint_keep = 3 # how many checkpoints stay on disk
+    checkpoint_keep_best = False # keep the best scoring ones instead of the last
+    checkpoint_min_interval = 60. # min seconds between two snapshots
+
+    # Training metrics, reduced once per episode (common.Metrics)
+    metrics_path = None # optional file the per-episode records are appended to
+    metrics_format = 'jsonl' # 'jsonl' or 'csv'
+    metrics_console = False # print the stage breakdown every log_every episodes
+    profile = False # time the hot-path stages
+    profile_cuda_sync = False # synchronize CUDA around timed stages (slower)
+
+    # Prioritized experience replay
+    prioritized_replay = False
+    per_alpha = 0.6 # how much prioritization is used (0 is uniform)
+    per_beta = 0.4 # importance-sampling correction, annealed to 1
+    per_beta_increment = 1e-5 # added to per_beta for every batch learned from
+    per_eps = 1e-6 # keeps every priority above zero
+
+    # Sample minibatches ahead in a background thread (0 samples inline)
+    prefetch_batches = 0
+
     num_episodes = 2000
     num_updates = 1 # how many updates we want to perform in one learning step
     max_steps = 2000 # max steps done per episode if done is never True
@@ -25,6 +90,9 @@ class Config():
     state_size = None
     action_size = None
     gamma = 0.99 # discount factor
+    # n-step returns, aggregated per env copy when transitions are added
+    # (not with compact_replay, use_icm or use_rnd). 1 is the plain one-step target
+    n_step = 1
     tau = 1e-3 # interpolation param, used in polyak averaging (soft update)
     lr_actor = 3e-4
     lr_critic = 3e-4
@@ -34,12 +102,132 @@ class Config():
     activ_critic = ReLU()
     optim_actor = Adam
     optim_critic = Adam
+    # Shared observation encoder in front of the policy and the critics:
+    # states are encoded once per batch and every head reuses the features,
+    # the target critics get a soft-updated target encoder
+    use_encoder = False
+    encoder_feature_size = 64
+    hidden_encoder = (256,)
+    activ_encoder = ReLU()
+    encoder_obs_shape = None # (C, H, W) for a CNN over flattened image observations
+    encoder_conv = ((32, 8, 4), (64, 4, 2), (64, 3, 1)) # (channels, kernel, stride) per conv layer
+    encoder_grad = 'critic' # losses training the encoder: 'critic', 'actor', 'both' or 'none'
+    optim_encoder = Adam
+    lr_encoder = 3e-4
+
+    act_numpy = False # greedy acting (evaluation) through a NumPy copy of the policy
     grad_clip_actor = None # gradient clipping for actor network
     grad_clip_critic = None # gradient clipping for critic network
     use_huber_loss = False # whether to use huber loss (True) or mse loss (False)
+    num_critics = 2 # size of the critic ensemble (clipped double-Q takes the min)
     update_every = 1 # how many steps before updating networks
 
+    # Adaptive update-to-data ratio, replaces update_every and num_updates:
+    # updates per env step move toward the ratio that spends utd_target_share
+    # of the wall-clock on updates (or toward utd_target_ratio when the share
+    # is None), within [utd_min_ratio, utd_max_ratio] (common.UTDScheduler)
+    utd_adaptive = False
+    utd_target_share = 0.5
+    utd_target_ratio = None
+    utd_min_ratio = 0.1
+    utd_max_ratio = 8.
+    utd_initial_ratio = 1.
+    utd_adjust_every = 1000 # env steps between two decisions
+    utd_smoothing = 0.5 # how far the ratio moves toward its target per decision
+    utd_log_path = None # optional file every decision is appended to, in metrics_format
+
+    # Compile the critic and actor/alpha losses (torch.compile) for the fixed
+    # batch_size shape. Other shapes, or a failed compile, run eagerly
+    compile_learn = False
+    compile_mode = None # torch.compile mode, e.g. 'reduce-overhead'
+
     alpha = 0.01
     alpha_auto_tuning = True # when True, alpha is a learnable
     optim_alpha = Adam # optimizer for alpha
-    lr_alpha = 3e-4 # learning rate for alpha
\ No newline at end of file
+    lr_alpha = 3e-4 # learning rate for alpha
+
+    # Curiosity. Intrinsic rewards are computed in batch on the sampled
+    # minibatch in SACAgent.learn (ICM and RND bonuses add up):
+    #   reward = extrinsic_coef * r_ext + intrinsic_coef * r_int
+    extrinsic_coef = 1.0
+    intrinsic_coef = 0.01
+
+    # Intrinsic Curiosity Module
+    use_icm = False
+    icm_feature_size = 64
+    icm_beta = 0.2 # weight of the forward loss against the inverse loss
+    hidden_icm = (256,)
+    activ_icm = ReLU()
+    optim_icm = Adam
+    lr_icm = 1e-3
+
+    # Random Network Distillation
+    use_rnd = False
+    rnd_feature_size = 64
+    rnd_obs_clip = 5. # normalized observations are clipped to [-clip, clip]
+    hidden_rnd = (256, 256)
+    activ_rnd = ReLU()
+    optim_rnd = Adam
+    lr_rnd = 1e-4
+
+    # Episodic novelty, added to the reward passed to Agent.step:
+    #   reward = r + episodic_coef * bonus
+    # Embeddings come from the ICM encoder when use_icm, from a fixed
+    # random network otherwise
+    use_episodic = False
+    episodic_coef = 0.01
+    episodic_capacity = 2000 # embeddings kept per episode (last ones)
+    episodic_k = 10 # nearest neighbours
+    episodic_candidates = None # approximate search over that many entries, None is exact
+    episodic_embedding_size = 32 # random embedding, icm_feature_size is used with use_icm
+    hidden_episodic = (128,)
+    activ_episodic = ReLU()
+
+    # Live objects that can't be serialized, to be set again after from_dict
+    unserializable = ('env', 'env_fn')
+
+    def to_dict(self):
+        """Plain (JSON-friendly) copy of every setting, class defaults and
+        overrides alike. Activations and optimizers are stored by name
+        (constructor arguments of activations are lost), env and env_fn
+        are left out
+        Returns:
+            dict
+        """
+        settings = {}
+
+        for name in dir(self):
+            if name.startswith('_') or name in self.unserializable or name == 'unserializable':
+                continue
+
+            value = getattr(self, name)
+
+            if isinstance(value, nn.Module):
+                value = type(value).__name__
+            elif isinstance(value, type) and issubclass(value, optim.Optimizer):
+                value = value.__name__
+            elif callable(value):
+                continue
+            elif isinstance(value, tuple):
+                value = list(value)
+
+            settings[name] = value
+
+        return settings
+
+    @classmethod
+    def from_dict(cls, settings):
+        """Config from to_dict's output (or any subset of it)"""
+        config = cls()
+
+        for name, value in settings.items():
+            if name.startswith('activ_') and isinstance(value, str):
+                value = getattr(nn, value)()
+            elif name.startswith('optim_') and isinstance(value, str):
+                value = getattr(optim, value)
+            elif isinstance(value, list):
+                value = tuple(value)
+
+            setattr(config, name, value)
+
+        return config
@@ -0,0 +1,81 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from common.utils import device
+
+
+class CriticEnsemble(nn.Module):
+    """num_critics critics evaluated together. Each layer keeps the weights
+    of all critics stacked as (num_critics, dim_in, dim_out), so the whole
+    ensemble runs as one batched matmul per layer and is trained with a
+    single optimizer. Maps state to Q-values of every critic:
+        Q(s) => (num_critics, batch_size, action_size)
+    """
+    def __init__(self,
+                 state_size,
+                 action_size,
+                 hidden_size,
+                 activ,
+                 num_critics=2):
+        super().__init__()
+
+        self.activ = activ
+        self.num_critics = num_critics
+
+        dims = (state_size,) + hidden_size + (action_size,)
+
+        self.weights = nn.ParameterList([nn.Parameter(torch.empty(num_critics, dim_in, dim_out)) \
+                                         for dim_in, dim_out \
+                                         in zip(dims[:-1], dims[1:])])
+
+        self.biases = nn.ParameterList([nn.Parameter(torch.empty(num_critics, 1, dim_out)) \
+                                        for dim_out in dims[1:]])
+
+        self.reset_parameters()
+        self.to(device)
+
+    def reset_parameters(self):
+        """Same ranges as Critic (BaseNetwork.reset_parameters on top of
+        the default nn.Linear initialization)"""
+        for weight, bias in zip(self.weights, self.biases):
+            dim_in, dim_out = weight.shape[1:]
+
+            lim = 1. / np.sqrt(dim_out)
+            weight.data.uniform_(-lim, lim)
+
+            lim = 1. / np.sqrt(dim_in)
+            bias.data.uniform_(-lim, lim)
+
+        self.weights[-1].data.uniform_(-3e-3, 3e-3)
+
+    def forward(self, state):
+        if type(state) != torch.Tensor:
+            state = torch.FloatTensor(state).to(device)
+
+        # (batch_size, state_size) x (num_critics, state_size, hidden)
+        # broadcasts to (num_critics, batch_size, hidden)
+        x = self.activ(torch.matmul(state, self.weights[0]) + self.biases[0])
+
+        for weight, bias in zip(self.weights[1:-1], self.biases[1:-1]):
+            x = self.activ(torch.baddbmm(bias, x, weight))
+
+        return torch.baddbmm(self.biases[-1], x, self.weights[-1])
+
+    def clip_grad_norm_(self, max_norm, eps=1e-6):
+        """Clips the gradient norm of each critic on its own, as if they
+        were separate modules"""
+        grads = [p.grad for p in self.parameters() if p.grad is not None]
+
+        norms = torch.stack([g.reshape(self.num_critics, -1).pow(2).sum(dim=1) \
+                             for g in grads]).sum(dim=0).sqrt()
+
+        clip_coef = (max_norm / (norms + eps)).clamp(max=1.0)
+
+        for g in grads:
+            g.mul_(clip_coef.view(-1, *([1] * (g.dim() - 1))))
+
+    def extra_repr(self):
+        dims = [self.weights[0].shape[1]] + [w.shape[2] for w in self.weights]
+        return 'num_critics={}, dims={}, activ={}'.format(self.num_critics,
+                                                          tuple(dims),
+                                                          self.activ)
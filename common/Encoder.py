@@ -0,0 +1,55 @@
+import torch
+import torch.nn as nn
+from common.utils import device, make_mlp
+
+
+class Encoder(nn.Module):
+    """Observation encoder shared by the policy and the critics, so large
+    observations go through one network per batch and every head works on
+    its features. An MLP, or a small CNN when obs_shape is given (flat
+    observations are viewed as (C, H, W)).
+
+    Args:
+        state_size (int)
+        feature_size (int)
+        hidden_size (tuple): MLP hidden layers
+        activ (torch.nn.Module)
+        obs_shape (tuple): (C, H, W) for the CNN, None for the MLP
+        conv (tuple): (channels, kernel, stride) per conv layer
+    """
+    def __init__(self,
+                 state_size,
+                 feature_size,
+                 hidden_size,
+                 activ,
+                 obs_shape=None,
+                 conv=((32, 8, 4), (64, 4, 2), (64, 3, 1))):
+        super().__init__()
+
+        self.obs_shape = tuple(obs_shape) if obs_shape is not None else None
+        self.activ = activ
+
+        if obs_shape is None:
+            self.body = make_mlp((state_size,) + hidden_size + (feature_size,), activ)
+        else:
+            layers = []
+            channels = obs_shape[0]
+
+            for out_channels, kernel, stride in conv:
+                layers += [nn.Conv2d(channels, out_channels, kernel, stride), activ]
+                channels = out_channels
+
+            layers.append(nn.Flatten())
+
+            with torch.no_grad():
+                conv_size = nn.Sequential(*layers)(torch.zeros((1,) + self.obs_shape)).shape[1]
+
+            self.body = nn.Sequential(*layers, nn.Linear(conv_size, feature_size))
+
+        self.to(device)
+
+    def forward(self, states):
+        if self.obs_shape is not None:
+            states = states.view((-1,) + self.obs_shape)
+
+        return self.activ(self.body(states))
@@ -0,0 +1,172 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from common.utils import device, make_mlp
+from common import RunningMeanStd
+
+
+class EpisodicMemory(nn.Module):
+    """Episodic novelty
+    https://arxiv.org/abs/2002.06038 (Never Give Up)
+    https://arxiv.org/abs/1810.02274 (Episodic Curiosity through Reachability)
+
+    Observations of the current episode are embedded and kept in a memory
+    preallocated per stream (env copy or agent). The bonus of a new
+    observation is 1 / sqrt(sum of kernels over its k nearest neighbours),
+    distances being normalized by their running mean, so it's high for
+    observations far from everything seen in the episode and 0 once they
+    are too familiar (similarity above max_similarity).
+
+    The search is one batched matmul over the memory of every stream. The
+    memory keeps the last capacity embeddings, so a step never costs more
+    than capacity distances; with num_candidates, a random subset of that
+    many entries is searched once the memory is larger (approximate kNN).
+
+    The embedding is a fixed random network, unless another encoder's
+    embeddings (e.g. ICM's) are passed to bonus.
+
+    Args:
+        state_size (int)
+        embedding_size (int)
+        hidden_size (tuple)
+        activ (torch.nn.Module)
+        capacity (int): embeddings kept per stream
+        k (int): nearest neighbours
+        num_candidates (int): entries searched, None for exact search
+        num_streams (int): initial number of streams, grows as needed
+        kernel_eps (float)
+        cluster_distance (float): normalized distances below are zeroed
+        c (float): pseudo-count added to the similarity
+        max_similarity (float): no bonus above
+    """
+    def __init__(self,
+                 state_size,
+                 embedding_size,
+                 hidden_size,
+                 activ,
+                 capacity=2000,
+                 k=10,
+                 num_candidates=None,
+                 num_streams=1,
+                 kernel_eps=1e-3,
+                 cluster_distance=8e-3,
+                 c=1e-3,
+                 max_similarity=8.):
+        super().__init__()
+
+        self.embedding_size = embedding_size
+        self.capacity = capacity
+        self.k = k
+        self.num_candidates = num_candidates
+        self.kernel_eps = kernel_eps
+        self.cluster_distance = cluster_distance
+        self.c = c
+        self.max_similarity = max_similarity
+
+        self.embedding = make_mlp((state_size,) + hidden_size + (embedding_size,), activ)
+
+        for param in self.embedding.parameters():
+            param.requires_grad = False
+
+        self.dist_rms = RunningMeanStd()
+
+        self.to(device)
+
+        # Episode content isn't part of state_dict
+        self.memory = torch.zeros((0, capacity, embedding_size), device=device)
+        self.sq_norms = torch.zeros((0, capacity), device=device)
+        self.counts = np.zeros(0, dtype=np.int64) # observations seen per stream
+
+        self.grow(num_streams)
+
+    def grow(self, num_streams):
+        n = num_streams - len(self.counts)
+
+        if n <= 0:
+            return
+
+        self.memory = torch.cat([self.memory,
+                                 torch.zeros((n, self.capacity, self.embedding_size), device=device)])
+        self.sq_norms = torch.cat([self.sq_norms, torch.zeros((n, self.capacity), device=device)])
+        self.counts = np.concatenate([self.counts, np.zeros(n, dtype=np.int64)])
+
+    def reset(self, streams=None):
+        """Forgets the episode of streams (all of them by default)"""
+        if streams is None:
+            self.counts[:] = 0
+        else:
+            self.counts[streams] = 0
+
+    @torch.no_grad()
+    def bonus(self, states=None, streams=None, embeddings=None):
+        """Novelty of a batch of observations (one per stream) against the
+        memory of their stream, which they are added to afterwards
+
+        Args:
+            states (torch.Tensor): (N, state_size)
+            streams (np.ndarray): (N,) distinct stream ids, default the row
+            embeddings (torch.Tensor): (N, embedding_size), used instead of
+                embedding states when given
+        Returns:
+            np.ndarray: (N,) bonuses, 0 while a memory is empty
+        """
+        if embeddings is None:
+            embeddings = self.embedding(states)
+
+        n = len(embeddings)
+        streams = np.arange(n) if streams is None else np.asarray(streams, dtype=np.int64)
+
+        if streams.max() >= len(self.counts):
+            self.grow(streams.max() + 1)
+
+        filled = np.minimum(self.counts[streams], self.capacity)
+        size = int(filled.max())
+
+        bonuses = torch.zeros(n, device=device)
+        rows = torch.from_numpy(streams).to(device)
+        sq_norms = embeddings.pow(2).sum(dim=1)
+
+        if size > 0:
+            if self.num_candidates is not None and size > self.num_candidates:
+                # Without replacement, a slot counted twice would skew the kNN
+                slots = torch.randperm(size, device=device)[:self.num_candidates]
+            else:
+                slots = torch.arange(size, device=device)
+
+            memory = self.memory[rows[:, None], slots[None]] # (N, C, E)
+
+            # |m - e|^2 = |m|^2 - 2 m.e + |e|^2, for all entries at once
+            distances = self.sq_norms[rows[:, None], slots[None]] \
+                        - 2 * torch.bmm(memory, embeddings.unsqueeze(2)).squeeze(2) \
+                        + sq_norms.unsqueeze(1)
+            distances = distances.clamp(min=0)
+
+            valid = slots.unsqueeze(0) < torch.from_numpy(filled).to(device).unsqueeze(1)
+            distances = distances.masked_fill(~valid, float('inf'))
+
+            knn = distances.topk(min(self.k, len(slots)), dim=1, largest=False).values
+            found = torch.isfinite(knn)
+
+            self.dist_rms.update(knn[found])
+
+            normalized = knn / (self.dist_rms.mean + 1e-8)
+            normalized = (normalized - self.cluster_distance).clamp(min=0)
+
+            kernels = self.kernel_eps / (normalized + self.kernel_eps)
+            kernels = kernels.masked_fill(~found, 0.)
+
+            similarity = torch.sqrt(kernels.sum(dim=1)) + self.c
+
+            bonuses = torch.where(similarity > self.max_similarity,
+                                  torch.zeros_like(similarity),
+                                  1. / similarity)
+            bonuses = bonuses.masked_fill(~found.any(dim=1), 0.)
+
+        # Oldest entry is overwritten once the memory is full
+        positions = torch.from_numpy(self.counts[streams] % self.capacity).to(device)
+
+        self.memory[rows, positions] = embeddings
+        self.sq_norms[rows, positions] = sq_norms
+        self.counts[streams] += 1
+
+        return bonuses.cpu().numpy()
@@ -0,0 +1,58 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from common.utils import device, make_mlp
+
+
+class ICM(nn.Module):
+    """Intrinsic Curiosity Module
+    https://arxiv.org/abs/1705.05363
+
+    Feature encoder φ, forward model (φ(s), a) => φ(s') and inverse model
+    (φ(s), φ(s')) => a. The forward model error is the curiosity bonus.
+    Features are learned by the inverse model only.
+    """
+    def __init__(self,
+                 state_size,
+                 action_size,
+                 feature_size,
+                 hidden_size,
+                 activ,
+                 beta=0.2):
+        super().__init__()
+
+        self.action_size = action_size
+        self.beta = beta
+
+        self.encoder = make_mlp((state_size,) + hidden_size + (feature_size,), activ)
+
+        self.forward_model = make_mlp((feature_size + action_size,) + hidden_size + (feature_size,),
+                                      activ)
+
+        self.inverse_model = make_mlp((2 * feature_size,) + hidden_size + (action_size,),
+                                      activ)
+
+        self.to(device)
+
+    def forward(self, states, actions, next_states):
+        """Runs the whole module once on a batch
+        Returns:
+            forward_errors (torch.Tensor): (batch_size, 1), the intrinsic rewards
+            loss (torch.Tensor): weighted forward and inverse loss
+        """
+        phi = self.encoder(states)
+        phi_next = self.encoder(next_states)
+
+        actions = actions.view(-1)
+        actions_onehot = F.one_hot(actions, self.action_size).float()
+
+        phi_next_pred = self.forward_model(torch.cat([phi.detach(), actions_onehot], dim=1))
+
+        forward_errors = 0.5 * (phi_next_pred - phi_next.detach()).pow(2).sum(dim=1, keepdim=True)
+
+        action_logits = self.inverse_model(torch.cat([phi, phi_next], dim=1))
+        inverse_loss = F.cross_entropy(action_logits, actions)
+
+        loss = (1 - self.beta) * inverse_loss + self.beta * forward_errors.mean()
+
+        return forward_errors, loss
@@ -0,0 +1,176 @@
+import os
+import csv
+import json
+import time
+import torch
+from collections import defaultdict
+
+
+class Timer:
+    """Adds the wall-clock time spent in a `with` block to a stage"""
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        if self.metrics.cuda_sync:
+            torch.cuda.synchronize()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        if self.metrics.cuda_sync:
+            torch.cuda.synchronize()
+        self.metrics.times[self.stage] += time.perf_counter() - self.start
+        self.metrics.calls[self.stage] += 1
+
+
+class NoTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+class Metrics:
+    """Training statistics and per-stage timings.
+
+    Values passed to add are summed where they live (on device for
+    tensors), so nothing syncs with the host until summary() reduces
+    everything with a single transfer, once per episode. Stage timings are
+    only taken when profile is True.
+
+    Args:
+        path (str): optional JSONL or CSV file the records are appended to
+        format (str): 'jsonl' or 'csv'
+        profile (bool): time the stages
+        cuda_sync (bool): synchronize CUDA around timed stages, so GPU work
+            is charged to the stage that launched it (slower)
+    """
+    def __init__(self, path=None, format='jsonl', profile=False, cuda_sync=False):
+        self.path = path
+        self.format = format
+        self.profile = profile
+        self.cuda_sync = cuda_sync and torch.cuda.is_available()
+
+        self.csv_fields = None
+        self.no_timer = NoTimer()
+
+        self.reset()
+
+    def reset(self):
+        self.sums = {}
+        self.counts = defaultdict(int)
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def add(self, name, value):
+        """Accumulates value (tensor or number) without reading it"""
+        if isinstance(value, torch.Tensor):
+            value = value.detach().float().reshape(())
+
+        if name not in self.sums:
+            self.sums[name] = value.clone() if isinstance(value, torch.Tensor) else value
+        elif isinstance(self.sums[name], torch.Tensor):
+            self.sums[name].add_(value)
+        else:
+            self.sums[name] = self.sums[name] + value
+
+        self.counts[name] += 1
+
+    def time(self, stage):
+        """with metrics.time('stage'): ..."""
+        return Timer(self, stage) if self.profile else self.no_timer
+
+    def summary(self):
+        """Means of the added values and time spent per stage since the last
+        reset, then resets
+        Returns:
+            dict
+        """
+        names = list(self.sums)
+        tensors = [self.sums[k] for k in names if isinstance(self.sums[k], torch.Tensor)]
+
+        # One device to host transfer for all of them
+        if tensors:
+            values = iter(torch.stack([t.to(tensors[0].device) for t in tensors]).cpu().tolist())
+
+        stats = {}
+
+        for name in names:
+            total = next(values) if isinstance(self.sums[name], torch.Tensor) else self.sums[name]
+            stats[name] = total / self.counts[name]
+
+        for stage, elapsed in self.times.items():
+            stats['time/{}'.format(stage)] = elapsed
+            stats['calls/{}'.format(stage)] = self.calls[stage]
+
+        self.reset()
+
+        return stats
+
+    def write(self, record):
+        """Appends a record (dict) to path"""
+        if self.path is None:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.format == 'csv':
+            self.write_csv(record)
+        else:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def write_csv(self, record):
+        """Appends a CSV row. Records don't all have the same fields (the
+        first episodes have no losses, evaluations have their own), so the
+        header grows with the new ones and the file is rewritten then"""
+        if self.csv_fields is None:
+            self.csv_fields = []
+
+            # Picking up a file left by a previous run
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, newline='') as f:
+                    self.csv_fields = next(csv.reader(f), [])
+
+        new_fields = [name for name in record if name not in self.csv_fields]
+
+        if new_fields:
+            rows = []
+
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, newline='') as f:
+                    rows = list(csv.DictReader(f))
+
+            self.csv_fields = self.csv_fields + new_fields
+
+            with open(self.path + '.tmp', 'w', newline='') as f:
+                writer = csv.DictWriter(f, self.csv_fields)
+                writer.writeheader()
+                writer.writerows(rows)
+                writer.writerow(record)
+
+            os.replace(self.path + '.tmp', self.path)
+        else:
+            with open(self.path, 'a', newline='') as f:
+                csv.DictWriter(f, self.csv_fields).writerow(record)
+
+    @staticmethod
+    def print_summary(stats):
+        """Console breakdown of where the time went"""
+        stages = {k[len('time/'):]: v for k, v in stats.items() if k.startswith('time/')}
+        total = sum(stages.values())
+
+        if total == 0:
+            return
+
+        print('\n{:>16} {:>10} {:>8} {:>10}'.format('stage', 'time (s)', '%', 'calls'))
+
+        for stage, elapsed in sorted(stages.items(), key=lambda s: -s[1]):
+            print('{:>16} {:>10.3f} {:>8.1f} {:>10}'.format(stage,
+                                                            elapsed,
+                                                            100 * elapsed / total,
+                                                            stats['calls/{}'.format(stage)]))
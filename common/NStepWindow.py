@@ -0,0 +1,136 @@
+import numpy as np
+
+
+class NStepWindow:
+    """Aggregates n-step transitions at insertion time.
+
+    Keeps the last n (state, action, reward) of every stream (env copy or
+    agent) in a preallocated ring. Once a stream's window is full, its
+    oldest entry leaves as
+        (s_t, a_t, R = r_t + γ r_t+1 + ... + γ^(n-1) r_t+n-1, s_t+n, done, γ^n)
+    so a step costs O(n) whatever the buffer size, and nothing is
+    recomputed at sample time. When an episode ends every pending entry
+    leaves with the rewards it has: done ones don't bootstrap, truncated
+    ones (flush) bootstrap from the last next_state with γ^k.
+
+    Args:
+        n (int)
+        gamma (float)
+        state_size (int)
+        num_streams (int): initial number of streams, grows as needed
+    """
+    def __init__(self, n, gamma, state_size, num_streams=1):
+        self.n = n
+        self.gamma = gamma
+        self.state_size = state_size
+
+        self.gamma_powers = gamma ** np.arange(n + 1, dtype=np.float32)
+
+        self.states = np.zeros((0, n, state_size), dtype=np.float32)
+        self.actions = np.zeros((0, n), dtype=np.int64)
+        self.rewards = np.zeros((0, n), dtype=np.float32)
+        self.next_states = np.zeros((0, state_size), dtype=np.float32) # last one seen
+        self.heads = np.zeros(0, dtype=np.int64) # oldest entry
+        self.lengths = np.zeros(0, dtype=np.int64) # pending entries
+
+        self.grow(num_streams)
+
+    def grow(self, num_streams):
+        m = num_streams - len(self.heads)
+
+        if m <= 0:
+            return
+
+        self.states = np.concatenate([self.states, np.zeros((m, self.n, self.state_size), dtype=np.float32)])
+        self.actions = np.concatenate([self.actions, np.zeros((m, self.n), dtype=np.int64)])
+        self.rewards = np.concatenate([self.rewards, np.zeros((m, self.n), dtype=np.float32)])
+        self.next_states = np.concatenate([self.next_states, np.zeros((m, self.state_size), dtype=np.float32)])
+        self.heads = np.concatenate([self.heads, np.zeros(m, dtype=np.int64)])
+        self.lengths = np.concatenate([self.lengths, np.zeros(m, dtype=np.int64)])
+
+    def add(self, states, actions, rewards, next_states, dones, streams=None):
+        """Pushes one transition per stream (distinct streams)
+
+        Returns:
+            Tuple of np.ndarray: the transitions ready for the replay buffer,
+            (states, actions, returns, next_states, dones, discounts)
+        """
+        n = self.n
+        streams = np.arange(len(states)) if streams is None else np.asarray(streams, dtype=np.int64)
+
+        if streams.max() >= len(self.heads):
+            self.grow(streams.max() + 1)
+
+        dones = np.reshape(dones, -1).astype(bool)
+
+        positions = (self.heads[streams] + self.lengths[streams]) % n
+
+        self.states[streams, positions] = states
+        self.actions[streams, positions] = np.reshape(actions, -1)
+        self.rewards[streams, positions] = np.reshape(rewards, -1)
+        self.next_states[streams] = next_states
+        self.lengths[streams] += 1
+
+        # Full windows release their oldest entry
+        full = streams[~dones & (self.lengths[streams] == n)]
+        order = (self.heads[full, None] + np.arange(n)) % n
+
+        ready = [(self.states[full, self.heads[full]],
+                  self.actions[full, self.heads[full]],
+                  self.rewards[full[:, None], order] @ self.gamma_powers[:n],
+                  self.next_states[full],
+                  np.zeros(len(full), dtype=np.float32),
+                  np.full(len(full), self.gamma_powers[n], dtype=np.float32))]
+
+        self.heads[full] = (self.heads[full] + 1) % n
+        self.lengths[full] -= 1
+
+        # Episode ends release everything
+        ready += [self.release(stream, done=True) for stream in streams[dones]]
+
+        return self.concatenate(ready)
+
+    def flush(self, streams=None):
+        """Releases the pending entries of streams (all by default) whose
+        episode was cut short, they bootstrap from the last next_state
+
+        Returns:
+            Tuple of np.ndarray: same as add
+        """
+        streams = np.arange(len(self.heads)) if streams is None else np.asarray(streams, dtype=np.int64)
+        streams = streams[streams < len(self.heads)]
+
+        return self.concatenate([self.release(stream, done=False) for stream in streams])
+
+    def release(self, stream, done):
+        n = self.n
+        length = self.lengths[stream]
+        order = (self.heads[stream] + np.arange(length)) % n
+
+        rewards = self.rewards[stream, order]
+
+        # R_i = sum over j >= i of γ^(j-i) r_j, then γ^(length - i) to bootstrap
+        returns = np.array([rewards[i:] @ self.gamma_powers[:length - i] for i in range(length)],
+                           dtype=np.float32)
+        discounts = self.gamma_powers[length - np.arange(length)]
+
+        self.heads[stream] = 0
+        self.lengths[stream] = 0
+
+        return (self.states[stream, order],
+                self.actions[stream, order],
+                returns,
+                np.repeat(self.next_states[stream][None], length, axis=0),
+                np.full(length, float(done), dtype=np.float32),
+                discounts.astype(np.float32))
+
+    def concatenate(self, parts):
+        if not parts:
+            return (np.zeros((0, self.state_size), dtype=np.float32),
+                    np.zeros(0, dtype=np.int64),
+                    np.zeros(0, dtype=np.float32),
+                    np.zeros((0, self.state_size), dtype=np.float32),
+                    np.zeros(0, dtype=np.float32),
+                    np.zeros(0, dtype=np.float32))
+
+        return tuple(np.concatenate(fields) for fields in zip(*parts))
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+# Module-level functions, so snapshots pickle (e.g. to evaluation workers)
+def relu(x):
+    return np.maximum(x, 0.)
+
+def sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+def elu(x):
+    return np.where(x > 0., x, np.expm1(np.minimum(x, 0.)))
+
+def leaky_relu(x):
+    return np.where(x > 0., x, 0.01 * x)
+
+
+activations = {'ReLU': relu,
+               'Tanh': np.tanh,
+               'Sigmoid': sigmoid,
+               'ELU': elu,
+               'LeakyReLU': leaky_relu}
+
+
+class NumpyPolicy:
+    """Pure NumPy forward of exported CategoricalPolicy weights, same layout
+    (no activation after the first layer). For acting outside of torch.
+
+    Args:
+        weights (list of np.ndarray): (dim_in, dim_out) per layer
+        biases (list of np.ndarray): (dim_out,) per layer
+        activ (str): activation class name, e.g. 'ReLU'
+    """
+    def __init__(self, weights, biases, activ='ReLU'):
+        if activ not in activations:
+            raise ValueError('Unsupported activation: {}'.format(activ))
+
+        self.weights = weights
+        self.biases = biases
+        self.activ = activations[activ]
+        self.rng = np.random.default_rng()
+
+    @classmethod
+    def from_state_dict(cls, state_dict, activ='ReLU'):
+        num_layers = len([k for k in state_dict if k.endswith('.weight')])
+
+        weights = [state_dict['layers.{}.weight'.format(i)].detach().cpu().numpy().T.copy() \
+                   for i in range(num_layers)]
+        biases = [state_dict['layers.{}.bias'.format(i)].detach().cpu().numpy().copy() \
+                  for i in range(num_layers)]
+
+        return cls(weights, biases, activ)
+
+    @classmethod
+    def from_policy(cls, policy):
+        return cls.from_state_dict(policy.state_dict(), type(policy.activ).__name__)
+
+    def forward(self, state):
+        x = np.asarray(state, dtype=np.float32) @ self.weights[0] + self.biases[0]
+
+        for weight, bias in zip(self.weights[1:-1], self.biases[1:-1]):
+            x = self.activ(x @ weight + bias)
+
+        return x @ self.weights[-1] + self.biases[-1]
+
+    def act(self, state, greedy=False):
+        """Actions for a single state (int) or a batch (np.ndarray)"""
+        action_logits = self.forward(state)
+
+        if not greedy:
+            action_logits = action_logits - np.log(self.rng.exponential(size=action_logits.shape))
+
+        action = np.argmax(action_logits, axis=-1)
+
+        return int(action) if action.ndim == 0 else action
@@ -0,0 +1,280 @@
+import time
+import queue
+import socket
+import struct
+import threading
+import numpy as np
+import torch
+import torch.nn as nn
+from concurrent.futures import Future
+
+from common.utils import device
+from common import CategoricalPolicy
+
+# inference_mode only exists in newer torch, no_grad does the job otherwise
+inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+
+
+def recv_exactly(conn, size):
+    data = b''
+
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+
+        if not chunk:
+            return None
+
+        data += chunk
+
+    return data
+
+
+class PolicyServer:
+    """Serves a trained CategoricalPolicy to many clients at once.
+
+    Requests (one observation each) come in through submit/act, in
+    process, or from PolicyClient over a local TCP socket (serve). A
+    worker thread groups whatever is queued into micro-batches: a batch
+    closes when it has max_batch_size requests or max_latency seconds
+    after its first request arrived, then runs as a single forward pass.
+    Greedy and sampled requests share the batch. If a batch fails, its
+    requests get the exception and the worker goes on; requests still
+    queued when the server stops get a RuntimeError.
+
+    Args:
+        policy (CategoricalPolicy)
+        max_batch_size (int)
+        max_latency (float): seconds a request can wait for its batch
+    """
+    def __init__(self, policy, max_batch_size=256, max_latency=1e-3):
+        self.policy = policy.eval()
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+
+        self.state_size = policy.layers[0].in_features
+        self.action_size = policy.layers[-1].out_features
+
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.listener = None
+
+        # Host side batch, copied to device in one go
+        self.batch = torch.zeros((max_batch_size, self.state_size))
+        if device.type == 'cuda':
+            self.batch = self.batch.pin_memory()
+
+        self.batches = 0
+        self.served = 0
+
+    @classmethod
+    def from_checkpoint(cls, path, activ='ReLU', **kwargs):
+        """Builds the policy alone from its saved state_dict (e.g.
+        weights/SAC_policy_checkpoint.ph), sizes inferred from the weights
+
+        Args:
+            path (str)
+            activ (str): activation class name the policy was trained with
+            **kwargs: PolicyServer arguments
+        """
+        state_dict = torch.load(path, map_location='cpu')
+
+        num_layers = len([k for k in state_dict if k.endswith('.weight')])
+        shapes = [state_dict['layers.{}.weight'.format(i)].shape for i in range(num_layers)]
+
+        policy = CategoricalPolicy(shapes[0][1],
+                                   shapes[-1][0],
+                                   tuple(shape[0] for shape in shapes[:-1]),
+                                   getattr(nn, activ)())
+        policy.load_state_dict(state_dict)
+
+        return cls(policy, **kwargs)
+
+    def start(self):
+        worker = threading.Thread(target=self.run, daemon=True)
+        worker.start()
+        self.threads.append(worker)
+
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+        if self.listener is not None:
+            self.listener.close()
+
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+
+        self.threads = []
+        self.fail_pending()
+
+    def fail_pending(self):
+        """Requests left in the queue won't be served"""
+        while True:
+            try:
+                _, _, future = self.requests.get_nowait()
+            except queue.Empty:
+                return
+
+            future.set_exception(RuntimeError('PolicyServer stopped'))
+
+    def submit(self, state, greedy=True):
+        """Queues one observation
+        Returns:
+            concurrent.futures.Future: resolves to the action (int)
+        """
+        state = np.asarray(state, dtype=np.float32)
+
+        if state.size != self.state_size:
+            raise ValueError('Expected an observation of size {}, got shape {}'.format(self.state_size, state.shape))
+
+        future = Future()
+        self.requests.put((state.reshape(self.state_size), greedy, future))
+
+        # Stopped in the meantime, nothing would pick it up
+        if self.stop_event.is_set():
+            self.fail_pending()
+
+        return future
+
+    def act(self, state, greedy=True):
+        return self.submit(state, greedy).result()
+
+    def next_batch(self):
+        """Blocks for a first request, then takes more until the batch is
+        full or its latency budget is spent"""
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.max_latency
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+
+            try:
+                if timeout > 0:
+                    batch.append(self.requests.get(timeout=timeout))
+                else:
+                    batch.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def run(self):
+        while not self.stop_event.is_set():
+            batch = self.next_batch()
+
+            if not batch:
+                continue
+
+            try:
+                actions = self.forward(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), action in zip(batch, actions):
+                future.set_result(action)
+
+            self.batches += 1
+            self.served += len(batch)
+
+    def forward(self, batch):
+        """Actions of a batch of requests, in one forward pass"""
+        n = len(batch)
+
+        for i, (state, _, _) in enumerate(batch):
+            self.batch[i].copy_(torch.from_numpy(state))
+
+        sampled = torch.tensor([not greedy for _, greedy, _ in batch], device=device)
+
+        with inference_mode():
+            states = self.batch[:n].to(device, non_blocking=True)
+            action_logits = self.policy(states)
+
+            # Gumbel-max on the sampled rows only
+            noise = torch.empty_like(action_logits).exponential_().log()
+            action_logits = action_logits - noise * sampled.unsqueeze(1)
+
+            return torch.argmax(action_logits, dim=1).cpu().tolist()
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Accepts PolicyClient connections, one thread per connection
+        Returns:
+            int: the port listened on
+        """
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen()
+
+        acceptor = threading.Thread(target=self.accept, daemon=True)
+        acceptor.start()
+        self.threads.append(acceptor)
+
+        return self.listener.getsockname()[1]
+
+    def accept(self):
+        while not self.stop_event.is_set():
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        """Protocol: the server sends state_size (uint32), then every
+        request is a greedy flag (1 byte) and state_size float32, answered
+        with the action (int32)"""
+        request_size = 1 + 4 * self.state_size
+
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        with conn:
+            conn.sendall(struct.pack('!I', self.state_size))
+
+            while not self.stop_event.is_set():
+                data = recv_exactly(conn, request_size)
+
+                if data is None:
+                    return
+
+                state = np.frombuffer(data, dtype='<f4', offset=1)
+                action = self.act(state, greedy=bool(data[0]))
+
+                conn.sendall(struct.pack('!i', action))
+
+    @property
+    def mean_batch_size(self):
+        return self.served / max(self.batches, 1)
+
+
+class PolicyClient:
+    """Client side of PolicyServer.serve
+
+    Args:
+        host (str)
+        port (int)
+    """
+    def __init__(self, host, port):
+        self.conn = socket.create_connection((host, port))
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.state_size, = struct.unpack('!I', recv_exactly(self.conn, 4))
+
+    def act(self, state, greedy=True):
+        state = np.asarray(state, dtype='<f4').reshape(self.state_size)
+
+        self.conn.sendall(bytes([greedy]) + state.tobytes())
+
+        action, = struct.unpack('!i', recv_exactly(self.conn, 4))
+        return action
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+import torch
+
+from common.utils import device
+
+
+class PrefetchSampler:
+    """Samples minibatches from a replay buffer in a background thread, so
+    gathering and decoding the next batches overlaps with the current
+    gradient update.
+
+    Keeps up to depth ready batches in a bounded queue: pinned when
+    training on GPU (learn's non_blocking copies are then asynchronous),
+    contiguous otherwise. The buffer's lock keeps sampling consistent with
+    the inserts of the training loop. A prefetched batch was drawn at most
+    depth batches earlier, and priority updates of a prioritized buffer
+    land on the slots it was drawn from.
+
+    Args:
+        memory (ReplayBuffer)
+        depth (int): ready batches kept ahead
+        metrics (Metrics): gets 'prefetch_wait' (seconds get blocked on an
+            empty queue) and 'prefetch_starved' (share of get calls that
+            found the queue empty)
+    """
+    def __init__(self, memory, depth=4, metrics=None):
+        self.memory = memory
+        self.metrics = metrics
+        self.pin = device.type == 'cuda'
+
+        self.batches = queue.Queue(maxsize=depth)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        self.stop_event.set()
+
+        # Unblock a pending put
+        while not self.batches.empty():
+            self.batches.get_nowait()
+
+        self.thread.join()
+        self.thread = None
+
+    def prepare(self, experiences):
+        if self.pin:
+            return tuple(e.pin_memory() if isinstance(e, torch.Tensor) else e for e in experiences)
+
+        return tuple(e.contiguous() if isinstance(e, torch.Tensor) else e for e in experiences)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                batch = self.prepare(self.memory.sample())
+
+                while not self.stop_event.is_set():
+                    try:
+                        self.batches.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except Exception as e:
+            self.error = e
+
+    def get(self):
+        """Next ready batch, same fields as memory.sample()"""
+        try:
+            batch = self.batches.get_nowait()
+            starved = False
+            wait = 0.
+        except queue.Empty:
+            starved = True
+            start = time.perf_counter()
+
+            while True:
+                if self.error is not None:
+                    raise RuntimeError('Prefetch thread failed') from self.error
+
+                try:
+                    batch = self.batches.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    pass
+
+            wait = time.perf_counter() - start
+
+        if self.metrics is not None:
+            self.metrics.add('prefetch_wait', wait)
+            self.metrics.add('prefetch_starved', float(starved))
+
+        return batch
@@ -0,0 +1,109 @@
+import numpy as np
+import torch
+from common import ReplayBuffer, SumTree, MinTree
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Prioritized Experience Replay
+    https://arxiv.org/abs/1511.05952
+
+    Samples experiences proportionally to priority^alpha, using a flat
+    sum tree (O(log n) per sample) and a min tree for the max
+    importance-sampling weight. New experiences get the max priority seen.
+
+    Args:
+        buffer_size (int)
+        batch_size (int)
+        state_size (int)
+        alpha (float): how much prioritization is used (0 is uniform)
+        beta (float): importance-sampling correction, annealed to 1
+        beta_increment (float): added to beta for every batch learned
+            from (update_priorities), not when a batch is drawn ahead
+        eps (float): keeps every priority above zero
+        storage_dir (str): optional directory for on-disk storage
+        **kwargs: storage options of ReplayBuffer (compact, obs_dtype...)
+    """
+    def __init__(self,
+                 buffer_size,
+                 batch_size,
+                 state_size,
+                 alpha=0.6,
+                 beta=0.4,
+                 beta_increment=1e-5,
+                 eps=1e-6,
+                 storage_dir=None,
+                 **kwargs):
+        super().__init__(buffer_size, batch_size, state_size, storage_dir, **kwargs)
+
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+
+        self.sum_tree = SumTree(self.buffer_size)
+        self.min_tree = MinTree(self.buffer_size)
+        self.max_priority = 1.0
+
+        # Priorities aren't stored, experiences of a resumed buffer
+        # start over with the max priority
+        if self.size > 0:
+            self.set_priorities(np.arange(self.size), self.max_priority)
+
+    def set_priorities(self, idxs, priorities):
+        self.sum_tree.update(idxs, priorities ** self.alpha)
+        self.min_tree.update(idxs, priorities ** self.alpha)
+
+    def add(self, state, action, reward, next_state, done):
+        with self.lock:
+            pos = self.pos
+            super().add(state, action, reward, next_state, done)
+            self.set_priorities([pos], self.max_priority)
+
+    def add_batch(self, states, actions, rewards, next_states, dones, streams=None, discounts=None):
+        with self.lock:
+            idxs = (self.pos + np.arange(len(states))) % self.buffer_size
+            super().add_batch(states, actions, rewards, next_states, dones, streams, discounts)
+            self.set_priorities(idxs, self.max_priority)
+
+    def sample(self):
+        """Sample batch_size experiences, one per equal-mass segment of the
+        priorities
+
+        Returns:
+            Tuple: (states, actions, rewards, next_states, dones, weights, idxs)
+            where weights are the importance-sampling weights (torch.Tensor)
+            and idxs the sampled slots (np.ndarray), for update_priorities.
+            A discounted buffer has the discounts after dones
+        """
+        with self.lock:
+            batch_size = self.batch_size
+            total = self.sum_tree.reduce()
+
+            prefixsums = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+
+            idxs = self.sum_tree.find_prefixsum_idx(prefixsums)
+            idxs = np.minimum(idxs, self.size - 1)
+
+            # w_i = (N * P(i))^-β, normalized by the largest weight
+            probs = self.sum_tree[idxs] / total
+            min_prob = self.min_tree.reduce() / total
+            weights = (probs / min_prob) ** -self.beta
+
+            weights = torch.from_numpy(weights.astype(np.float32)).view(-1, 1)
+
+            return self.gather(idxs) + (weights, idxs)
+
+    def update_priorities(self, idxs, td_errors):
+        """Sets the priorities of the sampled experiences to their TD error
+
+        Args:
+            idxs (np.ndarray): slots returned by sample
+            td_errors (np.ndarray)
+        """
+        with self.lock:
+            priorities = np.abs(td_errors) + self.eps
+
+            self.max_priority = max(self.max_priority, priorities.max())
+            self.set_priorities(idxs, priorities)
+
+            self.beta = min(1., self.beta + self.beta_increment)
@@ -0,0 +1,58 @@
+import torch
+import torch.nn as nn
+from common.utils import device, make_mlp
+from common import RunningMeanStd
+
+
+class RND(nn.Module):
+    """Exploration by Random Network Distillation
+    https://arxiv.org/abs/1810.12894
+
+    A fixed, randomly initialized target network and a predictor trained to
+    match it. The prediction error on normalized observations is the
+    exploration bonus, scaled by the running std of the bonus itself.
+    """
+    def __init__(self,
+                 state_size,
+                 feature_size,
+                 hidden_size,
+                 activ,
+                 obs_clip=5.):
+        super().__init__()
+
+        self.obs_clip = obs_clip
+
+        dims = (state_size,) + hidden_size + (feature_size,)
+
+        self.target = make_mlp(dims, activ)
+        self.predictor = make_mlp(dims, activ)
+
+        for param in self.target.parameters():
+            param.requires_grad = False
+
+        self.obs_rms = RunningMeanStd((state_size,))
+        self.reward_rms = RunningMeanStd()
+
+        self.to(device)
+
+    def forward(self, next_states):
+        """Updates the running stats and runs both networks once on a batch
+        Returns:
+            intrinsic_rewards (torch.Tensor): (batch_size, 1), normalized
+            loss (torch.Tensor): predictor loss
+        """
+        self.obs_rms.update(next_states)
+
+        obs = self.obs_rms.normalize(next_states).clamp(-self.obs_clip, self.obs_clip)
+
+        with torch.no_grad():
+            target_features = self.target(obs)
+
+        errors = (self.predictor(obs) - target_features).pow(2).mean(dim=1, keepdim=True)
+
+        intrinsic_rewards = errors.detach()
+        self.reward_rms.update(intrinsic_rewards.view(-1))
+
+        intrinsic_rewards = intrinsic_rewards / torch.sqrt(self.reward_rms.var + 1e-8)
+
+        return intrinsic_rewards, errors.mean()
@@ -1,38 +1,462 @@
-import random
+import os
+import json
+import threading
 import numpy as np
-from collections import deque
+import torch
 
 
 class ReplayBuffer:
     """This buffer will help to reduce correlation between experiences.
-    It uses a deque data structure as buffer. Will store experiences as
-    namedtuples:
+    It's a preallocated ring buffer with one NumPy column per field:
         experience = (state, action, reward, next_state, done)
 
+    Sampling draws integer indices, so it's O(batch_size) no matter how
+    full the buffer is, and returns ready-made torch tensors.
+
+    When storage_dir is given the columns are memory-mapped .npy files in
+    that directory instead of RAM, so the buffer can exceed memory. If the
+    directory already holds a buffer of the same layout it's reopened as is
+    (no deserialization) and the run resumes from it. Call flush to make
+    the current content durable.
+
+    Compact mode stores every observation once: next_state is read from the
+    slot of the following transition of the same stream (environment copy
+    or agent). Where the chain breaks (episode end, or a next_state that
+    isn't the following state) next_state goes to a tail ring of tail_size
+    observations. If the tail wraps around while its owner is still in the
+    buffer, that owner falls back to its own state (see tail_evictions), so
+    tail_size should cover the episode ends the buffer holds. Actions and
+    dones are packed into small integer types, slot references are int32.
+
+    Observations can also be stored as 'float16', or as 'uint8' quantized
+    per dimension between obs_low and obs_high. Sampled tensors are float32
+    whatever the storage.
+
+    add, add_batch, sample and flush hold lock, so a sampling thread can
+    run alongside the inserts. Samples are drawn from the buffer's own
+    generator, not the global NumPy one another thread may be using.
+
     Args:
         buffer_size (int)
         batch_size (int)
+        state_size (int)
+        storage_dir (str): optional directory for on-disk storage
+        compact (bool): single-copy observations, packed actions and dones
+        obs_dtype (str): 'float32', 'float16' or 'uint8'
+        obs_low (np.ndarray): lowest observation, for 'uint8'
+        obs_high (np.ndarray): highest observation, for 'uint8'
+        action_size (int): picks the action type in compact mode
+        tail_size (int): compact mode tail, defaults to buffer_size // 64
+            (episodes of 64 steps on average), at least 1024
+        discounted (bool): store a discount per transition (n-step
+            returns), sampled after dones
+        seed (int): seeds the sampling generator
     """
-    def __init__(self, buffer_size, batch_size):
-        self.buffer = deque(maxlen=buffer_size)  # internal buffer (deque)
+    meta_file = 'meta.json'
+
+    def __init__(self,
+                 buffer_size,
+                 batch_size,
+                 state_size,
+                 storage_dir=None,
+                 compact=False,
+                 obs_dtype='float32',
+                 obs_low=None,
+                 obs_high=None,
+                 action_size=None,
+                 tail_size=None,
+                 discounted=False,
+                 seed=None):
+        self.buffer_size = int(buffer_size)
         self.batch_size = batch_size
+        self.state_size = state_size
+        self.storage_dir = storage_dir
+        self.compact = compact
+        self.discounted = discounted
+        self.obs_dtype = np.dtype(obs_dtype)
+        self.tail_size = int(tail_size or min(self.buffer_size, max(1024, self.buffer_size // 64)))
+        self.rng = np.random.default_rng(seed)
+
+        if compact and self.buffer_size + self.tail_size >= 2 ** 31:
+            raise ValueError('compact mode references slots as int32, buffer_size is too large')
+
+        if self.obs_dtype == np.uint8:
+            if obs_low is None or obs_high is None:
+                raise ValueError("obs_dtype 'uint8' needs obs_low and obs_high")
+
+            obs_low = np.broadcast_to(np.asarray(obs_low, dtype=np.float32), (state_size,))
+            obs_high = np.broadcast_to(np.asarray(obs_high, dtype=np.float32), (state_size,))
+
+            self.obs_low = obs_low
+            self.obs_scale = np.maximum(obs_high - obs_low, 1e-8) / 255.
+
+        self.pos = 0 # next slot to be written
+        self.size = 0 # number of valid slots
+        self.tail_pos = 0 # next tail slot to be written
+        self.tail_evictions = 0
+
+        # Inserts and samples may come from different threads (PrefetchSampler)
+        self.lock = threading.RLock()
+
+        self.layout = {'buffer_size': self.buffer_size,
+                       'state_size': state_size,
+                       'compact': compact,
+                       'obs_dtype': self.obs_dtype.name,
+                       'tail_size': self.tail_size if compact else None,
+                       'index_dtype': 'int32' if compact else None,
+                       'discounted': discounted}
+
+        meta = self.load_meta()
+        resume = meta is not None and meta['layout'] == self.layout
+
+        if compact:
+            action_dtype = np.uint8 if action_size is not None and action_size <= 256 else np.int32
+            done_dtype = np.uint8
+        else:
+            action_dtype = np.int64
+            done_dtype = np.float32
+
+        columns = [('states', (self.buffer_size, state_size), self.obs_dtype),
+                   ('actions', (self.buffer_size, 1), action_dtype),
+                   ('rewards', (self.buffer_size, 1), np.float32),
+                   ('dones', (self.buffer_size, 1), done_dtype)]
+
+        if compact:
+            # Where next_state is: >= 0 slot, -1 - k tail slot k,
+            # -1 - tail_size - s still pending in stream s
+            columns += [('next_idx', (self.buffer_size,), np.int32),
+                        ('tail_states', (self.tail_size, state_size), self.obs_dtype),
+                        ('tail_owner', (self.tail_size,), np.int32)]
+        else:
+            columns += [('next_states', (self.buffer_size, state_size), self.obs_dtype)]
+
+        if discounted:
+            columns += [('discounts', (self.buffer_size, 1), np.float32)]
+
+        self.columns = [name for name, _, _ in columns]
+
+        for name, shape, dtype in columns:
+            setattr(self, name, self.allocate(name, shape, dtype, resume))
+
+        # Compact mode: last slot of every stream and its next_state, until
+        # the stream's following transition comes in
+        self.pending_slot = np.full(0, -1, dtype=np.int64)
+        self.pending_states = np.zeros((0, state_size), dtype=self.obs_dtype)
+
+        if resume:
+            self.pos = meta['pos']
+            self.size = meta['size']
+            self.tail_pos = meta['tail_pos']
+
+    def allocate(self, name, shape, dtype, resume=False):
+        """Returns a zeroed column in RAM, or a memory-mapped one on disk
+        (reopened when resuming)"""
+        if self.storage_dir is None:
+            return np.zeros(shape, dtype=dtype)
+
+        os.makedirs(self.storage_dir, exist_ok=True)
+        path = os.path.join(self.storage_dir, '{}.npy'.format(name))
 
-    def add(self, experience):
+        if resume and os.path.exists(path):
+            array = np.lib.format.open_memmap(path, mode='r+')
+
+            if array.shape == shape and array.dtype == dtype:
+                return array
+
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    def load_meta(self):
+        if self.storage_dir is None:
+            return None
+
+        path = os.path.join(self.storage_dir, self.meta_file)
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            meta = json.load(f)
+
+        # Written before compact storage: plain float32 columns
+        if 'layout' not in meta:
+            meta['layout'] = {'buffer_size': meta['buffer_size'],
+                              'state_size': meta['state_size'],
+                              'compact': False,
+                              'obs_dtype': 'float32',
+                              'tail_size': None,
+                              'discounted': False}
+            meta['tail_pos'] = 0
+
+        # Written before int32 slot references
+        layout = meta['layout']
+        layout.setdefault('index_dtype', 'int64' if layout['compact'] else None)
+
+        return meta
+
+    def flush(self):
+        """Writes the memory-mapped columns and then the ring position to
+        disk, so a restarted run can pick the buffer up"""
+        with self.lock:
+            if self.storage_dir is None:
+                return
+
+            # Pending next_states only live in RAM
+            if self.compact:
+                streams = np.flatnonzero(self.pending_slot >= 0)
+                slots = self.pending_slot[streams]
+                pending = self.next_idx[slots] < -self.tail_size
+
+                self.to_tail(slots[pending], self.pending_states[streams[pending]])
+
+            for name in self.columns:
+                getattr(self, name).flush()
+
+            meta = {'layout': self.layout,
+                    'pos': self.pos,
+                    'size': self.size,
+                    'tail_pos': self.tail_pos}
+
+            # Atomic: a crash leaves either the old or the new meta
+            path = os.path.join(self.storage_dir, self.meta_file)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.replace(path + '.tmp', path)
+
+    def encode(self, states):
+        """Observations to storage type"""
+        if self.obs_dtype == np.uint8:
+            levels = np.rint((np.asarray(states, dtype=np.float32) - self.obs_low) / self.obs_scale)
+            return np.clip(levels, 0, 255).astype(np.uint8)
+
+        return np.asarray(states, dtype=self.obs_dtype)
+
+    def decode(self, states):
+        """Stored observations back to float32"""
+        if self.obs_dtype == np.uint8:
+            return (states * self.obs_scale + self.obs_low).astype(np.float32)
+
+        return states.astype(np.float32, copy=False)
+
+    def add(self, state, action, reward, next_state, done):
         """Save experience in memory
 
         Args:
-            experience (Named Tuple):
-                (state, action, reward, next_action, done)
+            state (np.ndarray)
+            action (int)
+            reward (float)
+            next_state (np.ndarray)
+            done (bool)
+        """
+        with self.lock:
+            if self.compact:
+                ReplayBuffer.add_batch(self,
+                                       np.asarray(state)[None],
+                                       np.asarray([action]),
+                                       np.asarray([reward]),
+                                       np.asarray(next_state)[None],
+                                       np.asarray([done]))
+                return
+
+            pos = self.pos
+
+            self.states[pos] = self.encode(state)
+            self.actions[pos] = action
+            self.rewards[pos] = reward
+            self.next_states[pos] = self.encode(next_state)
+            self.dones[pos] = done
+
+            self.pos = (pos + 1) % self.buffer_size
+            self.size = min(self.size + 1, self.buffer_size)
+
+    def add_batch(self, states, actions, rewards, next_states, dones, streams=None, discounts=None):
+        """Save a batch of experiences (one per environment) in one insert
+
+        Args:
+            states (np.ndarray): (N, state_size)
+            actions (np.ndarray): (N,)
+            rewards (np.ndarray): (N,)
+            next_states (np.ndarray): (N, state_size)
+            dones (np.ndarray): (N,)
+            streams (np.ndarray): (N,) id of the environment copy or agent
+                of every row (rows of a stream in time order), defaults to
+                the row. Compact mode chains observations along them
+            discounts (np.ndarray): (N,) bootstrap discounts, required by
+                a discounted buffer
         """
-        self.buffer.append(experience)
+        with self.lock:
+            n = len(states)
+            idxs = (self.pos + np.arange(n)) % self.buffer_size
+
+            states = self.encode(states)
+
+            self.states[idxs] = states
+            self.actions[idxs] = np.reshape(actions, (n, 1))
+            self.rewards[idxs] = np.reshape(rewards, (n, 1))
+            self.dones[idxs] = np.reshape(dones, (n, 1))
+
+            if self.discounted:
+                if discounts is None:
+                    raise ValueError('A discounted buffer needs the discount of every transition')
+
+                self.discounts[idxs] = np.reshape(discounts, (n, 1))
+
+            if self.compact:
+                streams = np.arange(n) if streams is None else np.asarray(streams, dtype=np.int64)
+                dones = np.reshape(dones, n).astype(bool)
+
+                self.link(idxs, states, self.encode(next_states), dones, streams)
+            else:
+                self.next_states[idxs] = self.encode(next_states)
+
+            self.pos = (self.pos + n) % self.buffer_size
+            self.size = min(self.size + n, self.buffer_size)
+
+    def link(self, idxs, states, next_states, dones, streams):
+        """Compact mode: points every slot whose next_state is the state of
+        the following transition of its stream at that transition's slot,
+        parks the other next_states in the tail, and leaves the last one of
+        every ongoing stream pending"""
+        if streams.max() >= len(self.pending_slot):
+            self.grow_streams(streams.max() + 1)
+
+        # A slot being overwritten can't be waiting anymore, nor hold a
+        # tail reference of the transition it replaces
+        self.pending_slot[np.isin(self.pending_slot, idxs)] = -1
+        self.next_idx[idxs] = idxs
+
+        # Rows grouped by stream, in insertion order
+        order = np.argsort(streams, kind='stable')
+        grouped = streams[order]
+        first = np.r_[True, grouped[1:] != grouped[:-1]]
+        last = np.r_[grouped[1:] != grouped[:-1], True]
+
+        # Pending next_states of earlier inserts vs the first row of their stream
+        heads = order[first]
+        prev_slots = self.pending_slot[streams[heads]]
+        prev_states = self.pending_states[streams[heads]]
+
+        waiting = prev_slots >= 0
+        follows = np.all(prev_states == states[heads], axis=1)
+
+        linked = waiting & follows
+        self.next_idx[prev_slots[linked]] = idxs[heads[linked]]
+
+        # Chain broken: keep the pending next_state (unless a flush already did)
+        broken = waiting & ~follows
+        broken &= self.next_idx[np.maximum(prev_slots, 0)] < -self.tail_size
+        self.to_tail(prev_slots[broken], prev_states[broken])
+
+        self.pending_slot[streams[heads]] = -1
+
+        # Rows followed by another row of the same stream in this insert
+        inner = np.flatnonzero(~last)
+        rows = order[inner]
+        following = order[inner + 1]
+
+        chained = ~dones[rows] & np.all(next_states[rows] == states[following], axis=1)
+        self.next_idx[idxs[rows[chained]]] = idxs[following[chained]]
+
+        tails = order[last]
+        tails = tails[~dones[tails]]
+
+        # Episode ends and broken chains
+        parked = np.ones(len(idxs), dtype=bool)
+        parked[rows[chained]] = False
+        parked[tails] = False
+        self.to_tail(idxs[parked], next_states[parked])
+
+        self.next_idx[idxs[tails]] = -1 - self.tail_size - streams[tails]
+        self.pending_slot[streams[tails]] = idxs[tails]
+        self.pending_states[streams[tails]] = next_states[tails]
+
+    def grow_streams(self, num_streams):
+        pending_slot = np.full(num_streams, -1, dtype=np.int64)
+        pending_slot[:len(self.pending_slot)] = self.pending_slot
+
+        pending_states = np.zeros((num_streams, self.state_size), dtype=self.obs_dtype)
+        pending_states[:len(self.pending_states)] = self.pending_states
+
+        self.pending_slot = pending_slot
+        self.pending_states = pending_states
+
+    def to_tail(self, slots, next_states):
+        """Compact mode: stores the (encoded) next_states of slots in the
+        tail ring"""
+        n = len(slots)
+
+        if n == 0:
+            return
+
+        tail_idxs = (self.tail_pos + np.arange(n)) % self.tail_size
+
+        # Owners still reading the tail slots being reused
+        owners = self.tail_owner[tail_idxs]
+        evicted = owners[self.next_idx[owners] == -1 - tail_idxs]
+
+        self.next_idx[evicted] = evicted
+        self.tail_evictions += len(evicted)
+
+        self.tail_states[tail_idxs] = next_states
+        self.tail_owner[tail_idxs] = slots
+        self.next_idx[slots] = -1 - tail_idxs
+
+        self.tail_pos = (self.tail_pos + n) % self.tail_size
+
+    def gather_next_states(self, idxs):
+        """Compact mode: next_states of the slots idxs, still encoded"""
+        next_idx = self.next_idx[idxs]
+        next_states = np.empty((len(idxs), self.state_size), dtype=self.obs_dtype)
+
+        in_buffer = next_idx >= 0
+        next_states[in_buffer] = self.states[next_idx[in_buffer]]
+
+        refs = -1 - next_idx[~in_buffer]
+        in_tail = refs < self.tail_size
+
+        others = np.empty((len(refs), self.state_size), dtype=self.obs_dtype)
+        others[in_tail] = self.tail_states[refs[in_tail]]
+        others[~in_tail] = self.pending_states[refs[~in_tail] - self.tail_size]
+
+        next_states[~in_buffer] = others
+
+        return next_states
 
     def sample(self):
         """Sample batch_size random experiences from memory
 
         Returns:
-            List of tuples: batch_size of experiences
+            Tuple of torch.Tensor: (states, actions, rewards, next_states, dones),
+            plus discounts when the buffer is discounted
+        """
+        with self.lock:
+            idxs = self.rng.integers(0, self.size, size=self.batch_size)
+
+            return self.gather(idxs)
+
+    def gather(self, idxs):
+        """Returns the experiences stored at idxs, one gather per field.
+        Tensors stay on CPU, the learner moves them to its device
+
+        Args:
+            idxs (np.ndarray): slots to read
+        Returns:
+            Tuple of torch.Tensor
         """
-        return random.sample(self.buffer, k=self.batch_size)
+        if self.compact:
+            next_states = self.gather_next_states(idxs)
+        else:
+            next_states = self.next_states[idxs]
+
+        states = torch.from_numpy(self.decode(self.states[idxs]))
+        actions = torch.from_numpy(self.actions[idxs].astype(np.int64, copy=False))
+        rewards = torch.from_numpy(self.rewards[idxs])
+        next_states = torch.from_numpy(self.decode(next_states))
+        dones = torch.from_numpy(self.dones[idxs].astype(np.float32, copy=False))
+
+        if self.discounted:
+            return states, actions, rewards, next_states, dones, torch.from_numpy(self.discounts[idxs])
+
+        return states, actions, rewards, next_states, dones
 
     def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
+        return self.size
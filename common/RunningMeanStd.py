@@ -0,0 +1,45 @@
+import torch
+import torch.nn as nn
+from common.utils import device
+
+
+class RunningMeanStd(nn.Module):
+    """Streaming mean and variance over batches, merged with the parallel
+    form of Welford's algorithm (Chan et al.), so the cost per update only
+    depends on the batch. Stats are buffers: they live on device and are
+    part of state_dict, hence checkpointed with the owning module.
+
+    Args:
+        shape (tuple): shape of a single sample
+        eps (float): initial count, avoids dividing by zero
+    """
+    def __init__(self, shape=(), eps=1e-4):
+        super().__init__()
+
+        self.register_buffer('mean', torch.zeros(shape))
+        self.register_buffer('var', torch.ones(shape))
+        self.register_buffer('count', torch.tensor(eps, dtype=torch.float64))
+
+        self.to(device)
+
+    @torch.no_grad()
+    def update(self, x):
+        """Merges the stats of a batch x of shape (batch_size, *shape)"""
+        batch_mean = x.mean(dim=0)
+        batch_var = x.var(dim=0, unbiased=False)
+        batch_count = x.shape[0]
+
+        total_count = self.count + batch_count
+        batch_ratio = (batch_count / total_count).float()
+
+        delta = batch_mean - self.mean
+
+        m2 = self.var * (1 - batch_ratio) + batch_var * batch_ratio \
+             + delta.pow(2) * (1 - batch_ratio) * batch_ratio
+
+        self.mean.add_(delta * batch_ratio)
+        self.var.copy_(m2)
+        self.count.copy_(total_count)
+
+    def normalize(self, x, eps=1e-8):
+        return (x - self.mean) / torch.sqrt(self.var + eps)
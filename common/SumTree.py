@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class SegmentTree:
+    """Binary tree stored in a flat array: node i has children 2i and 2i+1,
+    the root is node 1 and the leaves take [capacity, 2 * capacity).
+    Updates and queries work on whole batches of leaves, one vectorized
+    pass per tree level, so there's no per-node Python object.
+
+    Args:
+        capacity (int): number of leaves, rounded up to a power of two
+        operation (np.ufunc): reduce operation, e.g. np.add
+        neutral (float): neutral element of operation
+    """
+    def __init__(self, capacity, operation, neutral):
+        self.capacity = 1
+        while self.capacity < capacity:
+            self.capacity *= 2
+
+        self.operation = operation
+        self.tree = np.full(2 * self.capacity, neutral, dtype=np.float64)
+
+    def update(self, idxs, values):
+        """Sets the leaves at idxs to values and fixes their ancestors
+
+        Args:
+            idxs (np.ndarray): leaf indices
+            values (np.ndarray or float)
+        """
+        nodes = np.asarray(idxs) + self.capacity
+        self.tree[nodes] = values
+
+        nodes = np.unique(nodes // 2)
+
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.operation(self.tree[2 * nodes],
+                                              self.tree[2 * nodes + 1])
+            if nodes[0] == 1: break
+
+            nodes = np.unique(nodes // 2)
+
+    def __getitem__(self, idxs):
+        return self.tree[np.asarray(idxs) + self.capacity]
+
+    def reduce(self):
+        """Reduction over all the leaves"""
+        return self.tree[1]
+
+
+class SumTree(SegmentTree):
+    def __init__(self, capacity):
+        super().__init__(capacity, np.add, 0.)
+
+    def find_prefixsum_idx(self, prefixsums):
+        """For each prefixsum, finds the highest leaf i such that
+        sum(leaves[:i]) <= prefixsum. All queries go down together.
+
+        Args:
+            prefixsums (np.ndarray)
+        Returns:
+            np.ndarray: leaf indices
+        """
+        prefixsums = np.array(prefixsums, dtype=np.float64)
+        nodes = np.ones(len(prefixsums), dtype=np.int64)
+
+        while nodes[0] < self.capacity:
+            left = 2 * nodes
+            left_sums = self.tree[left]
+
+            go_right = prefixsums >= left_sums
+
+            prefixsums = np.where(go_right, prefixsums - left_sums, prefixsums)
+            nodes = np.where(go_right, left + 1, left)
+
+        return nodes - self.capacity
+
+
+class MinTree(SegmentTree):
+    def __init__(self, capacity):
+        super().__init__(capacity, np.minimum, np.inf)
@@ -0,0 +1,152 @@
+import time
+import numpy as np
+
+
+class UTDScheduler:
+    """Adaptive update-to-data ratio: how many gradient updates run per
+    env step, re-decided every adjust_every env steps from the measured
+    wall-clock times.
+
+    The time between two steps (acting, env step, buffer insert) is
+    charged to the env, the updates to the learner. With target_share the
+    ratio goes toward the one that spends that share of the wall-clock on
+    updates,
+        ratio = share * env_time / ((1 - share) * update_time)
+    per env step and per update. Otherwise it goes toward target_ratio.
+    Either way it's kept within [min_ratio, max_ratio]. Fractional ratios
+    are run exactly in the long run, leftover fractions carry over to the
+    next steps. On GPU, queued kernels can end up charged to the env side
+    unless something syncs (profile_cuda_sync).
+
+    Every decision is appended to decisions and written to metrics, a
+    writer of its own (the records don't share fields with the episodes').
+
+    Args:
+        target_share (float): share of the wall-clock spent updating
+        target_ratio (float): updates per env step, when target_share is None
+        min_ratio (float)
+        max_ratio (float)
+        initial_ratio (float)
+        adjust_every (int): env steps between two decisions
+        smoothing (float): how far the ratio moves toward the target per
+            decision (1 jumps to it)
+        metrics (Metrics): optional writer of the decisions
+    """
+    def __init__(self,
+                 target_share=0.5,
+                 target_ratio=None,
+                 min_ratio=0.1,
+                 max_ratio=8.,
+                 initial_ratio=1.,
+                 adjust_every=1000,
+                 smoothing=0.5,
+                 metrics=None):
+        if target_share is None and target_ratio is None:
+            raise ValueError('UTDScheduler needs target_share or target_ratio')
+
+        if target_share is not None and not 0 < target_share < 1:
+            raise ValueError('target_share must be in (0, 1)')
+
+        self.target_share = target_share
+        self.target_ratio = target_ratio
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self.adjust_every = adjust_every
+        self.smoothing = smoothing
+        self.metrics = metrics
+
+        self.ratio = float(np.clip(initial_ratio, min_ratio, max_ratio))
+        self.credit = 0.
+
+        self.env_steps = 0 # since the start
+        self.updates = 0
+
+        self.decisions = []
+
+        self.reset_window()
+        self.last = None
+
+    def reset_window(self):
+        self.window_steps = 0
+        self.window_updates = 0
+        self.env_time = 0.
+        self.update_time = 0.
+
+    def step(self):
+        """One env step went by
+        Returns:
+            int: updates to run now
+        """
+        now = time.perf_counter()
+
+        if self.last is not None:
+            self.env_time += now - self.last
+            self.window_steps += 1
+
+        self.last = now
+        self.env_steps += 1
+
+        if self.window_steps >= self.adjust_every:
+            self.decide()
+
+        self.credit += self.ratio
+        num_updates = int(self.credit)
+        self.credit -= num_updates
+
+        return num_updates
+
+    def updated(self, num_updates, elapsed):
+        """num_updates ran in elapsed seconds, right after step"""
+        self.update_time += elapsed
+        self.window_updates += num_updates
+        self.updates += num_updates
+
+        # Updates aren't part of the next env step
+        self.last = time.perf_counter()
+
+    def decide(self):
+        # Time per env step and per update over the window
+        env_time = self.env_time / max(self.window_steps, 1)
+        update_time = self.update_time / self.window_updates if self.window_updates else None
+
+        # Nothing to go by until updates have been timed
+        if self.target_share is not None and update_time is None:
+            self.reset_window()
+            return
+
+        if self.target_share is not None:
+            target = self.target_share * env_time / ((1 - self.target_share) * max(update_time, 1e-9))
+        else:
+            target = self.target_ratio
+
+        target = float(np.clip(target, self.min_ratio, self.max_ratio))
+        self.ratio += self.smoothing * (target - self.ratio)
+
+        total = self.env_time + self.update_time
+
+        decision = {'utd_env_steps': self.env_steps,
+                    'utd_updates': self.updates,
+                    'env_step_time': env_time,
+                    'update_time': update_time,
+                    'update_share': self.update_time / total if total > 0 else 0.,
+                    'utd_target': target,
+                    'utd_ratio': self.ratio}
+
+        self.decisions.append(decision)
+
+        if self.metrics is not None:
+            self.metrics.write(decision)
+
+        self.reset_window()
+
+    def state_dict(self):
+        return {'ratio': self.ratio,
+                'credit': self.credit,
+                'env_steps': self.env_steps,
+                'updates': self.updates}
+
+    def load_state_dict(self, state):
+        self.ratio = state['ratio']
+        self.credit = state['credit']
+        self.env_steps = state['env_steps']
+        self.updates = state['updates']
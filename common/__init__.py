@@ -1,5 +1,20 @@
 from .BaseNetwork import BaseNetwork
 from .CategoricalPolicy import CategoricalPolicy
+from .NumpyPolicy import NumpyPolicy
 from .Critic import Critic
+from .CriticEnsemble import CriticEnsemble
+from .Encoder import Encoder
 from .ReplayBuffer import ReplayBuffer
+from .SumTree import SumTree, MinTree
+from .PrioritizedReplayBuffer import PrioritizedReplayBuffer
+from .NStepWindow import NStepWindow
+from .PrefetchSampler import PrefetchSampler
+from .UTDScheduler import UTDScheduler
+from .ICM import ICM
+from .RunningMeanStd import RunningMeanStd
+from .RND import RND
+from .EpisodicMemory import EpisodicMemory
+from .CheckpointManager import CheckpointManager
+from .Metrics import Metrics
+from .PolicyServer import PolicyServer, PolicyClient
 from .Config import Config
\ No newline at end of file
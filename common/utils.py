@@ -1,6 +1,8 @@
 import time
+import random
 import datetime
 import torch
+import torch.nn as nn
 import numpy as np
 from collections import namedtuple
 
@@ -15,6 +17,15 @@ make_experience = namedtuple('Experience',
                                           'next_state',
                                           'done'])
 
+def set_seed(seed, env=None):
+    """Seeds random, NumPy, torch and, when it can be seeded, env"""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    if env is not None and hasattr(env, 'seed'):
+        env.seed(seed)
+
 def hidden_init(layer):
     """Will return a tuple with the range for the initialization
     of hidden layers
@@ -27,6 +38,22 @@ def hidden_init(layer):
     lim = 1. / np.sqrt(fan_in)
     return (-lim, lim)
 
+def make_mlp(dims, activ):
+    """Builds a stack of linear layers with activ between them
+    Args:
+        dims (tuple of int): (dim_in, hidden..., dim_out)
+        activ (torch.nn.Module)
+    Returns:
+        torch.nn.Sequential
+    """
+    layers = []
+
+    for dim_in, dim_out in zip(dims[:-1], dims[1:]):
+        layers += [nn.Linear(dim_in, dim_out), activ]
+
+    # No activation on the output
+    return nn.Sequential(*layers[:-1])
+
 def soft_update(local_model, target_model, tau):
     """Soft update model parameters.
     θ_target = τ*θ_local + (1 - τ)*θ_target
@@ -35,8 +62,13 @@ def soft_update(local_model, target_model, tau):
         target_model: PyTorch model (weights will be copied to)
         tau (float): interpolation parameter
     """
-    for target_param, local_param in zip(target_model.parameters(), local_model.parameters()):
-        target_param.data.copy_(tau*local_param.data + (1.0-tau)*target_param.data)
+    target_params = list(target_model.parameters())
+    local_params = list(local_model.parameters())
+
+    # In place, with multi-tensor ops (no new tensor per parameter)
+    with torch.no_grad():
+        torch._foreach_mul_(target_params, 1.0 - tau)
+        torch._foreach_add_(target_params, local_params, alpha=tau)
 
 def from_experience(experiences):
     """Returns a tuple with (s, a, r, s', d)
@@ -63,6 +95,121 @@ def from_experience(experiences):
     
     return states, actions, rewards, next_states, dones
 
+def make_vec_env(env_fn, num_envs, asynchronous=False):
+    """Builds a gym vector env with num_envs copies of env_fn()
+    Args:
+        env_fn (callable): no-args function returning a gym env
+        num_envs (int)
+        asynchronous (bool): subprocess-backed (True) or in-process (False)
+    Returns:
+        gym.vector.VectorEnv
+    """
+    import gym.vector
+
+    env_fns = [env_fn for _ in range(num_envs)]
+
+    if asynchronous:
+        return gym.vector.AsyncVectorEnv(env_fns)
+
+    return gym.vector.SyncVectorEnv(env_fns)
+
+def get_terminal_states(next_states, dones, infos):
+    """Vector envs reset finished copies on their own, so next_states holds
+    the first observation of the new episode where done is True. This puts
+    back the real last observation from infos
+    Args:
+        next_states (np.ndarray): (N, state_size)
+        dones (np.ndarray): (N,)
+        infos (tuple of dict or dict)
+    Returns:
+        np.ndarray
+    """
+    if not np.any(dones):
+        return next_states
+
+    states = np.array(next_states, copy=True)
+
+    # Batched envs hand back the whole (N, state_size) array
+    if isinstance(infos, dict) and isinstance(infos.get('final_observation'), np.ndarray) \
+       and infos['final_observation'].dtype != object:
+        dones = np.asarray(dones, dtype=bool)
+        states[dones] = infos['final_observation'][dones]
+        return states
+
+    for i in np.flatnonzero(dones):
+        if isinstance(infos, dict):
+            final = infos.get('final_observation')
+            final = final[i] if final is not None else None
+        else:
+            final = infos[i].get('terminal_observation')
+
+        if final is not None:
+            states[i] = final
+
+    return states
+
+def get_truncated(dones, infos):
+    """Which of the dones are time limit truncations rather than terminal
+    states, from the 'TimeLimit.truncated' info of a vector env
+    Args:
+        dones (np.ndarray): (N,)
+        infos (tuple of dict or dict)
+    Returns:
+        np.ndarray: (N,) bool
+    """
+    dones = np.asarray(dones, dtype=bool)
+
+    if not dones.any():
+        return np.zeros_like(dones)
+
+    if isinstance(infos, dict):
+        truncated = infos.get('TimeLimit.truncated')
+
+        if truncated is None:
+            return np.zeros_like(dones)
+
+        truncated = np.asarray(truncated, dtype=bool)
+
+        # gym vector envs mask the copies that set the key
+        if '_TimeLimit.truncated' in infos:
+            truncated &= np.asarray(infos['_TimeLimit.truncated'], dtype=bool)
+    else:
+        truncated = np.array([bool(info.get('TimeLimit.truncated', False)) for info in infos])
+
+    return dones & truncated
+
+def vector_episode_scores(env, act, num_episodes):
+    """Scores of num_episodes episodes on a vector env, one per copy and
+    per round. Copies reset themselves, so every round starts from a reset
+    and only the first episode each copy finishes counts: taking episodes
+    as they finish would favour the short ones
+    Args:
+        env: vector env
+        act (callable): batch of states to actions
+        num_episodes (int)
+    Returns:
+        list of float
+    """
+    scores = []
+
+    while len(scores) < num_episodes:
+        states = env.reset()
+        env_scores = np.zeros(env.num_envs)
+
+        # Only as many copies as episodes still needed
+        running = np.arange(env.num_envs) < num_episodes - len(scores)
+
+        while running.any():
+            states, rewards, dones, _ = env.step(act(states))
+            dones = np.asarray(dones, dtype=bool)
+
+            env_scores += np.where(running, rewards, 0.)
+
+            scores += list(env_scores[running & dones])
+            running &= ~dones
+
+    return scores
+
 def get_time_elapsed(start, end=None):
     """Returns a human readable (HH:mm:ss) time difference between two times
     Args:
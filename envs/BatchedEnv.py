@@ -0,0 +1,119 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class Discrete:
+    """Minimal stand-in for gym.spaces.Discrete"""
+    def __init__(self, n):
+        self.n = n
+        self.shape = ()
+
+
+class Box:
+    """Minimal stand-in for gym.spaces.Box"""
+    def __init__(self, low, high, shape):
+        self.low = np.full(shape, low, dtype=np.float32)
+        self.high = np.full(shape, high, dtype=np.float32)
+        self.shape = shape
+
+
+class BatchedEnv(ABC):
+    """num_envs instances of an environment stored as NumPy arrays and
+    stepped together in one call, with the gym vector env interface
+    Agent.train_vectorized expects:
+        reset() => states (num_envs, state_size)
+        step(actions) => next_states, rewards, dones, infos
+    Finished instances reset themselves; their last observation is in
+    infos['final_observation']. Instances time out after max_steps.
+
+    Subclasses hold their state in arrays and implement reset_envs,
+    step_envs and observe.
+
+    Args:
+        num_envs (int)
+        max_steps (int)
+        seed (int)
+    """
+    def __init__(self, num_envs, max_steps, seed=None):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        self.time_steps = np.zeros(num_envs, dtype=np.int64)
+
+    @property
+    def state_size(self):
+        return self.observation_space.shape[0]
+
+    @property
+    def action_size(self):
+        return self.action_space.n
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    @abstractmethod
+    def reset_envs(self, mask):
+        """Resets the instances where mask is True"""
+        pass
+
+    @abstractmethod
+    def step_envs(self, actions):
+        """Applies actions to every instance
+        Returns:
+            Tuple of np.ndarray: (rewards, dones)
+        """
+        pass
+
+    @abstractmethod
+    def observe(self):
+        """Returns np.ndarray: (num_envs, state_size)"""
+        pass
+
+    def reset(self):
+        self.time_steps[:] = 0
+        self.reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+        rewards, dones = self.step_envs(actions)
+        self.time_steps += 1
+
+        truncated = ~dones & (self.time_steps >= self.max_steps)
+        dones = dones | truncated
+
+        next_states = self.observe()
+        infos = {'final_observation': next_states,
+                 'TimeLimit.truncated': truncated}
+
+        if dones.any():
+            next_states = next_states.copy()
+            self.time_steps[dones] = 0
+            self.reset_envs(dones)
+            next_states[dones] = self.observe()[dones]
+
+        return next_states, rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+
+class GridEnv(BatchedEnv):
+    """Base for the size x size gridworlds: positions are (num_envs, 2)
+    integer arrays. Actions: 0 no-op, 1 up, 2 down, 3 left, 4 right"""
+    moves = np.array([[0, 0], [0, 1], [0, -1], [-1, 0], [1, 0]])
+
+    def __init__(self, num_envs, size, max_steps, seed=None):
+        super().__init__(num_envs, max_steps, seed)
+        self.size = size
+
+    def random_positions(self, n):
+        return self.rng.integers(0, self.size, size=(n, 2))
+
+    def move(self, positions, actions):
+        return np.clip(positions + self.moves[actions], 0, self.size - 1)
+
+    def normalize(self, positions):
+        return positions / (self.size - 1)
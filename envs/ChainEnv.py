@@ -0,0 +1,42 @@
+import numpy as np
+from envs import BatchedEnv, Box, Discrete
+
+
+class ChainEnv(BatchedEnv):
+    """Chain MDP: length states in a row, starting next to the left end.
+    Action 0 moves left, 1 moves right. Reaching the right end gives
+    reward 1 and ends the episode; the left end gives a small distracting
+    reward. Observations are one-hot positions.
+
+    Args:
+        num_envs (int)
+        length (int)
+        small_reward (float): reward for staying at the left end
+        max_steps (int): defaults to 2 * length
+        seed (int)
+    """
+    def __init__(self, num_envs, length=20, small_reward=1e-3, max_steps=None, seed=None):
+        super().__init__(num_envs, max_steps or 2 * length, seed)
+
+        self.length = length
+        self.small_reward = small_reward
+
+        self.observation_space = Box(0., 1., (length,))
+        self.action_space = Discrete(2)
+
+        self.positions = np.ones(num_envs, dtype=np.int64)
+        self.eye = np.eye(length, dtype=np.float32)
+
+    def reset_envs(self, mask):
+        self.positions[mask] = 1
+
+    def step_envs(self, actions):
+        self.positions = np.clip(self.positions + 2 * actions - 1, 0, self.length - 1)
+
+        dones = self.positions == self.length - 1
+        rewards = np.where(dones, 1., np.where(self.positions == 0, self.small_reward, 0.))
+
+        return rewards, dones
+
+    def observe(self):
+        return self.eye[self.positions]
@@ -0,0 +1,144 @@
+import numpy as np
+
+
+class ObservationSpec:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+class ActionSpec:
+    def __init__(self, discrete_branches):
+        self.discrete_branches = discrete_branches
+
+
+class BehaviorSpec:
+    def __init__(self, observation_shapes, discrete_branches):
+        self.observation_specs = [ObservationSpec(shape) for shape in observation_shapes]
+        self.action_spec = ActionSpec(discrete_branches)
+
+
+class Steps:
+    """Same fields as DecisionSteps/TerminalSteps"""
+    def __init__(self, obs, reward, agent_id, interrupted=None):
+        self.obs = obs
+        self.reward = reward
+        self.agent_id = agent_id
+        self.interrupted = interrupted
+
+    def __len__(self):
+        return len(self.agent_id)
+
+
+class FakeUnityEnvironment:
+    """Local stand-in for mlagents_envs UnityEnvironment, so the
+    multi-agent adapter runs without the Unity binary.
+
+    num_agents agents share one behavior. Each episode lasts a random number
+    of steps, so agents terminate at different times; an agent whose
+    episode ends shows up in the terminal steps and, with its first new
+    observation, in the decision steps of the same get_steps call (as in
+    ML-Agents). Episodes reaching max_steps are interrupted. Action
+    target_action is rewarded with 1, anything else with -0.01. With
+    replace_agents, an agent leaves the scene when its episode ends and a
+    new one (new agent_id) joins in its place.
+
+    Args:
+        num_agents (int)
+        observation_shapes (list of tuple): one per sensor
+        num_actions (int): size of the single discrete branch
+        min_steps, max_steps (int): episode length range
+        target_action (int)
+        seed (int)
+        replace_agents (bool)
+    """
+    def __init__(self,
+                 num_agents=16,
+                 observation_shapes=((56,), (56,), (57,)),
+                 num_actions=5,
+                 min_steps=10,
+                 max_steps=100,
+                 target_action=0,
+                 seed=None,
+                 behavior_name='Pyramids?team=0',
+                 replace_agents=False):
+        self.num_agents = num_agents
+        self.observation_shapes = observation_shapes
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+        self.target_action = target_action
+        self.behavior_name = behavior_name
+        self.replace_agents = replace_agents
+        self.rng = np.random.default_rng(seed)
+
+        self.behavior_specs = {behavior_name: BehaviorSpec(observation_shapes, (num_actions,))}
+
+    def random_obs(self, n):
+        return [self.rng.standard_normal((n,) + shape).astype(np.float32) \
+                for shape in self.observation_shapes]
+
+    def new_episodes(self, slots):
+        n = len(slots)
+        self.lengths[slots] = self.rng.integers(self.min_steps, self.max_steps + 1, size=n)
+        self.time_steps[slots] = 0
+
+    def reset(self):
+        slots = np.arange(self.num_agents)
+
+        # Agents live in slots, agent_ids[slot] is the one in there
+        self.agent_ids = slots.copy()
+        self.next_id = self.num_agents
+
+        self.lengths = np.zeros(self.num_agents, dtype=np.int64)
+        self.time_steps = np.zeros(self.num_agents, dtype=np.int64)
+        self.new_episodes(slots)
+
+        self.decision_steps = Steps(self.random_obs(self.num_agents),
+                                    np.zeros(self.num_agents, dtype=np.float32),
+                                    self.agent_ids.copy())
+        self.terminal_steps = Steps(self.random_obs(0),
+                                    np.zeros(0, dtype=np.float32),
+                                    np.zeros(0, dtype=np.int64),
+                                    np.zeros(0, dtype=bool))
+        self.actions = None
+
+    def get_steps(self, behavior_name):
+        return self.decision_steps, self.terminal_steps
+
+    def set_actions(self, behavior_name, actions):
+        # ActionTuple or raw array
+        actions = getattr(actions, 'discrete', actions)
+        self.actions = np.asarray(actions).reshape(-1)
+
+    def step(self):
+        n = self.num_agents
+
+        if self.actions is None or len(self.actions) != n:
+            raise ValueError('set_actions needs one action per agent requesting a decision')
+
+        rewards = np.where(self.actions == self.target_action, 1., -0.01).astype(np.float32)
+        self.actions = None
+
+        self.time_steps += 1
+
+        ended = self.time_steps >= self.lengths
+        interrupted = ended & (self.lengths >= self.max_steps)
+
+        self.terminal_steps = Steps([obs[ended] for obs in self.random_obs(n)],
+                                    rewards[ended],
+                                    self.agent_ids[ended],
+                                    interrupted[ended])
+
+        self.new_episodes(np.flatnonzero(ended))
+
+        if self.replace_agents:
+            joined = int(ended.sum())
+            self.agent_ids[ended] = self.next_id + np.arange(joined)
+            self.next_id += joined
+
+        # Agents that just ended (or joined) start over right away, with no reward yet
+        self.decision_steps = Steps(self.random_obs(n),
+                                    np.where(ended, 0., rewards).astype(np.float32),
+                                    self.agent_ids.copy())
+
+    def close(self):
+        pass
@@ -0,0 +1,50 @@
+import numpy as np
+from envs import GridEnv, Box, Discrete
+
+
+class KeyDoorEnv(GridEnv):
+    """Gridworld where the agent has to pick up a key before the door
+    opens. Reaching the open door gives reward 1 and ends the episode.
+    Agent, key and door are placed at random on reset.
+    Observation: agent, key and door positions (normalized) and has_key.
+
+    Args:
+        num_envs (int)
+        size (int): grid side
+        max_steps (int): defaults to 4 * size * size
+        seed (int)
+    """
+    def __init__(self, num_envs, size=8, max_steps=None, seed=None):
+        super().__init__(num_envs, size, max_steps or 4 * size * size, seed)
+
+        self.observation_space = Box(0., 1., (7,))
+        self.action_space = Discrete(len(self.moves))
+
+        self.agents = np.zeros((num_envs, 2), dtype=np.int64)
+        self.keys = np.zeros((num_envs, 2), dtype=np.int64)
+        self.doors = np.zeros((num_envs, 2), dtype=np.int64)
+        self.has_key = np.zeros(num_envs, dtype=bool)
+
+    def reset_envs(self, mask):
+        n = np.count_nonzero(mask)
+
+        self.agents[mask] = self.random_positions(n)
+        self.keys[mask] = self.random_positions(n)
+        self.doors[mask] = self.random_positions(n)
+        self.has_key[mask] = False
+
+    def step_envs(self, actions):
+        self.agents = self.move(self.agents, actions)
+
+        self.has_key |= np.all(self.agents == self.keys, axis=1)
+
+        dones = self.has_key & np.all(self.agents == self.doors, axis=1)
+        rewards = dones.astype(np.float32)
+
+        return rewards, dones
+
+    def observe(self):
+        return np.concatenate([self.normalize(self.agents),
+                               self.normalize(self.keys),
+                               self.normalize(self.doors),
+                               self.has_key[:, None]], axis=1).astype(np.float32)
@@ -0,0 +1,59 @@
+import numpy as np
+from envs import GridEnv, Box, Discrete
+
+
+class PyramidsLikeEnv(GridEnv):
+    """Stand-in for the Unity Pyramids task: press a switch, which makes a
+    goal appear somewhere else, then reach the goal for reward 2. Every
+    step costs 0.001, as in Pyramids, and there are 5 discrete actions.
+    Observation: agent and switch positions, switch on, goal position
+    (zeros until the switch is pressed).
+
+    Args:
+        num_envs (int)
+        size (int): grid side
+        step_penalty (float)
+        max_steps (int): defaults to 4 * size * size
+        seed (int)
+    """
+    def __init__(self, num_envs, size=10, step_penalty=1e-3, max_steps=None, seed=None):
+        super().__init__(num_envs, size, max_steps or 4 * size * size, seed)
+
+        self.step_penalty = step_penalty
+
+        self.observation_space = Box(0., 1., (7,))
+        self.action_space = Discrete(len(self.moves))
+
+        self.agents = np.zeros((num_envs, 2), dtype=np.int64)
+        self.switches = np.zeros((num_envs, 2), dtype=np.int64)
+        self.goals = np.zeros((num_envs, 2), dtype=np.int64)
+        self.switch_on = np.zeros(num_envs, dtype=bool)
+
+    def reset_envs(self, mask):
+        n = np.count_nonzero(mask)
+
+        self.agents[mask] = self.random_positions(n)
+        self.switches[mask] = self.random_positions(n)
+        self.switch_on[mask] = False
+
+    def step_envs(self, actions):
+        self.agents = self.move(self.agents, actions)
+
+        pressed = ~self.switch_on & np.all(self.agents == self.switches, axis=1)
+
+        if pressed.any():
+            self.goals[pressed] = self.random_positions(np.count_nonzero(pressed))
+            self.switch_on |= pressed
+
+        dones = self.switch_on & ~pressed & np.all(self.agents == self.goals, axis=1)
+        rewards = np.where(dones, 2., -self.step_penalty)
+
+        return rewards, dones
+
+    def observe(self):
+        goals = self.normalize(self.goals) * self.switch_on[:, None]
+
+        return np.concatenate([self.normalize(self.agents),
+                               self.normalize(self.switches),
+                               self.switch_on[:, None],
+                               goals], axis=1).astype(np.float32)
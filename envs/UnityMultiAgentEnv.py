@@ -0,0 +1,242 @@
+import numpy as np
+from collections import defaultdict
+
+try:
+    from mlagents_envs.base_env import ActionTuple
+except ImportError:
+    # Older ML-Agents take the raw action array, so does the fake
+    ActionTuple = None
+
+
+def observation_size(spec):
+    if hasattr(spec, 'observation_specs'):
+        shapes = [obs_spec.shape for obs_spec in spec.observation_specs]
+    else:
+        shapes = spec.observation_shapes
+
+    return sum(int(np.prod(shape)) for shape in shapes)
+
+def discrete_branches(spec):
+    if hasattr(spec, 'action_spec'):
+        return tuple(spec.action_spec.discrete_branches)
+
+    return tuple(spec.discrete_action_branches)
+
+def flatten_obs(steps):
+    """All the sensors of every agent in steps as one (n_agents, state_size) array"""
+    n = len(steps)
+    return np.concatenate([np.reshape(obs, (n, -1)) for obs in steps.obs], axis=1).astype(np.float32)
+
+
+class UnityMultiAgentEnv:
+    """Collects decisions from every agent of a Unity scene at once, through
+    the ML-Agents low-level DecisionSteps/TerminalSteps API, instead of the
+    single agent UnityToGymWrapper exposes.
+
+    On each collect_step all the agents asking for a decision are acted on
+    with a single batched act, and the transitions of every agent that
+    decided or terminated since the previous step are added to the replay
+    buffer in one insert. Agents finish their episodes at different times;
+    each one is tracked by its agent_id, and maps to a replay stream so a
+    compact buffer can chain its observations.
+
+    Args:
+        unity_env (UnityEnvironment): or anything with the same API,
+            e.g. envs.FakeUnityEnvironment
+        behavior_name (str): defaults to the first behavior
+    """
+    multi_agent = True
+
+    def __init__(self, unity_env, behavior_name=None):
+        self.env = unity_env
+        self.env.reset()
+
+        if behavior_name is None:
+            behavior_name = list(self.env.behavior_specs)[0]
+
+        self.behavior_name = behavior_name
+
+        spec = self.env.behavior_specs[behavior_name]
+        branches = discrete_branches(spec)
+
+        if len(branches) != 1:
+            raise ValueError('Only a single discrete action branch is supported, got {}'.format(branches))
+
+        self.state_size = observation_size(spec)
+        self.action_size = branches[0]
+
+        self.clear()
+
+    def clear(self):
+        self.last_states = {}
+        self.last_actions = {}
+        self.scores = defaultdict(float)
+        self.streams = {} # agent_id: replay stream, reused once it's done
+        self.free_streams = []
+
+    def stream(self, agent_id):
+        if agent_id not in self.streams:
+            free = self.free_streams.pop() if self.free_streams else len(self.streams)
+            self.streams[agent_id] = free
+
+        return self.streams[agent_id]
+
+    def release(self, agent_id):
+        if agent_id in self.streams:
+            stream = self.streams.pop(agent_id)
+            self.free_streams.append(stream)
+            return stream
+
+    def reset(self):
+        self.env.reset()
+        self.clear()
+
+    def end_episodes(self, agent):
+        """Closes the streams of every running episode (n-step windows
+        flushed, episodic memories forgotten) before a reset drops them,
+        so they aren't joined with the next agents mapped to them"""
+        streams = list(self.streams.values())
+
+        if streams:
+            agent.end_streams(streams)
+
+    def set_actions(self, actions):
+        actions = np.asarray(actions, dtype=np.int32).reshape(-1, 1)
+
+        if ActionTuple is not None:
+            actions = ActionTuple(discrete=actions)
+
+        self.env.set_actions(self.behavior_name, actions)
+
+    def get_steps(self):
+        decision_steps, terminal_steps = self.env.get_steps(self.behavior_name)
+
+        if hasattr(terminal_steps, 'interrupted'):
+            interrupted = terminal_steps.interrupted
+        else:
+            interrupted = terminal_steps.max_step
+
+        return decision_steps, terminal_steps, np.asarray(interrupted, dtype=bool)
+
+    def collect_step(self, agent, train=True):
+        """Routes the transitions since the previous step to agent (when
+        training), acts for every agent requesting a decision and steps
+        the simulation
+
+        Returns:
+            list of tuple: (agent_id, score) of the episodes that just finished
+        """
+        decision_steps, terminal_steps, interrupted = self.get_steps()
+
+        transitions = []
+        finished = []
+
+        # Agents that terminated: their last observation is in terminal_steps
+        if len(terminal_steps) > 0:
+            next_states = flatten_obs(terminal_steps)
+
+            for i, agent_id in enumerate(terminal_steps.agent_id):
+                reward = terminal_steps.reward[i]
+
+                if agent_id in self.last_states:
+                    # Interrupted (max steps) isn't a real terminal state
+                    transitions.append((self.last_states.pop(agent_id),
+                                        self.last_actions.pop(agent_id),
+                                        reward,
+                                        next_states[i],
+                                        not interrupted[i],
+                                        self.stream(agent_id)))
+
+                finished.append((agent_id, self.scores.pop(agent_id, 0.) + reward))
+
+            terminated = terminal_steps.agent_id
+        else:
+            terminated = []
+
+        if len(decision_steps) == 0:
+            self.add_transitions(agent, transitions, train, terminated)
+            self.env.step()
+            return finished
+
+        states = flatten_obs(decision_steps)
+        agent_ids = decision_steps.agent_id
+
+        for i, agent_id in enumerate(agent_ids):
+            reward = decision_steps.reward[i]
+
+            if agent_id in self.last_states:
+                transitions.append((self.last_states[agent_id],
+                                    self.last_actions[agent_id],
+                                    reward,
+                                    states[i],
+                                    False,
+                                    self.stream(agent_id)))
+
+                self.scores[agent_id] += reward
+
+        self.add_transitions(agent, transitions, train, terminated)
+
+        with agent.metrics.time('act'):
+            actions = agent.act(states, train=train)
+
+        self.set_actions(actions)
+
+        for i, agent_id in enumerate(agent_ids):
+            self.last_states[agent_id] = states[i]
+            self.last_actions[agent_id] = actions[i]
+
+        with agent.metrics.time('env_step'):
+            self.env.step()
+
+        return finished
+
+    def add_transitions(self, agent, transitions, train, terminated=()):
+        # Streams of terminated agents are free once their last transition
+        # is in, not before: a batch can't hold the same stream twice
+        if train and transitions:
+            self.insert(agent, transitions)
+
+        released = [self.release(agent_id) for agent_id in terminated]
+
+        # Interrupted episodes aren't done, close them before reuse
+        if train:
+            agent.end_streams([stream for stream in released if stream is not None])
+
+    def insert(self, agent, transitions):
+        states, actions, rewards, next_states, dones, streams = zip(*transitions)
+
+        agent.step_batch(np.array(states),
+                         np.array(actions),
+                         np.array(rewards, dtype=np.float32),
+                         np.array(next_states),
+                         np.array(dones, dtype=np.float32),
+                         np.array(streams))
+
+    def evaluate(self, agent, num_episodes):
+        """Greedy average score over num_episodes episodes. Every round
+        starts from a reset and counts the first episode of each agent there
+        at the reset (as many as still needed): taking episodes as they
+        finish would favour the short ones. Nothing goes to the replay
+        buffer, the training episodes under way are closed"""
+        self.end_episodes(agent)
+
+        scores = []
+
+        while len(scores) < num_episodes:
+            self.reset()
+
+            decision_steps, _, _ = self.get_steps()
+            cohort = set(decision_steps.agent_id[:num_episodes - len(scores)].tolist())
+
+            while cohort:
+                for agent_id, score in self.collect_step(agent, train=False):
+                    if agent_id in cohort:
+                        cohort.remove(agent_id)
+                        scores.append(score)
+
+        self.reset()
+
+        return np.mean(scores)
+
+    def close(self):
+        self.env.close()
@@ -0,0 +1,6 @@
+from .BatchedEnv import Box, Discrete, BatchedEnv, GridEnv
+from .ChainEnv import ChainEnv
+from .KeyDoorEnv import KeyDoorEnv
+from .PyramidsLikeEnv import PyramidsLikeEnv
+from .UnityMultiAgentEnv import UnityMultiAgentEnv
+from .FakeUnityEnvironment import FakeUnityEnvironment
@@ -0,0 +1,74 @@
+import queue
+import threading
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+from common import Config, CategoricalPolicy
+from agent import SACAgent, ActorLearner
+from agent.ActorLearner import run_actor
+from envs import ChainEnv
+
+
+class CountingEnv:
+    """Single gym-style env, episodes of 5 steps"""
+    def reset(self):
+        self.t = 0
+        return np.zeros(4, dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        return np.full(4, self.t, dtype=np.float32), 1., self.t == 5, {}
+
+    def close(self):
+        pass
+
+
+class Value:
+    """Stands in for the shared mp.Value version"""
+    value = 0
+
+
+def make_agent(**settings):
+    config = Config()
+    config.state_size = 20
+    config.action_size = 2
+    config.buffer_size = 100
+    config.batch_size = 8
+    config.hidden_actor = (16,)
+    config.hidden_critic = (16,)
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+    return SACAgent(config)
+
+@pytest.mark.parametrize('settings', [dict(n_step=3),
+                                      dict(use_episodic=True),
+                                      dict(utd_adaptive=True)])
+def test_rejects_settings_actors_bypass(settings):
+    with pytest.raises(ValueError):
+        ActorLearner(make_agent(**settings), ChainEnv)
+
+def test_unseeded_actor_runs():
+    policy_args = (4, 2, (8,), nn.ReLU())
+    shared_policy = CategoricalPolicy(*policy_args)
+    messages = queue.Queue()
+    stop = threading.Event()
+    num_threads = torch.get_num_threads()
+
+    # In a thread instead of a process, the queues work the same
+    actor = threading.Thread(target=run_actor,
+                             args=(0, CountingEnv, policy_args, shared_policy, Value(),
+                                   threading.Lock(), messages, stop, 100, 5, None))
+    actor.start()
+
+    message = messages.get(timeout=30)
+    stop.set()
+    actor.join(timeout=30)
+
+    torch.set_num_threads(num_threads)
+
+    # One episode of 5 steps, then its 5 transitions
+    assert message == ('episode', 0, 5.)
+    assert messages.get(timeout=30)[0] == 'transitions'
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from envs import BatchedEnv, ChainEnv, KeyDoorEnv, PyramidsLikeEnv
+
+
+@pytest.mark.parametrize('env_cls', [ChainEnv, KeyDoorEnv, PyramidsLikeEnv])
+def test_vector_env_interface(env_cls):
+    env = env_cls(4, seed=0)
+    states = env.reset()
+
+    assert states.shape == (4, env.state_size)
+
+    for _ in range(3):
+        actions = np.random.default_rng(0).integers(0, env.action_size, 4)
+        states, rewards, dones, infos = env.step(actions)
+
+        assert states.shape == (4, env.state_size)
+        assert rewards.shape == dones.shape == (4,)
+        assert rewards.dtype == np.float32
+
+def test_time_limit_truncates_and_resets():
+    env = ChainEnv(3, length=10, max_steps=4)
+    env.reset()
+
+    for _ in range(4):
+        # Always left, the right end is never reached
+        states, _, dones, infos = env.step(np.zeros(3))
+
+    assert dones.all()
+    assert infos['TimeLimit.truncated'].all()
+
+    # The last observation is kept, the returned one is the new episode's
+    assert (infos['final_observation'].argmax(axis=1) == 0).all()
+    assert (states.argmax(axis=1) == 1).all()
+    assert (env.time_steps == 0).all()
+
+def test_reaching_the_goal_is_terminal():
+    env = ChainEnv(1, length=3)
+    env.reset()
+
+    _, rewards, dones, infos = env.step(np.ones(1))
+
+    assert dones[0] and rewards[0] == 1.
+    assert not infos['TimeLimit.truncated'][0]
+
+def test_incomplete_subclass_fails_at_construction():
+    class NoObserve(BatchedEnv):
+        def reset_envs(self, mask):
+            pass
+
+        def step_envs(self, actions):
+            pass
+
+    with pytest.raises(TypeError):
+        NoObserve(2, 10)
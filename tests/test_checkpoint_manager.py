@@ -0,0 +1,115 @@
+import os
+import numpy as np
+import pytest
+import torch
+from common import CheckpointManager, Config
+from agent import SACAgent
+
+
+def test_writes_a_snapshot_of_the_state(tmp_path):
+    manager = CheckpointManager(str(tmp_path), 'Test', min_interval=0.)
+    weights = torch.zeros(3)
+
+    manager.save(lambda: {'weights': weights, 'step': 1}, score=1.)
+
+    # Changed after save: the checkpoint still has the values at save time
+    weights += 1
+    manager.wait()
+    manager.close()
+
+    state = torch.load(manager.latest(), weights_only=True)
+
+    assert torch.equal(state['weights'], torch.zeros(3))
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
+
+def test_keeps_the_last_or_the_best(tmp_path):
+    last = CheckpointManager(str(tmp_path / 'last'), keep=2, min_interval=0.)
+    best = CheckpointManager(str(tmp_path / 'best'), keep=2, keep_best=True, min_interval=0.)
+
+    for score in [3., 1., 2., 0.]:
+        for manager in (last, best):
+            manager.save(lambda: {'score': score}, score)
+            manager.wait()
+
+    assert [c['score'] for c in last.checkpoints] == [2., 0.]
+    assert sorted(c['score'] for c in best.checkpoints) == [2., 3.]
+    assert len([f for f in os.listdir(tmp_path / 'last') if f.endswith('.pt')]) == 2
+
+    for manager in (last, best):
+        manager.close()
+
+def test_reopened_directory_resumes_the_index(tmp_path):
+    manager = CheckpointManager(str(tmp_path), min_interval=0.)
+    manager.save(lambda: {}, 1.)
+    manager.close()
+
+    reopened = CheckpointManager(str(tmp_path), min_interval=0.)
+
+    assert reopened.latest() == manager.latest()
+
+    # Numbering carries on instead of overwriting
+    reopened.save(lambda: {}, 2.)
+    reopened.close()
+
+    assert reopened.latest() != manager.latest()
+
+def test_write_errors_surface_in_wait(tmp_path, monkeypatch):
+    manager = CheckpointManager(str(tmp_path), min_interval=0.)
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    with monkeypatch.context() as m:
+        m.setattr(torch, 'save', fail)
+
+        with pytest.warns(UserWarning):
+            manager.save(lambda: {}, 1.)
+
+            with pytest.raises(RuntimeError):
+                manager.wait()
+
+    # The writer survived
+    manager.save(lambda: {}, 2.)
+    manager.wait()
+    manager.close()
+
+    assert manager.latest() is not None
+
+class EndlessEnv:
+    def reset(self):
+        return np.zeros(2, dtype=np.float32)
+
+    def step(self, action):
+        return np.ones(2, dtype=np.float32), float(action), False, {}
+
+    def close(self):
+        pass
+
+def test_agent_resumes_from_its_checkpoint(tmp_path):
+    def make_agent():
+        config = Config()
+        config.env = EndlessEnv()
+        config.state_size = 2
+        config.action_size = 2
+        config.buffer_size = 100
+        config.batch_size = 8
+        config.hidden_actor = (8,)
+        config.hidden_critic = (8,)
+        config.num_episodes = 3
+        config.max_steps = 10
+        config.env_solved = 100.
+        config.checkpoint_dir = str(tmp_path)
+        config.checkpoint_min_interval = 0.
+        return SACAgent(config)
+
+    agent = make_agent()
+    agent.train()
+
+    resumed = make_agent()
+
+    # Loaded with torch's default weights_only
+    assert resumed.resume()
+    assert resumed.episode == 3
+    assert resumed.scores == agent.scores
+    assert all(isinstance(score, float) for score in resumed.scores)
+    assert torch.equal(resumed.policy.layers[0].weight, agent.policy.layers[0].weight)
@@ -0,0 +1,103 @@
+import numpy as np
+from common import ReplayBuffer
+
+
+def rollout(num_streams, steps, episode_end=0.1, broken=0.05, seed=0):
+    """Batches of one transition per stream, next_state being the
+    following state unless the episode ends or the chain is broken"""
+    rng = np.random.default_rng(seed)
+    states = rng.standard_normal((num_streams, 3)).astype(np.float32)
+
+    for _ in range(steps):
+        next_states = rng.standard_normal((num_streams, 3)).astype(np.float32)
+        dones = rng.random(num_streams) < episode_end
+
+        # Episode ends (and broken chains) start from a new state
+        following = next_states.copy()
+        restart = dones | (rng.random(num_streams) < broken)
+        following[restart] = rng.standard_normal((int(restart.sum()), 3))
+
+        yield states, rng.integers(0, 4, num_streams), rng.standard_normal(num_streams), next_states, dones
+
+        states = following
+
+def fill_both(buffer_size, num_streams, steps, tail_size=None, **kwargs):
+    compact = ReplayBuffer(buffer_size, 8, 3, compact=True, action_size=4, tail_size=tail_size)
+    plain = ReplayBuffer(buffer_size, 8, 3)
+
+    for batch in rollout(num_streams, steps, **kwargs):
+        compact.add_batch(*batch)
+        plain.add_batch(*batch)
+
+    return compact, plain
+
+def assert_same(compact, plain):
+    idxs = np.arange(len(plain))
+
+    for a, b in zip(compact.gather(idxs), plain.gather(idxs)):
+        assert a.dtype == b.dtype
+        assert np.allclose(a.numpy(), b.numpy())
+
+def test_matches_plain_buffer():
+    compact, plain = fill_both(1000, 4, 100)
+
+    assert len(compact) == 400
+    assert compact.tail_evictions == 0
+    assert_same(compact, plain)
+
+def test_matches_plain_buffer_after_wrapping():
+    compact, plain = fill_both(256, 4, 300)
+
+    assert compact.tail_evictions == 0
+    assert_same(compact, plain)
+
+def test_only_chain_breaks_use_the_tail():
+    compact, _ = fill_both(1000, 1, 50, episode_end=0., broken=0.)
+
+    # One unbroken episode: every next_state is the following slot's state
+    # but the last one, still pending
+    assert compact.tail_pos == 0
+    assert (compact.next_idx[:49] == np.arange(1, 50)).all()
+    assert compact.next_idx[49] < -compact.tail_size
+
+def test_repeated_stream_in_one_batch():
+    compact = ReplayBuffer(100, 8, 3, compact=True, action_size=4)
+    plain = ReplayBuffer(100, 8, 3)
+
+    # Chunks from a single stream, as actors send them
+    states = np.arange(30, dtype=np.float32).reshape(10, 3)
+    next_states = np.vstack([states[1:], [[-1., -1., -1.]]])
+
+    for buffer in (compact, plain):
+        buffer.add_batch(states[:5], np.zeros(5), np.zeros(5), next_states[:5], np.zeros(5), np.zeros(5, dtype=int))
+        buffer.add_batch(states[5:], np.zeros(5), np.zeros(5), next_states[5:], np.zeros(5), np.zeros(5, dtype=int))
+
+    assert compact.tail_pos == 0
+    assert_same(compact, plain)
+
+def test_tail_eviction_falls_back_to_own_state():
+    compact, _ = fill_both(1000, 2, 50, tail_size=2, episode_end=0.5)
+
+    assert compact.tail_evictions > 0
+
+    idxs = np.arange(len(compact))
+    evicted = compact.next_idx[idxs] == idxs
+
+    states, _, _, next_states, _ = compact.gather(idxs)
+    assert np.allclose(next_states.numpy()[evicted], states.numpy()[evicted])
+
+def test_flush_parks_pending_next_states(tmp_path):
+    compact = ReplayBuffer(100, 8, 3, storage_dir=str(tmp_path), compact=True, action_size=4)
+    plain = ReplayBuffer(100, 8, 3)
+
+    for batch in rollout(2, 10, episode_end=0.):
+        compact.add_batch(*batch)
+        plain.add_batch(*batch)
+
+    compact.flush()
+
+    # Reopened from disk, the pending next_states come from the tail
+    resumed = ReplayBuffer(100, 8, 3, storage_dir=str(tmp_path), compact=True, action_size=4)
+
+    assert len(resumed) == 20
+    assert_same(resumed, plain)
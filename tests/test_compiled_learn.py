@@ -0,0 +1,58 @@
+import warnings
+import numpy as np
+import pytest
+import torch
+from common import Config
+from agent import SACAgent
+
+pytestmark = pytest.mark.skipif(not hasattr(torch, 'compile'), reason='torch.compile is not available')
+
+
+def make_agent(**settings):
+    config = Config()
+    config.state_size = 4
+    config.action_size = 3
+    config.buffer_size = 100
+    config.batch_size = 8
+    config.hidden_actor = (16,)
+    config.hidden_critic = (16,)
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+    agent = SACAgent(config)
+    rng = np.random.default_rng(0)
+
+    for _ in range(20):
+        agent.memory.add(rng.random(4), rng.integers(3), rng.random(), rng.random(4), 0.)
+
+    return agent
+
+def test_compiled_learn_with_alpha_tuning():
+    agent = make_agent(compile_learn=True, alpha_auto_tuning=True)
+    log_alpha = agent.log_alpha.detach().clone()
+
+    with warnings.catch_warnings():
+        # A fallback to eager would warn
+        warnings.simplefilter('error')
+
+        for _ in range(2):
+            agent.learn(agent.memory.sample())
+
+    assert set(agent.compiled) == {'critic_loss', 'actor_loss'}
+    assert not torch.equal(agent.log_alpha.detach(), log_alpha)
+
+def test_compiled_matches_eager_losses():
+    torch.manual_seed(0)
+    compiled = make_agent(compile_learn=True)
+
+    torch.manual_seed(0)
+    eager = make_agent()
+
+    states = torch.rand((8, 4))
+
+    policy_loss, log_props = compiled.compiled['actor_loss'](states, compiled.alpha)
+    expected_loss, expected_log_props = eager.actor_loss(states, eager.alpha)
+
+    assert torch.allclose(policy_loss, expected_loss, atol=1e-5)
+    assert torch.allclose(log_props, expected_log_props, atol=1e-5)
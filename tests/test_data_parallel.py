@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import torch
+from common import Config
+from agent import SACAgent, DataParallelLearner
+
+
+def make_agent(**settings):
+    config = Config()
+    config.state_size = 4
+    config.action_size = 3
+    config.buffer_size = 100
+    config.batch_size = 8
+    config.hidden_actor = (16,)
+    config.hidden_critic = (16,)
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+    agent = SACAgent(config)
+    rng = np.random.default_rng(0)
+
+    for _ in range(20):
+        agent.memory.add(rng.random(4), rng.integers(3), rng.random(), rng.random(4), 0.)
+
+    return agent
+
+def test_batch_must_split_evenly():
+    with pytest.raises(ValueError):
+        DataParallelLearner(make_agent(), num_ranks=3)
+
+def test_sharded_update_matches_full_batch():
+    # Equal shards of a mean loss: the averaged gradients are the full
+    # batch's, so both ranks step like a single learner would
+    agent = make_agent(alpha_auto_tuning=True)
+    single = make_agent(alpha_auto_tuning=True)
+    single.load_training_state(agent.training_state())
+
+    experiences = agent.memory.sample()
+    learner = DataParallelLearner(agent, num_ranks=2, threads_per_rank=1).start()
+
+    try:
+        agent.learn(experiences)
+    finally:
+        learner.stop()
+
+    single.learn(experiences)
+
+    for name in ('Q_local', 'Q_target', 'policy'):
+        for p, q in zip(getattr(agent, name).parameters(), getattr(single, name).parameters()):
+            assert torch.allclose(p, q, atol=1e-5), name
+
+    assert torch.allclose(agent.log_alpha, single.log_alpha, atol=1e-6)
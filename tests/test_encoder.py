@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import torch
+from common import Config
+from agent import SACAgent
+
+
+def make_agent(encoder_grad):
+    config = Config()
+    config.state_size = 4
+    config.action_size = 3
+    config.buffer_size = 100
+    config.batch_size = 8
+    config.hidden_actor = (16,)
+    config.hidden_critic = (16,)
+    config.use_encoder = True
+    config.encoder_feature_size = 8
+    config.hidden_encoder = (16,)
+    config.encoder_grad = encoder_grad
+
+    agent = SACAgent(config)
+    rng = np.random.default_rng(0)
+
+    for _ in range(20):
+        agent.memory.add(rng.random(4), rng.integers(3), rng.random(), rng.random(4), 0.)
+
+    return agent
+
+@pytest.mark.parametrize('encoder_grad, critic, actor', [('none', False, False),
+                                                         ('critic', True, False),
+                                                         ('actor', False, True),
+                                                         ('both', True, True)])
+def test_features_carry_gradients_of_chosen_losses(encoder_grad, critic, actor):
+    agent = make_agent(encoder_grad)
+    states, next_states = torch.rand((8, 4)), torch.rand((8, 4))
+
+    critic_features, policy_features, next_features, next_target_features = \
+        agent.encode(states, next_states)
+
+    assert critic_features.requires_grad == critic
+    assert policy_features.requires_grad == actor
+    assert not next_features.requires_grad
+    assert not next_target_features.requires_grad
+
+@pytest.mark.parametrize('encoder_grad', ['critic', 'actor', 'both'])
+def test_learning_trains_encoder(encoder_grad):
+    agent = make_agent(encoder_grad)
+    params = [p.detach().clone() for p in agent.encoder.parameters()]
+
+    agent.learn(agent.memory.sample())
+
+    assert any(not torch.equal(p, q) for p, q in zip(params, agent.encoder.parameters()))
+
+def test_frozen_encoder_only_moves_target():
+    agent = make_agent('none')
+    params = [p.detach().clone() for p in agent.encoder.parameters()]
+
+    with torch.no_grad():
+        for p in agent.encoder_target.parameters():
+            p.zero_()
+
+    agent.learn(agent.memory.sample())
+
+    assert all(torch.equal(p, q) for p, q in zip(params, agent.encoder.parameters()))
+    assert all(p.grad is None for p in agent.encoder.parameters())
+    # Soft update toward the encoder
+    assert any(p.abs().sum() > 0 for p in agent.encoder_target.parameters())
@@ -0,0 +1,54 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from common import EpisodicMemory
+from common.utils import device
+
+
+def make_memory(**kwargs):
+    torch.manual_seed(0)
+    return EpisodicMemory(4, 8, (16,), nn.ReLU(), **kwargs)
+
+def test_familiar_observations_get_less_bonus():
+    memory = make_memory(capacity=100, k=5)
+    rng = np.random.default_rng(0)
+
+    # Empty memory: no bonus
+    assert memory.bonus(torch.ones((1, 4), device=device))[0] == 0.
+
+    for _ in range(20):
+        memory.bonus(torch.ones((1, 4), device=device))
+
+    familiar = memory.bonus(torch.ones((1, 4), device=device))[0]
+    novel = memory.bonus(torch.from_numpy(rng.standard_normal((1, 4), dtype=np.float32) * 10).to(device))[0]
+
+    assert novel > familiar
+
+def test_streams_are_independent_and_reset():
+    memory = make_memory(capacity=10, k=2)
+    states = torch.ones((2, 4), device=device)
+
+    memory.bonus(states[:1], np.array([0]))
+
+    # Stream 1 hasn't seen anything yet
+    bonuses = memory.bonus(states, np.array([0, 1]))
+    assert bonuses[0] > 0 and bonuses[1] == 0
+
+    memory.reset([0])
+    assert (memory.counts == [0, 1]).all()
+
+def test_candidates_are_distinct_slots():
+    memory = make_memory(capacity=4, k=3, num_candidates=3)
+
+    query = torch.zeros((1, 8), device=device)
+    far = [torch.full((1, 8), 100. * (i + 1), device=device) for i in range(3)]
+
+    for _ in range(50):
+        memory.reset()
+
+        for embedding in [query] + far:
+            memory.bonus(embeddings=embedding)
+
+        # A single entry matches: its slot counted twice would double the kernel sum
+        bonus = memory.bonus(embeddings=query)[0]
+        assert bonus > 0.9
@@ -0,0 +1,48 @@
+import torch
+import torch.nn as nn
+from common import ICM
+from common.utils import device
+
+
+def make_batch(n=32):
+    torch.manual_seed(0)
+    states = torch.randn((n, 4), device=device)
+    actions = torch.randint(0, 3, (n, 1), device=device)
+
+    # Next state depends on the action, so both models have something to learn
+    next_states = states + actions.float()
+    return states, actions, next_states
+
+def test_bonus_per_transition():
+    icm = ICM(4, 3, 8, (16,), nn.ReLU())
+    rewards, loss = icm(*make_batch())
+
+    assert rewards.shape == (32, 1)
+    assert (rewards >= 0).all()
+    assert loss.dim() == 0
+
+def test_features_learned_by_inverse_model_only():
+    # beta=1 keeps only the forward loss, which must not reach the encoder
+    icm = ICM(4, 3, 8, (16,), nn.ReLU(), beta=1.)
+    _, loss = icm(*make_batch())
+    loss.backward()
+
+    assert all(p.grad is None or (p.grad == 0).all() for p in icm.encoder.parameters())
+    assert any(p.grad is not None and (p.grad != 0).any() for p in icm.forward_model.parameters())
+
+def test_training_lowers_the_bonus_of_seen_transitions():
+    icm = ICM(4, 3, 8, (16,), nn.ReLU())
+    optim = torch.optim.Adam(icm.parameters(), lr=1e-2)
+    batch = make_batch()
+
+    first, _ = icm(*batch)
+
+    for _ in range(200):
+        _, loss = icm(*batch)
+        optim.zero_grad()
+        loss.backward()
+        optim.step()
+
+    last, _ = icm(*batch)
+
+    assert last.mean() < first.mean()
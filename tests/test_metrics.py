@@ -0,0 +1,68 @@
+import csv
+import json
+import torch
+from common import Metrics
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_summary_averages_and_resets():
+    metrics = Metrics()
+
+    metrics.add('loss', torch.tensor(1.))
+    metrics.add('loss', torch.tensor(3.))
+    metrics.add('alpha', 0.5)
+
+    assert metrics.summary() == {'loss': 2., 'alpha': 0.5}
+    assert metrics.summary() == {}
+
+def test_stage_timings_only_when_profiling():
+    metrics = Metrics()
+    with metrics.time('act'):
+        pass
+    assert metrics.summary() == {}
+
+    profiled = Metrics(profile=True)
+    with profiled.time('act'):
+        pass
+    stats = profiled.summary()
+
+    assert stats['calls/act'] == 1
+    assert stats['time/act'] >= 0
+
+def test_csv_header_grows_with_new_fields(tmp_path):
+    path = str(tmp_path / 'metrics.csv')
+    metrics = Metrics(path, 'csv')
+
+    # Warm-up episode without losses, then one with, then an evaluation
+    metrics.write({'episode': 1, 'score': 0.5})
+    metrics.write({'episode': 2, 'score': 1., 'value_loss': 0.1})
+    metrics.write({'eval_episode': 2, 'eval_score': 3.})
+
+    rows = read_csv(path)
+
+    assert list(rows[0]) == ['episode', 'score', 'value_loss', 'eval_episode', 'eval_score']
+    assert rows[0]['value_loss'] == ''
+    assert rows[1]['value_loss'] == '0.1'
+    assert rows[2]['eval_score'] == '3.0'
+
+def test_csv_picks_up_an_existing_file(tmp_path):
+    path = str(tmp_path / 'metrics.csv')
+    Metrics(path, 'csv').write({'episode': 1, 'score': 0.5})
+
+    Metrics(path, 'csv').write({'episode': 2, 'score': 1.})
+
+    rows = read_csv(path)
+    assert [row['episode'] for row in rows] == ['1', '2']
+
+def test_jsonl_records(tmp_path):
+    path = str(tmp_path / 'sub' / 'metrics.jsonl')
+    metrics = Metrics(path)
+
+    metrics.write({'episode': 1})
+    metrics.write({'eval_score': 2.})
+
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == [{'episode': 1}, {'eval_score': 2.}]
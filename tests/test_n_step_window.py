@@ -0,0 +1,105 @@
+import numpy as np
+from common import Config, NStepWindow
+from agent import SACAgent
+
+
+def push(window, t, done=False, stream=0):
+    """One transition on stream: state t, action t, reward t + 1"""
+    return window.add(np.full((1, 2), t, dtype=np.float32),
+                      np.array([t]),
+                      np.array([t + 1.]),
+                      np.full((1, 2), t + 1, dtype=np.float32),
+                      np.array([done]),
+                      np.array([stream]))
+
+class EndlessEnv:
+    def reset(self):
+        return np.zeros(2, dtype=np.float32)
+
+    def step(self, action):
+        return np.ones(2, dtype=np.float32), 1., False, {}
+
+    def close(self):
+        pass
+
+
+def test_full_window_releases_n_step_return():
+    window = NStepWindow(3, 0.5, 2)
+
+    assert len(push(window, 0)[0]) == 0
+    assert len(push(window, 1)[0]) == 0
+
+    states, actions, returns, next_states, dones, discounts = push(window, 2)
+
+    # 1 + 0.5 * 2 + 0.25 * 3, bootstrapping from s_3 with 0.5^3
+    assert np.array_equal(states, [[0., 0.]])
+    assert np.array_equal(actions, [0])
+    assert np.allclose(returns, [2.75])
+    assert np.array_equal(next_states, [[3., 3.]])
+    assert np.array_equal(dones, [0.])
+    assert np.allclose(discounts, [0.125])
+
+    # The window slides by one
+    states, _, returns, next_states, _, _ = push(window, 3)
+
+    assert np.array_equal(states, [[1., 1.]])
+    assert np.allclose(returns, [2 + 0.5 * 3 + 0.25 * 4])
+    assert np.array_equal(next_states, [[4., 4.]])
+
+def test_episode_end_releases_everything():
+    window = NStepWindow(3, 0.5, 2)
+
+    push(window, 0)
+    states, _, returns, next_states, dones, discounts = push(window, 1, done=True)
+
+    assert np.array_equal(states, [[0., 0.], [1., 1.]])
+    assert np.allclose(returns, [1 + 0.5 * 2, 2])
+    assert np.array_equal(next_states, [[2., 2.], [2., 2.]])
+    assert np.array_equal(dones, [1., 1.])
+    assert window.lengths[0] == 0
+
+def test_flush_bootstraps_truncated_episodes():
+    window = NStepWindow(3, 0.5, 2)
+
+    push(window, 0)
+    push(window, 1)
+
+    _, _, returns, next_states, dones, discounts = window.flush()
+
+    assert np.allclose(returns, [1 + 0.5 * 2, 2])
+    assert np.array_equal(dones, [0., 0.])
+    assert np.allclose(discounts, [0.25, 0.5])
+    assert len(window.flush()[0]) == 0
+
+def test_streams_are_independent():
+    window = NStepWindow(2, 1., 2)
+
+    push(window, 0, stream=0)
+    push(window, 10, stream=3)
+
+    states, _, returns, _, _, _ = push(window, 1, stream=0)
+
+    assert np.array_equal(states, [[0., 0.]])
+    assert np.allclose(returns, [1 + 2])
+    assert window.lengths[3] == 1
+
+def test_training_flushes_pending_windows(tmp_path):
+    config = Config()
+    config.env = EndlessEnv()
+    config.state_size = 2
+    config.action_size = 2
+    config.buffer_size = 100
+    config.hidden_actor = (8,)
+    config.hidden_critic = (8,)
+    config.n_step = 3
+    config.num_episodes = 1
+    config.max_steps = 5
+    config.env_solved = 100.
+    config.weights_dir = str(tmp_path)
+
+    agent = SACAgent(config)
+    agent.train()
+
+    # The last two entries were still in the window when training stopped
+    assert len(agent.memory) == 5
+    assert np.allclose(agent.memory.discounts[3:5, 0], [config.gamma ** 2, config.gamma])
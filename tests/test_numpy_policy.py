@@ -0,0 +1,43 @@
+import pickle
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+import torch.multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from common import CategoricalPolicy, NumpyPolicy
+
+
+def greedy_actions(policy, states):
+    return policy.act(states, greedy=True)
+
+@pytest.mark.parametrize('activ', ['ReLU', 'Tanh', 'Sigmoid', 'ELU', 'LeakyReLU'])
+def test_matches_torch_policy(activ):
+    torch.manual_seed(0)
+    policy = CategoricalPolicy(4, 3, (16, 16), getattr(nn, activ)())
+    snapshot = NumpyPolicy.from_policy(policy)
+
+    states = np.random.default_rng(0).standard_normal((32, 4)).astype(np.float32)
+
+    with torch.no_grad():
+        expected = policy(torch.from_numpy(states)).numpy()
+
+    assert np.allclose(snapshot.forward(states), expected, atol=1e-5)
+
+@pytest.mark.parametrize('activ', ['ReLU', 'Sigmoid', 'ELU', 'LeakyReLU'])
+def test_snapshot_pickles(activ):
+    snapshot = NumpyPolicy.from_policy(CategoricalPolicy(4, 3, (16, 16), getattr(nn, activ)()))
+    states = np.ones((5, 4), dtype=np.float32)
+
+    copy = pickle.loads(pickle.dumps(snapshot))
+
+    assert (copy.act(states, greedy=True) == snapshot.act(states, greedy=True)).all()
+
+def test_snapshot_runs_in_spawned_worker():
+    snapshot = NumpyPolicy.from_policy(CategoricalPolicy(4, 3, (16,), nn.ReLU()))
+    states = np.ones((5, 4), dtype=np.float32)
+
+    with ProcessPoolExecutor(1, mp_context=mp.get_context('spawn')) as pool:
+        actions = pool.submit(greedy_actions, snapshot, states).result(timeout=60)
+
+    assert (actions == snapshot.act(states, greedy=True)).all()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import torch.nn as nn
+from common import CategoricalPolicy
+from common.PolicyServer import PolicyServer
+
+
+@pytest.fixture
+def server():
+    server = PolicyServer(CategoricalPolicy(4, 3, (8,), nn.ReLU()), max_batch_size=8).start()
+    yield server
+    server.stop()
+
+def test_rejects_wrong_state_size(server):
+    with pytest.raises(ValueError):
+        server.submit(np.zeros(5))
+
+    assert server.act(np.zeros(4)) in range(3)
+
+def test_failed_batch_doesnt_stop_the_worker(server, monkeypatch):
+    def fail(batch):
+        raise RuntimeError('forward failed')
+
+    with monkeypatch.context() as m:
+        m.setattr(server, 'forward', fail)
+
+        with pytest.raises(RuntimeError, match='forward failed'):
+            server.act(np.zeros(4))
+
+    assert server.act(np.zeros(4)) in range(3)
+
+def test_stop_fails_queued_requests():
+    server = PolicyServer(CategoricalPolicy(4, 3, (8,), nn.ReLU()))
+
+    # Never started, so nothing serves the queue
+    future = server.submit(np.zeros(4))
+    server.stop()
+
+    with pytest.raises(RuntimeError, match='stopped'):
+        future.result(timeout=1)
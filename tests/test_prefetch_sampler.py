@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import torch
+from common import Config, ReplayBuffer, PrioritizedReplayBuffer, PrefetchSampler
+from agent import SACAgent
+
+
+def fill(memory, n=100):
+    states = np.arange(n * 2, dtype=np.float32).reshape(n, 2)
+    memory.add_batch(states, np.zeros(n), np.arange(n), states + 1, np.zeros(n))
+    return memory
+
+def test_batches_come_in_sampling_order():
+    expected = fill(ReplayBuffer(100, 8, 2, seed=0))
+    sampler = PrefetchSampler(fill(ReplayBuffer(100, 8, 2, seed=0)), depth=2).start()
+
+    try:
+        for _ in range(5):
+            # The global generator is the training thread's business
+            np.random.rand(3)
+
+            for a, b in zip(sampler.get(), expected.sample()):
+                assert torch.equal(a, b)
+    finally:
+        sampler.stop()
+
+    assert sampler.thread is None
+
+def test_prefetching_doesnt_anneal_beta():
+    memory = fill(PrioritizedReplayBuffer(100, 8, 2, beta=0.4, beta_increment=0.1))
+    sampler = PrefetchSampler(memory, depth=4).start()
+
+    try:
+        *_, idxs = sampler.get()
+
+        # Batches drawn ahead leave beta alone, learning from one moves it
+        assert memory.beta == 0.4
+
+        memory.update_priorities(idxs, np.ones(len(idxs)))
+        assert np.isclose(memory.beta, 0.5)
+    finally:
+        sampler.stop()
+
+def test_failed_sampling_surfaces_in_get():
+    sampler = PrefetchSampler(ReplayBuffer(100, 8, 2), depth=2).start()
+
+    # Nothing to sample from an empty buffer
+    try:
+        with pytest.raises(RuntimeError, match='Prefetch thread failed'):
+            sampler.get()
+    finally:
+        sampler.stop()
+
+def test_resumed_agent_samples_the_same_batches():
+    def make_agent(seed):
+        config = Config()
+        config.state_size = 2
+        config.action_size = 2
+        config.buffer_size = 100
+        config.batch_size = 8
+        config.seed = seed
+        agent = SACAgent(config)
+        fill(agent.memory)
+        return agent
+
+    agent = make_agent(0)
+    agent.memory.sample()
+    state = agent.training_state()
+
+    resumed = make_agent(1)
+    resumed.load_training_state(state)
+
+    for a, b in zip(resumed.memory.sample(), agent.memory.sample()):
+        assert torch.equal(a, b)
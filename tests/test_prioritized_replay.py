@@ -0,0 +1,50 @@
+import numpy as np
+from common import PrioritizedReplayBuffer
+
+
+def fill(memory, n):
+    states = np.arange(n, dtype=np.float32)[:, None].repeat(2, axis=1)
+    memory.add_batch(states, np.zeros(n), np.arange(n, dtype=np.float32), states, np.zeros(n))
+    return memory
+
+def test_new_experiences_get_the_max_priority():
+    memory = fill(PrioritizedReplayBuffer(8, 4, 2, alpha=1.), 4)
+    memory.update_priorities(np.arange(4), np.array([1., 2., 5., 3.]))
+
+    fill(memory, 2)
+
+    assert np.isclose(memory.max_priority, 5., atol=1e-5)
+    assert np.allclose(memory.sum_tree[np.arange(4, 6)], 5., atol=1e-5)
+
+def test_sampling_follows_priorities():
+    memory = fill(PrioritizedReplayBuffer(4, 4000, 2, alpha=1., eps=0., seed=0), 4)
+    memory.update_priorities(np.arange(4), np.array([1., 2., 3., 4.]))
+
+    *_, idxs = memory.sample()
+    frequencies = np.bincount(idxs, minlength=4) / len(idxs)
+
+    assert np.allclose(frequencies, [0.1, 0.2, 0.3, 0.4], atol=0.02)
+
+def test_importance_sampling_weights():
+    memory = fill(PrioritizedReplayBuffer(4, 64, 2, alpha=1., beta=0.5, eps=0., seed=0), 4)
+    memory.update_priorities(np.arange(4), np.array([1., 2., 3., 4.]))
+
+    _, _, rewards, _, _, weights, idxs = memory.sample()
+
+    # w_i = (P(i) / min P)^-beta: 1 for the rarest experience
+    priorities = np.array([1., 2., 3., 4.])
+    expected = (priorities[idxs] / priorities.min()) ** -0.5
+
+    assert weights.shape == (64, 1)
+    assert np.allclose(weights[:, 0].numpy(), expected, atol=1e-5)
+    assert weights.max() <= 1.
+    assert np.array_equal(rewards[:, 0].numpy(), idxs)
+
+def test_alpha_zero_is_uniform():
+    memory = fill(PrioritizedReplayBuffer(4, 4000, 2, alpha=0., seed=0), 4)
+    memory.update_priorities(np.arange(4), np.array([1., 10., 100., 1000.]))
+
+    _, _, _, _, _, weights, idxs = memory.sample()
+
+    assert np.allclose(np.bincount(idxs, minlength=4) / len(idxs), 0.25, atol=0.03)
+    assert np.allclose(weights.numpy(), 1.)
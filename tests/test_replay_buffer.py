@@ -0,0 +1,63 @@
+import numpy as np
+import torch
+from common import ReplayBuffer
+
+
+def transitions(start, n, state_size=3):
+    """Transition i has state i, action i % 4, reward i, next_state i + 1"""
+    i = np.arange(start, start + n)
+    states = np.repeat(i[:, None], state_size, axis=1).astype(np.float32)
+    return states, i % 4, i.astype(np.float32), states + 1, (i % 5 == 0).astype(np.float32)
+
+def test_sample_shapes_and_types():
+    memory = ReplayBuffer(100, 16, 3)
+    memory.add_batch(*transitions(0, 50))
+
+    states, actions, rewards, next_states, dones = memory.sample()
+
+    assert states.shape == next_states.shape == (16, 3)
+    assert actions.shape == rewards.shape == dones.shape == (16, 1)
+    assert states.dtype == torch.float32 and actions.dtype == torch.int64
+
+    # Every sampled row is one whole stored transition
+    assert torch.equal(next_states, states + 1)
+    assert torch.equal(rewards[:, 0], states[:, 0])
+    assert torch.equal(actions[:, 0], states[:, 0].long() % 4)
+
+def test_add_and_add_batch_store_the_same():
+    one_by_one = ReplayBuffer(10, 4, 3)
+    batched = ReplayBuffer(10, 4, 3)
+
+    batch = transitions(0, 6)
+    for transition in zip(*batch):
+        one_by_one.add(*transition)
+    batched.add_batch(*batch)
+
+    idxs = np.arange(6)
+    for a, b in zip(one_by_one.gather(idxs), batched.gather(idxs)):
+        assert torch.equal(a, b)
+
+def test_ring_overwrites_the_oldest():
+    memory = ReplayBuffer(10, 4, 3)
+    memory.add_batch(*transitions(0, 8))
+    memory.add_batch(*transitions(8, 5))
+
+    assert len(memory) == 10
+    assert memory.pos == 3
+
+    # Slots 0-2 hold transitions 10-12, the rest 3-9
+    _, _, rewards, _, _ = memory.gather(np.arange(10))
+    assert np.array_equal(rewards[:, 0].numpy(), [10, 11, 12, 3, 4, 5, 6, 7, 8, 9])
+
+def test_sampling_is_uniform_and_seeded():
+    memory = ReplayBuffer(10, 10000, 3, seed=0)
+    memory.add_batch(*transitions(0, 10))
+
+    _, _, rewards, _, _ = memory.sample()
+    counts = np.bincount(rewards[:, 0].long().numpy(), minlength=10)
+
+    assert np.allclose(counts / 10000, 0.1, atol=0.02)
+
+    same = ReplayBuffer(10, 10000, 3, seed=0)
+    same.add_batch(*transitions(0, 10))
+    assert torch.equal(same.sample()[2], rewards)
@@ -0,0 +1,51 @@
+import torch
+import torch.nn as nn
+from common import RND
+from common.utils import device
+
+
+def test_predictor_learns_the_target_only():
+    torch.manual_seed(0)
+    rnd = RND(4, 8, (16,), nn.ReLU())
+    optim = torch.optim.Adam(rnd.predictor.parameters(), lr=1e-2)
+
+    target = [p.clone() for p in rnd.target.parameters()]
+    seen = torch.randn((64, 4), device=device)
+
+    _, first = rnd(seen)
+
+    for _ in range(200):
+        _, loss = rnd(seen)
+        optim.zero_grad()
+        loss.backward()
+        optim.step()
+
+    assert loss < first
+    assert all(torch.equal(a, b) for a, b in zip(target, rnd.target.parameters()))
+
+def test_novel_observations_get_a_larger_bonus():
+    torch.manual_seed(0)
+    rnd = RND(4, 8, (16,), nn.ReLU())
+    optim = torch.optim.Adam(rnd.predictor.parameters(), lr=1e-2)
+
+    seen = torch.randn((64, 4), device=device)
+
+    for _ in range(300):
+        _, loss = rnd(seen)
+        optim.zero_grad()
+        loss.backward()
+        optim.step()
+
+    familiar, _ = rnd(seen)
+    novel, _ = rnd(torch.randn((64, 4), device=device) * 3 + 5)
+
+    assert familiar.shape == (64, 1)
+    assert novel.mean() > familiar.mean()
+
+def test_observation_stats_are_tracked():
+    rnd = RND(4, 8, (16,), nn.ReLU())
+    states = torch.randn((1000, 4), device=device) * 2 + 3
+
+    rnd(states)
+
+    assert torch.allclose(rnd.obs_rms.mean, states.mean(dim=0), atol=1e-3)
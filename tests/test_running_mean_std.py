@@ -0,0 +1,25 @@
+import torch
+from common import RunningMeanStd
+
+
+def test_batched_merge_matches_full_stats():
+    torch.manual_seed(0)
+    x = torch.randn(1000, 3) * torch.tensor([1., 2., 3.]) + torch.tensor([0., -1., 5.])
+
+    rms = RunningMeanStd((3,), eps=0.)
+
+    # Uneven batches, merged one after the other
+    for batch in torch.split(x, [1, 10, 100, 389, 500]):
+        rms.update(batch)
+
+    assert float(rms.count) == 1000
+    assert torch.allclose(rms.mean.cpu(), x.mean(dim=0), atol=1e-5)
+    assert torch.allclose(rms.var.cpu(), x.var(dim=0, unbiased=False), atol=1e-4)
+
+def test_normalize():
+    rms = RunningMeanStd((2,), eps=0.)
+    rms.update(torch.tensor([[1., 10.], [3., 30.]]))
+
+    normalized = rms.normalize(torch.tensor([[2., 20.]]).to(rms.mean.device)).cpu()
+
+    assert torch.allclose(normalized, torch.zeros(1, 2), atol=1e-4)
@@ -0,0 +1,42 @@
+import numpy as np
+from common import SumTree, MinTree
+
+
+def test_reduce_after_batched_updates():
+    tree = SumTree(5)
+    mins = MinTree(5)
+
+    tree.update(np.arange(5), np.array([1., 2., 3., 4., 5.]))
+    mins.update(np.arange(5), np.array([1., 2., 3., 4., 5.]))
+
+    assert tree.capacity == 8
+    assert tree.reduce() == 15.
+    assert mins.reduce() == 1.
+
+    tree.update([0, 4], [10., 0.])
+    mins.update([0, 4], [10., 0.])
+
+    assert tree.reduce() == 19.
+    assert mins.reduce() == 0.
+    assert np.array_equal(tree[[0, 1, 4]], [10., 2., 0.])
+
+def test_find_prefixsum_idx():
+    tree = SumTree(4)
+    tree.update(np.arange(4), np.array([1., 0., 2., 3.]))
+
+    # Leaves cover [0, 1), (empty), [1, 3), [3, 6)
+    idxs = tree.find_prefixsum_idx([0., 0.99, 1., 2.5, 3., 5.99])
+
+    assert np.array_equal(idxs, [0, 0, 2, 2, 3, 3])
+
+def test_sampling_follows_priorities():
+    rng = np.random.default_rng(0)
+    priorities = np.array([1., 2., 3., 4.])
+
+    tree = SumTree(4)
+    tree.update(np.arange(4), priorities)
+
+    idxs = tree.find_prefixsum_idx(rng.random(100000) * tree.reduce())
+    frequencies = np.bincount(idxs, minlength=4) / len(idxs)
+
+    assert np.allclose(frequencies, priorities / priorities.sum(), atol=0.01)
@@ -0,0 +1,137 @@
+import numpy as np
+from common import Config
+from agent import SACAgent
+from envs import UnityMultiAgentEnv, FakeUnityEnvironment
+
+
+def make_agent(env, **settings):
+    config = Config()
+    config.env = env
+    config.state_size = env.state_size
+    config.action_size = env.action_size
+    config.batch_size = 8
+    config.buffer_size = 10000
+    config.hidden_actor = (16,)
+    config.hidden_critic = (16,)
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+    return SACAgent(config)
+
+def make_env(**kwargs):
+    kwargs = {'num_agents': 4, 'observation_shapes': ((3,), (2,)), 'num_actions': 3, 'seed': 0, **kwargs}
+    return UnityMultiAgentEnv(FakeUnityEnvironment(**kwargs))
+
+
+def test_one_transition_per_decision():
+    env = make_env(min_steps=5, max_steps=5)
+    agent = make_agent(env)
+
+    for _ in range(11):
+        env.collect_step(agent)
+
+    # Nothing to pair with on the first step, then one per agent
+    assert len(agent.memory) == 4 * 10
+    assert env.state_size == 5 and env.action_size == 3
+
+def test_done_only_for_real_terminal_states():
+    env = make_env(num_agents=8, min_steps=3, max_steps=4)
+    agent = make_agent(env)
+
+    # Episodes of 4 steps hit max_steps (interrupted), those of 3 terminate
+    terminal = 0
+    get_steps = env.get_steps
+
+    def record():
+        nonlocal terminal
+        decision_steps, terminal_steps, interrupted = get_steps()
+        terminal += int((~interrupted).sum())
+        return decision_steps, terminal_steps, interrupted
+
+    env.get_steps = record
+
+    for _ in range(20):
+        env.collect_step(agent)
+
+    assert terminal > 0
+    assert agent.memory.dones[:len(agent.memory)].sum() == terminal
+
+def test_agents_joining_and_leaving_reuse_streams():
+    env = make_env(num_agents=3, min_steps=2, max_steps=6, replace_agents=True)
+    agent = make_agent(env, compact_replay=True)
+
+    agent_ids = set()
+    finished = []
+
+    for _ in range(200):
+        agent_ids.update(env.env.decision_steps.agent_id.tolist())
+        finished += env.collect_step(agent)
+
+    # Many agents came and went, streams stay as many as live agents
+    assert len(agent_ids) > 3 * 10
+    assert len(env.streams) <= 3
+    assert max(env.streams.values()) < 3
+    assert len(agent.memory) == 3 * 199
+
+    # Every finished agent left for good
+    left = {agent_id for agent_id, _ in finished}
+    assert not left & set(env.env.agent_ids.tolist())
+
+def test_compact_chains_follow_each_agent():
+    env = make_env(num_agents=3, min_steps=2, max_steps=6, replace_agents=True)
+    agent = make_agent(env, compact_replay=True)
+    transitions = []
+
+    insert = env.insert
+
+    def record(agent, batch):
+        transitions.extend(batch)
+        insert(agent, batch)
+
+    env.insert = record
+
+    for _ in range(50):
+        env.collect_step(agent)
+
+    next_states = agent.memory.gather(np.arange(len(agent.memory)))[3]
+
+    # Rebuilt from the following slot of the same agent, or the tail
+    expected = np.array([transition[3] for transition in transitions], dtype=np.float32)
+
+    assert np.allclose(next_states.numpy(), expected)
+
+def test_evaluate_ends_live_streams():
+    env = make_env(min_steps=4, max_steps=12)
+    agent = make_agent(env, n_step=3, use_episodic=True)
+
+    for _ in range(20):
+        env.collect_step(agent)
+
+    size = len(agent.memory)
+
+    env.evaluate(agent, 6)
+
+    # Pending n-step entries went to the buffer, nothing else did
+    assert agent.n_step_window.lengths.sum() == 0
+    assert len(agent.memory) > size
+    assert (agent.episodic.counts == 0).all()
+    assert env.streams == {}
+
+def test_evaluate_counts_one_episode_per_agent():
+    env = make_env(num_agents=4, min_steps=2, max_steps=50)
+    agent = make_agent(env)
+
+    counted = []
+    collect_step = env.collect_step
+
+    def record(agent, train=True):
+        finished = collect_step(agent, train)
+        counted.extend(agent_id for agent_id, _ in finished)
+        return finished
+
+    env.collect_step = record
+    env.evaluate(agent, 4)
+
+    # Short episodes finish again before long ones do, only the first counts
+    assert len(set(counted)) == 4
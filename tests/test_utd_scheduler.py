@@ -0,0 +1,86 @@
+import json
+import pytest
+from common import UTDScheduler, Metrics
+
+
+def run_window(scheduler, env_time, update_time, updates):
+    # Measured times are set directly, the decision only depends on them
+    scheduler.window_steps = scheduler.adjust_every
+    scheduler.window_updates = updates
+    scheduler.env_time = env_time
+    scheduler.update_time = update_time
+    scheduler.decide()
+
+def test_needs_a_target():
+    with pytest.raises(ValueError):
+        UTDScheduler(target_share=None, target_ratio=None)
+
+    with pytest.raises(ValueError):
+        UTDScheduler(target_share=1.)
+
+def test_ratio_moves_toward_target_ratio():
+    scheduler = UTDScheduler(target_share=None, target_ratio=4., initial_ratio=1., smoothing=0.5)
+
+    run_window(scheduler, 1., 1., 10)
+    assert scheduler.ratio == pytest.approx(2.5)
+
+    run_window(scheduler, 1., 1., 10)
+    assert scheduler.ratio == pytest.approx(3.25)
+
+def test_target_share_balances_times():
+    scheduler = UTDScheduler(target_share=0.5, smoothing=1., adjust_every=10)
+
+    # 0.1s per env step, 0.05s per update: 2 updates per step halve the time
+    run_window(scheduler, 1., 0.5, 10)
+    assert scheduler.ratio == pytest.approx(2.)
+
+def test_no_decision_before_updates_are_timed():
+    scheduler = UTDScheduler(target_share=0.5, initial_ratio=1.)
+
+    run_window(scheduler, 1., 0., 0)
+
+    assert scheduler.ratio == 1.
+    assert scheduler.decisions == []
+
+def test_ratio_clipped():
+    scheduler = UTDScheduler(target_share=None, target_ratio=100., max_ratio=8., smoothing=1.)
+    run_window(scheduler, 1., 1., 10)
+    assert scheduler.ratio == 8.
+
+    scheduler = UTDScheduler(target_share=0.5, min_ratio=0.25, smoothing=1.)
+    run_window(scheduler, 1., 1000., 10)
+    assert scheduler.ratio == 0.25
+
+def test_fractional_ratio_carries_over():
+    scheduler = UTDScheduler(target_share=None, target_ratio=0.25, initial_ratio=0.25,
+                             adjust_every=10**6)
+
+    updates = [scheduler.step() for _ in range(8)]
+
+    assert updates == [0, 0, 0, 1, 0, 0, 0, 1]
+
+def test_state_dict_round_trip():
+    scheduler = UTDScheduler(target_share=None, target_ratio=0.5, initial_ratio=0.75,
+                             adjust_every=10**6)
+    for _ in range(3):
+        scheduler.updated(scheduler.step(), 0.)
+
+    resumed = UTDScheduler(target_share=None, target_ratio=0.5, adjust_every=10**6)
+    resumed.load_state_dict(scheduler.state_dict())
+
+    assert resumed.state_dict() == scheduler.state_dict()
+    assert [resumed.step() for _ in range(4)] == [scheduler.step() for _ in range(4)]
+
+def test_decisions_written_to_their_metrics(tmp_path):
+    path = tmp_path / 'utd.jsonl'
+    scheduler = UTDScheduler(target_share=None, target_ratio=2., smoothing=1.,
+                             metrics=Metrics(str(path), 'jsonl'))
+
+    run_window(scheduler, 1., 1., 10)
+    run_window(scheduler, 1., 1., 10)
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+
+    assert records == scheduler.decisions
+    assert [record['utd_ratio'] for record in records] == [2., 2.]